@@ -1,11 +1,54 @@
 #!/usr/bin/env python3
 
+import os
+import re
 import json
 import ast
 import argparse
+import resource
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from time import perf_counter
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
-def unify_movieId(movies_metadata, credits, links, genome_scores, movies, ratings):
+STREAM_BLOCK_SIZE = 64 << 20  # bytes of CSV per record batch in --streaming mode
+RATING_BUCKETS = 10  # half stars, 0.5 .. 5.0
+# Normalized (movieId, tagId, relevance) rows, loaded into genome_relevance by import_db.py
+GENOME_RELEVANCE_SCHEMA = pa.schema([('movieId', pa.int32()), ('tagId', pa.int32()), ('relevance', pa.float64())])
+LITERAL_CHUNKS_PER_WORKER = 4  # partitions per process, for load balancing
+
+# Outputs: one typed file per database table plus a manifest, next to the
+# untouched raw CSVs. Arrow IPC files are uncompressed so that import_db.py
+# can memory-map them without a copy; Parquet files are zstd-compressed.
+OUTPUT_DIR = 'processed'
+OUTPUT_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+MANIFEST_FILE = 'manifest.json'
+# Column types, as in movieRatingSystem/models/movie_models.py
+OUTPUT_TYPES = {
+    'movie_metadata': {
+        'movieId': 'Int64', 'adult': 'boolean', 'budget': 'Int64', 'popularity': 'float64', 'release_date': 'date',
+        'revenue': 'Int64', 'runtime': 'Int64', 'vote_average': 'float64', 'vote_count': 'Int64'
+    },
+    'credits': {'movieId': 'Int64'},
+    'links': {'movieId': 'Int64', 'imdbId': 'Int64', 'tmdbId': 'Int64'},
+    'movies': {'movieId': 'Int64'},
+    'genome_tags': {'tagId': 'Int64'},
+    'ratings': {'movieId': 'Int64', 'rating': 'float64'},
+    'movie_rating_stats': {'movieId': 'Int64', 'rating_count': 'Int64', 'rating_sum': 'float64', 'rating_avg': 'float64'},
+}
+
+# Python literal tokens that differ from JSON: single-quoted strings and None/True/False
+_LITERAL_TOKEN = re.compile(r"'[^']*'|\bNone\b|\bTrue\b|\bFalse\b")
+_JSON_KEYWORDS = {'None': 'null', 'True': 'true', 'False': 'false'}
+
+def valid_movie_ids(movies_metadata, credits, links):
     # Drop all duplicate and null values
     movies_metadata.drop_duplicates(subset='id', keep='first', inplace=True)
     movies_metadata.drop_duplicates(subset='imdb_id', keep='first', inplace=True)
@@ -19,63 +62,407 @@ def unify_movieId(movies_metadata, credits, links, genome_scores, movies, rating
     credits['movieId'] = credits['id'].map(tmdb_to_movieId_map)
 
     # intersect movie id across tables to keep the common movies
-    valid_movieIds = set(links['movieId'].dropna()) & \
-                    set(credits['movieId'].dropna()) & \
-                    set(movies_metadata['movieId'].dropna())
-    
-    links = links[links['movieId'].isin(valid_movieIds)]
-    credits = credits[credits['movieId'].isin(valid_movieIds)]
-    movies_metadata = movies_metadata[movies_metadata['movieId'].isin(valid_movieIds)]
+    return set(links['movieId'].dropna()) & \
+           set(credits['movieId'].dropna()) & \
+           set(movies_metadata['movieId'].dropna())
+
+def filter_small_tables(valid_movieIds, movies_metadata, credits, links, movies):
+    # Copies, since the format_* functions modify them in place
+    return tuple(
+        frame[frame['movieId'].isin(valid_movieIds)].copy()
+        for frame in (movies_metadata, credits, links, movies)
+    )
+
+def unify_movieId(movies_metadata, credits, links, genome_scores, movies, ratings):
+    # Returns the filtered tables, in the same order
+    valid_movieIds = valid_movie_ids(movies_metadata, credits, links)
+
+    movies_metadata, credits, links, movies = filter_small_tables(valid_movieIds, movies_metadata, credits, links, movies)
     genome_scores = genome_scores[genome_scores['movieId'].isin(valid_movieIds)]
-    movies = movies[movies['movieId'].isin(valid_movieIds)]
     ratings = ratings[ratings['movieId'].isin(valid_movieIds)]
+    return movies_metadata, credits, links, genome_scores, movies, ratings
 
-def main():
-    # Set up argument parser
-    parser = argparse.ArgumentParser(description="Process a path argument.")
-    parser.add_argument("path", help="The path to process")
-    args = parser.parse_args()
-    
-    # Get the path from the arguments
-    data_path = args.path
+def normalize_title(title):
+    # Must match normalize_title in movieRatingSystem/utils/query_builder.py
+    decomposed = unicodedata.normalize('NFKD', title)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.sub(r'\s+', ' ', stripped).strip().lower()
 
-    movies_metadata = pd.read_csv(open(data_path + 'movies_metadata.csv','r', newline=None))
-    credits = pd.read_csv(open(data_path + 'credits.csv','r', newline=None))
-    links = pd.read_csv(open(data_path + 'links.csv','r', newline=None))
-    genome_scores = pd.read_csv(open(data_path + 'genome-scores.csv','r', newline=None))
-    movies = pd.read_csv(open(data_path + 'movies.csv','r', newline=None))
-    ratings = pd.read_csv(open(data_path + 'ratings.csv','r', newline=None))
+def normalize_genome_scores(movie_ids, tag_ids, relevances):
+    # Vectorized replacement for the per-movie groupby/apply(json.dumps):
+    # rows sorted by (movieId, tagId), the last of any duplicate pair kept
+    order = np.lexsort((tag_ids, movie_ids))
+    movie_ids, tag_ids, relevances = movie_ids[order], tag_ids[order], relevances[order]
+    last = np.append((movie_ids[1:] != movie_ids[:-1]) | (tag_ids[1:] != tag_ids[:-1]), True)
+    return pa.table([
+        pa.array(movie_ids[last], pa.int32()),
+        pa.array(tag_ids[last], pa.int32()),
+        pa.array(relevances[last], pa.float64())
+    ], schema=GENOME_RELEVANCE_SCHEMA)
+
+def genome_relevance_table(genome_scores):
+    return normalize_genome_scores(
+        genome_scores['movieId'].to_numpy(np.int64),
+        genome_scores['tagId'].to_numpy(np.int64),
+        genome_scores['relevance'].to_numpy(np.float64)
+    )
+
+def write_genome_relevance(genome_scores, output_path):
+    table = genome_relevance_table(genome_scores)
+    pq.write_table(table, output_path, compression='zstd')
+    return table.num_rows
+
+def build_rating_stats(ratings):
+    # Per-movie rating aggregate: count, sum, average and a half-star histogram
+    grouped = ratings.groupby('movieId')['rating']
+    rating_stats = grouped.agg(rating_count='count', rating_sum='sum', rating_avg='mean')
+
+    buckets = ratings.groupby(['movieId', 'rating']).size().unstack(fill_value=0)
+    buckets.columns = [f"{rating:.1f}" for rating in buckets.columns]
+    rating_stats['histogram'] = [
+        json.dumps({bucket: int(count) for bucket, count in row.items() if count})
+        for row in buckets.to_dict('records')
+    ]
+
+    return rating_stats.reset_index().sort_values(by='movieId')
+
+class Stage:
+    """Times one preprocessing stage and reports its rows/s and peak RSS."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
 
-    unify_movieId(movies_metadata, credits, links, genome_scores, movies, ratings)
+    def __enter__(self):
+        # Linux only: reset the peak RSS so it covers just this stage
+        try:
+            with open('/proc/self/clear_refs', 'w') as clear_refs:
+                clear_refs.write('5')
+        except OSError:
+            pass
+        self.start_time = perf_counter()
+        return self
 
+    def __exit__(self, *exc_info):
+        elapsed = perf_counter() - self.start_time
+        print(f"[{self.name}] {self.rows:,} rows in {elapsed:.1f}s "
+              f"({self.rows / elapsed if elapsed else 0:,.0f} rows/s), peak RSS {peak_rss_mb():,.0f} MB\n")
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak of the whole process; kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def literal_to_json(value):
+    # json.dumps(ast.literal_eval(value)), with a fast path for text that
+    # becomes valid JSON by swapping quotes and keywords. Only safe without
+    # double quotes or backslashes: then every string is single-quoted and
+    # contains no quote, so the regex sees whole strings.
+    if isinstance(value, str) and '"' not in value and '\\' not in value:
+        normalized = _LITERAL_TOKEN.sub(
+            lambda match: _JSON_KEYWORDS.get(match.group(0)) or f'"{match.group(0)[1:-1]}"', value
+        )
+        try:
+            return json.dumps(json.loads(normalized)), True
+        except ValueError:
+            pass
+    return json.dumps(ast.literal_eval(value)), False
+
+def literal_chunk_to_json(values):
+    converted = [literal_to_json(value) for value in values]
+    return [text for text, _ in converted], sum(fast for _, fast in converted)
+
+def literals_to_json(frame, columns, workers):
+    # Convert Python-literal columns to JSON text on a process pool. The
+    # chunks are mapped in order, so the output does not depend on workers.
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for column in columns:
+            start_time = perf_counter()
+            values = frame[column].tolist()
+            chunk_size = max(1, -(-len(values) // (workers * LITERAL_CHUNKS_PER_WORKER)))
+            chunks = [values[start:start + chunk_size] for start in range(0, len(values), chunk_size)]
+            results = pool.map(literal_chunk_to_json, chunks) if pool else map(literal_chunk_to_json, chunks)
+
+            converted = []
+            fast = 0
+            for texts, fast_count in results:
+                converted.extend(texts)
+                fast += fast_count
+            frame[column] = converted
+            print(f"[{column}] {len(values):,} values in {perf_counter() - start_time:.1f}s on {workers} processes, "
+                  f"{fast / len(values) if values else 0:.0%} without literal_eval")
+    finally:
+        if pool:
+            pool.shutdown()
+
+def format_movies_metadata(movies_metadata, workers=None):
     # Remove unnecessary columns in movie metadata
     movies_metadata.drop(columns=['belongs_to_collection', 'genres', 'homepage', 'status', 'original_title', 'video', 'imdb_id', 'id', 'imdbId'], inplace=True, errors='ignore')
 
+    # Normalized title for indexed search: accents stripped, lowercased, whitespace collapsed
+    movies_metadata['title_normalized'] = movies_metadata['title'].fillna('').map(normalize_title)
+
     # Format the json data
-    movies_metadata['production_companies'] = movies_metadata['production_companies'].apply(ast.literal_eval).apply(lambda x: json.dumps(x))
-    movies_metadata['production_countries'] = movies_metadata['production_countries'].apply(ast.literal_eval).apply(lambda x: json.dumps(x))
-    movies_metadata['spoken_languages'] = movies_metadata['spoken_languages'].apply(ast.literal_eval).apply(lambda x: json.dumps(x))
+    literals_to_json(movies_metadata, ['production_companies', 'production_countries', 'spoken_languages'], workers)
 
+def format_credits(credits, workers=None):
     # Format the json data
-    credits['cast'] = credits['cast'].apply(ast.literal_eval).apply(lambda x: json.dumps(x))
-    credits['crew'] = credits['crew'].apply(ast.literal_eval).apply(lambda x: json.dumps(x))
+    literals_to_json(credits, ['cast', 'crew'], workers)
 
     credits.drop(columns='id', inplace=True, errors='ignore')
 
+def format_movies(movies):
     movies['genres'] = movies['genres'].fillna('').str.replace('|', ',', regex=False).apply(lambda x: f'{{{x}}}' if x else '{}')
 
-    genome_scores = genome_scores.groupby("movieId").apply(lambda x: json.dumps(dict(zip(x["tagId"], x["relevance"])))).reset_index(name="relevances")
+def read_small_tables(data_path):
+    movies_metadata = pd.read_csv(open(data_path + 'movies_metadata.csv','r', newline=None))
+    credits = pd.read_csv(open(data_path + 'credits.csv','r', newline=None))
+    links = pd.read_csv(open(data_path + 'links.csv','r', newline=None))
+    movies = pd.read_csv(open(data_path + 'movies.csv','r', newline=None))
+    return movies_metadata, credits, links, movies
+
+def coerce_types(frame, types):
+    # Cast the columns to their database types; unparseable values become null
+    for column, kind in types.items():
+        if column not in frame.columns:
+            continue
+        if kind == 'date':
+            frame[column] = pd.to_datetime(frame[column], errors='coerce')
+        elif kind == 'boolean':
+            frame[column] = frame[column].astype(str).str.lower().map({'true': True, 'false': False}).astype('boolean')
+        elif kind == 'Int64':
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').round().astype('Int64')
+        else:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype(kind)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    for column, kind in types.items():
+        if kind == 'date' and column in table.column_names:
+            index = table.column_names.index(column)
+            table = table.set_column(index, column, pc.cast(table[column], pa.date32()))
+    return table
+
+class TableWriter:
+    """Writes one output table in batches, moved into place on close."""
+
+    def __init__(self, path, schema, output_format):
+        self.path = path
+        self.schema = schema
+        self.rows = 0
+        self._temp_path = f"{path}.tmp"
+        if output_format == 'parquet':
+            self._writer = pq.ParquetWriter(self._temp_path, schema, compression='zstd')
+        else:
+            self._writer = pa.ipc.new_file(self._temp_path, schema)
+
+    def write_table(self, table):
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        self._writer.close()
+        os.replace(self._temp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ProcessedOutput:
+    """The output directory: typed table files and their manifest."""
+
+    def __init__(self, output_dir, output_format='parquet'):
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.writers = {}
+        os.makedirs(output_dir, exist_ok=True)
+
+    def open(self, table_name, schema):
+        writer = TableWriter(os.path.join(self.output_dir, table_name + OUTPUT_FORMATS[self.output_format]), schema, self.output_format)
+        self.writers[table_name] = writer
+        return writer
+
+    def write_frame(self, table_name, frame):
+        table = coerce_types(frame, OUTPUT_TYPES.get(table_name, {}))
+        with self.open(table_name, table.schema) as writer:
+            writer.write_table(table)
+
+    def write_manifest(self, data_path, sources):
+        manifest = {
+            'format': self.output_format,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'sources': {
+                source: {'bytes': os.path.getsize(data_path + source), 'mtime': os.path.getmtime(data_path + source)}
+                for source in sources
+            },
+            'tables': {
+                table_name: {
+                    'file': os.path.basename(writer.path),
+                    'rows': writer.rows,
+                    'bytes': os.path.getsize(writer.path),
+                    'columns': {field.name: str(field.type) for field in writer.schema}
+                }
+                for table_name, writer in self.writers.items()
+            }
+        }
+        with open(os.path.join(self.output_dir, MANIFEST_FILE), 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        print(f"Wrote {len(self.writers)} tables and {MANIFEST_FILE} to {self.output_dir}\n")
+
+def write_small_tables(output, movies_metadata, credits, links, movies):
+    output.write_frame('movie_metadata', movies_metadata)
+    output.write_frame('credits', credits)
+    output.write_frame('links', links)
+    output.write_frame('movies', movies)
+
+def write_genome_tags(data_path, output):
+    # Unchanged, but typed and listed in the manifest with the rest
+    output.write_frame('genome_tags', pd.read_csv(open(data_path + 'genome-tags.csv','r', newline=None)))
+
+def open_csv_batches(file_path, column_types, block_size):
+    # Record batches of the given columns, never the whole file
+    return pv.open_csv(
+        file_path,
+        read_options=pv.ReadOptions(block_size=block_size),
+        convert_options=pv.ConvertOptions(include_columns=list(column_types), column_types=column_types)
+    )
+
+def stream_rating_stats(file_path, movie_ids, block_size, stage):
+    # Aggregate ratings batch by batch into per-movie count, sum and histogram arrays
+    counts = np.zeros(len(movie_ids), dtype=np.int64)
+    sums = np.zeros(len(movie_ids), dtype=np.float64)
+    histogram = np.zeros((len(movie_ids), RATING_BUCKETS), dtype=np.int64)
+    value_set = pa.array(movie_ids)
+
+    for batch in open_csv_batches(file_path, {'movieId': pa.int64(), 'rating': pa.float64()}, block_size):
+        stage.rows += batch.num_rows
+        table = pa.Table.from_batches([batch])
+        table = table.filter(pc.is_in(table['movieId'], value_set=value_set))
+        positions = np.searchsorted(movie_ids, table['movieId'].to_numpy())
+        ratings = table['rating'].to_numpy()
+
+        counts += np.bincount(positions, minlength=len(movie_ids))
+        sums += np.bincount(positions, weights=ratings, minlength=len(movie_ids))
+        buckets = np.clip(np.rint(ratings * 2).astype(np.int64) - 1, 0, RATING_BUCKETS - 1)
+        histogram += np.bincount(positions * RATING_BUCKETS + buckets, minlength=len(movie_ids) * RATING_BUCKETS).reshape(-1, RATING_BUCKETS)
+
+    # Same columns as build_rating_stats
+    rated = counts > 0
+    bucket_names = [f"{(bucket + 1) / 2:.1f}" for bucket in range(RATING_BUCKETS)]
+    rating_stats = pd.DataFrame({
+        'movieId': movie_ids[rated],
+        'rating_count': counts[rated],
+        'rating_sum': sums[rated],
+        'rating_avg': sums[rated] / counts[rated],
+        'histogram': [
+            json.dumps({bucket_names[bucket]: int(count) for bucket, count in enumerate(row) if count})
+            for row in histogram[rated].tolist()
+        ]
+    })
+    ratings = rating_stats[['movieId', 'rating_avg']].rename(columns={'rating_avg': 'rating'})
+    return ratings, rating_stats
+
+def stream_genome_relevance(file_path, output, movie_ids, block_size, stage):
+    # Filter and normalize each batch and append it to the output file
+    value_set = pa.array(movie_ids)
+    column_types = {'movieId': pa.int64(), 'tagId': pa.int64(), 'relevance': pa.float64()}
+
+    with output.open('genome_relevance', GENOME_RELEVANCE_SCHEMA) as writer:
+        for batch in open_csv_batches(file_path, column_types, block_size):
+            stage.rows += batch.num_rows
+            table = pa.Table.from_batches([batch])
+            table = table.filter(pc.is_in(table['movieId'], value_set=value_set))
+            if table.num_rows:
+                writer.write_table(normalize_genome_scores(
+                    table['movieId'].to_numpy(), table['tagId'].to_numpy(), table['relevance'].to_numpy()
+                ))
+
+def process_streaming(data_path, output, block_size=STREAM_BLOCK_SIZE, workers=None):
+    # The small tables fit in memory; ratings.csv and genome-scores.csv are
+    # streamed and filtered against the valid movie ids
+    with Stage('small tables') as stage:
+        movies_metadata, credits, links, movies = read_small_tables(data_path)
+        stage.rows = len(movies_metadata) + len(credits) + len(links) + len(movies)
+        valid_movieIds = valid_movie_ids(movies_metadata, credits, links)
+        movie_ids = np.array(sorted(int(movie_id) for movie_id in valid_movieIds), dtype=np.int64)
+        # Same rows as unify_movieId in the default mode
+        movies_metadata, credits, links, movies = filter_small_tables(valid_movieIds, movies_metadata, credits, links, movies)
+        format_movies_metadata(movies_metadata, workers)
+        format_credits(credits, workers)
+        format_movies(movies)
+        write_small_tables(output, movies_metadata, credits, links, movies)
+    del movies_metadata, credits, links, movies
+
+    with Stage('ratings') as stage:
+        ratings, rating_stats = stream_rating_stats(data_path + 'ratings.csv', movie_ids, block_size, stage)
+        output.write_frame('ratings', ratings)
+        output.write_frame('movie_rating_stats', rating_stats)
+
+    with Stage('genome scores') as stage:
+        write_genome_tags(data_path, output)
+        stream_genome_relevance(data_path + 'genome-scores.csv', output, movie_ids, block_size, stage)
+
+def main():
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description="Process a path argument.")
+    parser.add_argument("path", help="The path to process")
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Stream ratings.csv and genome-scores.csv in record batches with bounded memory."
+    )
+    parser.add_argument("--block-size", type=int, default=STREAM_BLOCK_SIZE >> 20, help="MB of CSV per record batch in --streaming mode")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for parsing the JSON columns (default: all cores, 1 for no pool)")
+    parser.add_argument("--output", default=None, help=f"Output directory (default: <path>/{OUTPUT_DIR}/); the raw CSVs are never modified")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), default='parquet', help="parquet (compressed) or arrow (uncompressed IPC, memory-mapped without a copy)")
+    args = parser.parse_args()
+    
+    # Get the path from the arguments
+    data_path = args.path
+    output = ProcessedOutput(args.output or os.path.join(data_path, OUTPUT_DIR), args.format)
+    sources = ['movies_metadata.csv', 'credits.csv', 'links.csv', 'movies.csv', 'ratings.csv', 'genome-scores.csv', 'genome-tags.csv']
+
+    if args.streaming:
+        process_streaming(data_path, output, args.block_size << 20, args.workers)
+        output.write_manifest(data_path, sources)
+        return
+
+    movies_metadata, credits, links, movies = read_small_tables(data_path)
+    genome_scores = pd.read_csv(open(data_path + 'genome-scores.csv','r', newline=None))
+    ratings = pd.read_csv(open(data_path + 'ratings.csv','r', newline=None))
+
+    movies_metadata, credits, links, genome_scores, movies, ratings = unify_movieId(
+        movies_metadata, credits, links, genome_scores, movies, ratings
+    )
+
+    format_movies_metadata(movies_metadata, args.workers)
+    format_credits(credits, args.workers)
+    format_movies(movies)
+
+    # The JSON relevances column is only built by the database, see
+    # buildGenomeScores in import_db.py
+    write_genome_tags(data_path, output)
+    genome_relevance = genome_relevance_table(genome_scores)
+    with output.open('genome_relevance', genome_relevance.schema) as writer:
+        writer.write_table(genome_relevance)
 
-    ratings.drop(columns=['userId', 'timestamp'], inplace=True, errors='ignore')
+    ratings = ratings.drop(columns=['userId', 'timestamp'], errors='ignore')
+    rating_stats = build_rating_stats(ratings)
     ratings = ratings.groupby('movieId')['rating'].mean().reset_index()
     ratings = ratings.sort_values(by='movieId')
 
-    movies_metadata.to_csv(data_path + 'movies_metadata.csv', index=False)
-    credits.to_csv(data_path + 'credits.csv', index=False)
-    links.to_csv(data_path + 'links.csv', index=False)
-    movies.to_csv(data_path + 'movies.csv', index=False)
-    ratings.to_csv(data_path + 'ratings.csv', index=False)
-    genome_scores.to_csv(data_path + 'genome-scores.csv', index=False)
+    write_small_tables(output, movies_metadata, credits, links, movies)
+    output.write_frame('ratings', ratings)
+    output.write_frame('movie_rating_stats', rating_stats)
+    output.write_manifest(data_path, sources)
 
     
 if __name__ == '__main__':
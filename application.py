@@ -8,6 +8,8 @@ from movieRatingSystem.dash_main.dash_pages import dashMain as dash_blueprint
 from movieRatingSystem.dash_main.dash_pages import sales_tool
 from movieRatingSystem.auth.auth import auth as auth_blueprint
 from main import main as main_blueprint
+from movieRatingSystem.config.database import db_config
+from movieRatingSystem.utils.reference_data import reference_data
 
 def create_app(name=None):
     app = Flask(__name__,
@@ -43,6 +45,11 @@ def create_app(name=None):
         app.register_blueprint(dash_blueprint)
 
         app = sales_tool(app)
+
+        # Open pooled connections in the background so the first searches don't pay for them
+        db_config.warm_up()
+        # Serve the last dropdown snapshot right away and refresh it from the databases in the background
+        reference_data.start()
         
         @app.route("/")
         def index():
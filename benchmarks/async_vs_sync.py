@@ -0,0 +1,94 @@
+"""Compare the sync and asyncio data-access paths under concurrent users.
+
+Each simulated user runs the same mix of searches back to back. The sync path
+runs users on a thread pool with db_utils.search_movies; the async path runs
+them as coroutines on one event loop with async_db_utils.search_movies.
+
+Usage (from the repository root):
+    python -m benchmarks.async_vs_sync --db cockroach --users 50 --requests 20
+"""
+import argparse
+import asyncio
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from movieRatingSystem.config.async_database import async_db_config
+from movieRatingSystem.config.database import db_config
+from movieRatingSystem.utils import async_db_utils, db_utils
+from movieRatingSystem.utils.count_strategies import count_cache
+
+# A representative mix of what the search page sends
+SEARCH_MIX = [
+    [],
+    [{'type': 'genres', 'value': ['Drama']}],
+    [{'type': 'title', 'value': 'star'}, {'type': 'sort', 'value': 'title_match'}],
+    [{'type': 'years', 'value': [1990, 1999]}, {'type': 'sort', 'value': 'rating'}],
+    [{'type': 'keywords', 'value': ['space']}, {'type': 'rating', 'value': {'min': 6, 'max': 10}}],
+]
+
+def sync_user(db_name, requests, count_strategy):
+    latencies = []
+    for i in range(requests):
+        start_time = perf_counter()
+        session = db_config.create_session(db_name)
+        try:
+            db_utils.search_movies(session, SEARCH_MIX[i % len(SEARCH_MIX)], count_strategy=count_strategy)
+            session.commit()
+        finally:
+            session.close()
+        latencies.append(perf_counter() - start_time)
+    return latencies
+
+async def async_user(db_name, requests, count_strategy):
+    latencies = []
+    for i in range(requests):
+        start_time = perf_counter()
+        result = await async_db_utils.search_movies(db_name, SEARCH_MIX[i % len(SEARCH_MIX)], count_strategy=count_strategy)
+        if result.get('error'):
+            raise RuntimeError(result['details'])
+        latencies.append(perf_counter() - start_time)
+    return latencies
+
+def run_sync(db_name, users, requests, count_strategy):
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        futures = [executor.submit(sync_user, db_name, requests, count_strategy) for _ in range(users)]
+        return [latency for future in futures for latency in future.result()]
+
+async def run_async(db_name, users, requests, count_strategy):
+    try:
+        per_user = await asyncio.gather(*(async_user(db_name, requests, count_strategy) for _ in range(users)))
+        return [latency for latencies in per_user for latency in latencies]
+    finally:
+        await async_db_config.dispose(db_name)
+
+def report(label, latencies, elapsed):
+    latencies = sorted(latencies)
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{label:<6} {len(latencies) / elapsed:9.1f} req/s   "
+          f"p50 {quantiles[49] * 1000:8.1f} ms   p95 {quantiles[94] * 1000:8.1f} ms   "
+          f"p99 {quantiles[98] * 1000:8.1f} ms   max {latencies[-1] * 1000:8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='cockroach', choices=sorted(db_config.db_configs))
+    parser.add_argument('--users', type=int, default=50, help='concurrent simulated users')
+    parser.add_argument('--requests', type=int, default=20, help='searches per user')
+    parser.add_argument('--count-strategy', default='exact', choices=['exact', 'estimated', 'has_more'])
+    args = parser.parse_args()
+
+    print(f"{args.users} users x {args.requests} searches on {args.db} ({args.count_strategy} counts)")
+
+    # Exact counts are cached, start each run cold
+    count_cache.clear()
+    start_time = perf_counter()
+    latencies = run_sync(args.db, args.users, args.requests, args.count_strategy)
+    report('sync', latencies, perf_counter() - start_time)
+
+    count_cache.clear()
+    start_time = perf_counter()
+    latencies = asyncio.run(run_async(args.db, args.users, args.requests, args.count_strategy))
+    report('async', latencies, perf_counter() - start_time)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Compare consistent reads with bounded-staleness reads on CockroachDB.
+
+Runs the same searches and movie lookups twice against the `cockroach`
+backend: first as normal leaseholder reads, then with every transaction at
+AS OF SYSTEM TIME (follower_read_timestamp() by default). The difference is
+only visible on a multi-node cluster with real inter-node latency, e.g.
+
+    cockroach demo --nodes 9 --global --insecure
+
+then load the data with import_db.py, point COCKROACH_DATABASE_URL at a node
+in a region that does not hold the leaseholders, and run (from the repository
+root):
+
+    python -m benchmarks.follower_reads --requests 200
+"""
+import argparse
+import statistics
+from time import perf_counter
+
+from movieRatingSystem.config.database import db_config, apply_read_staleness, staleness_clause
+from movieRatingSystem.utils import db_utils
+from movieRatingSystem.utils.count_strategies import count_cache
+
+SEARCH_MIX = [
+    [],
+    [{'type': 'genres', 'value': ['Drama']}],
+    [{'type': 'years', 'value': [1990, 1999]}, {'type': 'sort', 'value': 'rating'}],
+]
+
+def run(db_name, clause, requests, movie_ids):
+    """Time one read transaction per request and return the latencies in seconds."""
+    latencies = []
+    for i in range(requests):
+        start_time = perf_counter()
+        session = db_config.create_session(db_name)
+        apply_read_staleness(session, clause)
+        try:
+            if i % 2:
+                db_utils.get_movie_by_id(session, movie_ids[i % len(movie_ids)])
+            else:
+                db_utils.search_movies(session, SEARCH_MIX[i % len(SEARCH_MIX)], count_strategy='exact')
+            session.commit()
+        finally:
+            session.close()
+        latencies.append(perf_counter() - start_time)
+        count_cache.clear()
+    return latencies
+
+def report(label, latencies):
+    quantiles = statistics.quantiles(sorted(latencies), n=100)
+    print(f"{label:<32} p50 {quantiles[49] * 1000:8.1f} ms   p95 {quantiles[94] * 1000:8.1f} ms   "
+          f"mean {statistics.mean(latencies) * 1000:8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='cockroach')
+    parser.add_argument('--requests', type=int, default=200, help='read transactions per mode')
+    parser.add_argument('--staleness', default='follower', help="'follower' or a negative interval like '-10s'")
+    args = parser.parse_args()
+
+    session = db_config.create_session(args.db)
+    try:
+        movie_ids = [movie['movieId'] for movie in db_utils.search_movies(session, [], items_per_page=50)['results']]
+    finally:
+        session.close()
+
+    clause = staleness_clause(args.staleness)
+    print(f"{args.requests} read transactions per mode on {args.db}")
+    report('consistent (leaseholder)', run(args.db, None, args.requests, movie_ids))
+    report(f'AS OF SYSTEM TIME {clause}', run(args.db, clause, args.requests, movie_ids))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Measure recall and latency of the ANN genome index against exact neighbours.
+
+Loads the genome vectors from a database, optionally grows them into a
+larger synthetic catalog (copies of real movies with noise added), builds
+the IVF index and compares its top-k with the exact cosine top-k for a
+sample of query movies, for a range of probe counts. Run (from the
+repository root):
+
+    python -m benchmarks.genome_ann_recall --scale 200000 --lists 0 --probes 1 2 4 8 16 32
+
+Recall@k is the share of the exact top-k that the index returns.
+"""
+import argparse
+import statistics
+from time import perf_counter
+
+import numpy as np
+
+from movieRatingSystem.config.database import db_config
+from movieRatingSystem.utils.genome_index import (
+    GenomeANNIndex, load_genome_matrix, GENOME_ANN_LISTS, GENOME_BLOCK_SIZE
+)
+
+def synthetic_catalog(arrays, size, noise, rng):
+    """Grow the catalog to size movies by perturbing randomly chosen real ones."""
+    extra = size - len(arrays['movie_ids'])
+    if extra <= 0:
+        return arrays
+    sources = rng.integers(0, len(arrays['movie_ids']), extra)
+    synthetic = arrays['vectors'][sources].astype(np.float32)
+    synthetic = np.clip(synthetic + rng.normal(0, noise, synthetic.shape), 0, 1)
+    first_id = int(arrays['movie_ids'].max()) + 1
+    return {
+        'movie_ids': np.concatenate((arrays['movie_ids'], np.arange(first_id, first_id + extra, dtype=np.int64))),
+        'tag_ids': arrays['tag_ids'],
+        'vectors': np.concatenate((arrays['vectors'], synthetic.astype(np.float16))),
+        'genres': np.concatenate((arrays['genres'], arrays['genres'][sources])),
+        'genre_names': arrays['genre_names'],
+    }
+
+def exact_top_k(vectors, rows, k):
+    """Exact top-k rows of each query row by brute force, excluding the row itself."""
+    matrix = vectors.astype(np.float32)
+    results = []
+    latencies = []
+    for start in range(0, len(rows), GENOME_BLOCK_SIZE):
+        block_rows = rows[start:start + GENOME_BLOCK_SIZE]
+        start_time = perf_counter()
+        scores = matrix[block_rows] @ matrix.T
+        scores[np.arange(len(block_rows)), block_rows] = -np.inf
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        latencies.append((perf_counter() - start_time) / len(block_rows))
+        results.extend(set(row.tolist()) for row in best)
+    return results, statistics.mean(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='cockroach')
+    parser.add_argument('--scale', type=int, default=0, help='grow the catalog to this many movies (0 = real data only)')
+    parser.add_argument('--noise', type=float, default=0.05, help='noise added to synthetic movies')
+    parser.add_argument('--lists', type=int, default=GENOME_ANN_LISTS, help='IVF lists, 0 for 4 x sqrt(movies)')
+    parser.add_argument('--probes', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    session = db_config.create_session(args.db, read_only=True)
+    try:
+        arrays = load_genome_matrix(session)
+    finally:
+        session.close()
+    arrays = synthetic_catalog(arrays, args.scale, args.noise, rng)
+
+    index = GenomeANNIndex(path='')
+    start_time = perf_counter()
+    index.build(arrays, args.lists)
+    state = index._state
+    print(f"{len(state['movie_ids'])} movies x {len(state['tag_ids'])} tags, {len(state['centroids'])} lists, "
+          f"built in {perf_counter() - start_time:.1f}s")
+
+    rows = rng.choice(len(state['movie_ids']), min(args.queries, len(state['movie_ids'])), replace=False)
+    exact, exact_latency = exact_top_k(state['vectors'], rows, args.k)
+    print(f"exact scan                 {exact_latency * 1000:8.2f} ms/query")
+
+    for probes in args.probes:
+        recalls = []
+        latencies = []
+        for row, truth in zip(rows.tolist(), exact):
+            start_time = perf_counter()
+            found, _ = index.search(state, row, args.k, probes)
+            latencies.append(perf_counter() - start_time)
+            recalls.append(len(truth & set(found.tolist())) / len(truth))
+        quantiles = statistics.quantiles(sorted(latencies), n=100)
+        print(f"probes {probes:<4} recall@{args.k} {statistics.mean(recalls):.3f}   "
+              f"p50 {quantiles[49] * 1000:8.2f} ms   p95 {quantiles[94] * 1000:8.2f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Compare the vectorized genome stage of data_process.py with the old apply path.
+
+The old path grouped genome-scores.csv by movie and ran json.dumps on every
+group, writing a CSV with one huge JSON string per movie. The new one sorts
+and de-duplicates the rows as arrays and writes a typed Parquet table. Run
+(from the repository root) on a downloaded, unprocessed genome-scores.csv:
+
+    python -m benchmarks.genome_pivot data/genome-scores.csv --movies 2000
+"""
+import argparse
+import json
+import os
+import tempfile
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from MovieLens.data_process import write_genome_relevance
+
+def apply_path(genome_scores, output_path):
+    relevances = genome_scores.groupby("movieId").apply(lambda x: json.dumps(dict(zip(x["tagId"], x["relevance"])))).reset_index(name="relevances")
+    relevances.to_csv(output_path, index=False)
+    return relevances
+
+def timed(label, fn, output_path):
+    start_time = perf_counter()
+    fn()
+    elapsed = perf_counter() - start_time
+    print(f"{label:<24} {elapsed:8.2f} s   {os.path.getsize(output_path) / 2 ** 20:8.1f} MB")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='unprocessed genome-scores.csv')
+    parser.add_argument('--movies', type=int, default=0, help='only use the first N movies (0 = all)')
+    args = parser.parse_args()
+
+    genome_scores = pd.read_csv(args.path)
+    if args.movies:
+        first_movies = np.unique(genome_scores['movieId'].to_numpy())[:args.movies]
+        genome_scores = genome_scores[genome_scores['movieId'].isin(first_movies)]
+    print(f"{len(genome_scores):,} rows, {genome_scores['movieId'].nunique():,} movies")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        csv_path = os.path.join(output_dir, 'genome-scores.csv')
+        parquet_path = os.path.join(output_dir, 'genome-relevance.parquet')
+        old = timed('groupby/apply json.dumps', lambda: apply_path(genome_scores, csv_path), csv_path)
+        new = timed('vectorized Parquet', lambda: write_genome_relevance(genome_scores, parquet_path), parquet_path)
+        print(f"speed-up {old / new:.1f}x")
+
+        # Same relevances either way
+        check = pd.read_csv(csv_path, nrows=50)
+        table = pq.read_table(parquet_path).to_pandas()
+        for movie_id, relevances in zip(check['movieId'], check['relevances']):
+            rows = table[table['movieId'] == movie_id]
+            expected = {int(tag_id): relevance for tag_id, relevance in json.loads(relevances).items()}
+            assert dict(zip(rows['tagId'].tolist(), rows['relevance'].tolist())) == expected, movie_id
+        print(f"relevances match for {len(check)} movies")
+
+if __name__ == '__main__':
+    main()
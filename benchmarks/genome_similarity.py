@@ -0,0 +1,86 @@
+"""Compare similar-movie lookups from the genome index with the SQL queries.
+
+Build the index first:
+
+    python -m movieRatingSystem.utils.genome_index --db cockroach
+
+then run (from the repository root):
+
+    python -m benchmarks.genome_similarity --movies 200
+
+For every sampled movie it times four ways of finding similar movies: the
+in-memory index alone, get_similar_movies with the index (lookup plus row
+hydration), get_similar_movies on SQL (genre overlap and tag thresholds)
+and get_movies_by_tags (the info page's old top-3 tag average). Quality is
+reported as the mean genome cosine similarity of the returned movies to
+the query movie.
+"""
+import argparse
+import random
+import statistics
+from time import perf_counter
+
+import numpy as np
+
+from movieRatingSystem.config.database import db_config
+from movieRatingSystem.utils import db_utils
+from movieRatingSystem.utils.genome_index import genome_index
+
+def time_method(name, movie_ids, limit, fn):
+    """Run fn(movie_id) for every movie, returning latencies and mean result similarity."""
+    latencies = []
+    similarities = []
+    for movie_id in movie_ids:
+        start_time = perf_counter()
+        similar_ids = fn(movie_id)
+        latencies.append(perf_counter() - start_time)
+        if similar_ids:
+            cosine = genome_index.cosine(movie_id, similar_ids[:limit])
+            if cosine is not None and not np.isnan(cosine).all():
+                similarities.append(float(np.nanmean(cosine)))
+    return name, latencies, similarities
+
+def report(name, latencies, similarities):
+    quantiles = statistics.quantiles(sorted(latencies), n=100)
+    quality = f"{statistics.mean(similarities):.3f}" if similarities else '   n/a'
+    print(f"{name:<28} p50 {quantiles[49] * 1000:8.2f} ms   p95 {quantiles[94] * 1000:8.2f} ms   "
+          f"mean cosine {quality}   ({len(similarities)}/{len(latencies)} with results)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='cockroach')
+    parser.add_argument('--movies', type=int, default=200, help='movies to look up per method')
+    parser.add_argument('--limit', type=int, default=10, help='similar movies per lookup')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    arrays = genome_index._get_arrays()
+    if arrays is None:
+        print(f"No genome index at {genome_index.path}, build it with python -m movieRatingSystem.utils.genome_index")
+        return
+    movie_ids = random.Random(args.seed).sample(arrays['movie_ids'].tolist(), min(args.movies, len(arrays['movie_ids'])))
+
+    session = db_config.create_session(args.db, read_only=True)
+    try:
+        def by_tags(movie_id):
+            tags = [tag['tag'] for tag in db_utils.get_movie_genome_scores(session, movie_id, limit=3)]
+            return [movie['movieId'] for movie in db_utils.get_movies_by_tags(session, movie_id, tags, limit=args.limit)]
+
+        results = [
+            time_method('index lookup', movie_ids, args.limit,
+                        lambda movie_id: [m for m, _ in genome_index.similar(movie_id, args.limit) or []]),
+            time_method('index + hydration', movie_ids, args.limit,
+                        lambda movie_id: [m['movieId'] for m in db_utils.get_similar_movies(session, movie_id, args.limit)]),
+            time_method('SQL get_similar_movies', movie_ids, args.limit,
+                        lambda movie_id: [m['movieId'] for m in db_utils.get_similar_movies(session, movie_id, args.limit, use_index=False)]),
+            time_method('SQL top-3 tag average', movie_ids, args.limit, by_tags),
+        ]
+    finally:
+        session.close()
+
+    print(f"{len(movie_ids)} movies, {args.limit} similar movies each, on {args.db}")
+    for name, latencies, similarities in results:
+        report(name, latencies, similarities)
+
+if __name__ == '__main__':
+    main()
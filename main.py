@@ -1,8 +1,14 @@
-from flask import Blueprint, render_template, redirect
+from flask import Blueprint, render_template, redirect, jsonify
+from movieRatingSystem.config.database import db_config
 
 main = Blueprint("main", __name__)
 
 @main.route("/")
 def index():
     # Redirect the root URL to /home
-    return redirect("/home")
\ No newline at end of file
+    return redirect("/home")
+
+@main.route("/api/pool-stats")
+def pool_stats():
+    # Live connection pool telemetry per backend, for tuning pool sizes
+    return jsonify(db_config.pool_stats())
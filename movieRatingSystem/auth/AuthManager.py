@@ -13,7 +13,7 @@ The class also provides utility functions to hash and verify passwords using the
 from passlib.context import CryptContext
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy import create_engine
-from sqlalchemy_cockroachdb import run_transaction
+from ..utils.retry import retry_executor
 from ..models.auth_models import User
 import os
 from typing import List
@@ -69,25 +69,25 @@ class AuthManager:
         
     def add_user(self, username: str, email: str, password: str) -> str:
         """
-        Wraps a `run_transaction` call that adds a new user to the database.
+        Wraps a `retry_executor.run_transaction` call that adds a new user to the database.
         """
         AuthManager.validate_length(username, "username")
         AuthManager.validate_length(password, "password")
         hashed_password = self.hash_password(password)
-        return run_transaction(
+        return retry_executor.run_transaction(
+            'auth.add_user',
             sessionmaker(bind=self.engine),
             lambda session: transactions.add_user_transaction(session, username, email, hashed_password))
         
     def login_user(self, username: str, password: str) -> User:
         """
-        Wraps a `run_transaction` call that logs in a user.
+        Wraps a `retry_executor.run_transaction` call that logs in a user and saves its last_active time.
+        The returned user keeps its loaded attributes after the session is closed.
         """
-        session = self.Session()
-        try:
-            user = self._get_user_with_session(session, username, password)
-        finally:
-            self.Session.remove() # Close the session after the transaction
-        return user
+        return retry_executor.run_transaction(
+            'auth.login_user',
+            sessionmaker(bind=self.engine, expire_on_commit=False),
+            lambda session: self._get_user_with_session(session, username, password))
         
     def _get_user_with_session(self, session, username: str, password: str) -> User:
         """
@@ -100,18 +100,20 @@ class AuthManager:
         
     def change_password(self, user_id: str, new_password: str) -> None:
         """
-        Wraps a `run_transaction` call that changes the password of a user.
+        Wraps a `retry_executor.run_transaction` call that changes the password of a user.
         """
         hashed_password = self.hash_password(new_password)
-        return run_transaction(
+        return retry_executor.run_transaction(
+            'auth.change_password',
             sessionmaker(bind=self.engine),
             lambda session: transactions.update_password_transaction(session, user_id, hashed_password))
         
     def remove_user(self, user_id: str) -> None:
         """
-        Wraps a `run_transaction` call that deletes a user from the database.
+        Wraps a `retry_executor.run_transaction` call that deletes a user from the database.
         """
-        return run_transaction(
+        return retry_executor.run_transaction(
+            'auth.remove_user',
             sessionmaker(bind=self.engine),
             lambda session: transactions.delete_user_transaction(session, user_id))
         
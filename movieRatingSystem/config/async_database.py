@@ -0,0 +1,124 @@
+import ssl
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from typing import Any, Dict, Optional, Tuple
+
+from movieRatingSystem.config.database import db_config, apply_read_staleness, DatabaseUnavailableError
+
+# Async driver for each sync driver used in the *_DATABASE_URL settings
+ASYNC_DRIVERS = {
+    'cockroachdb': 'cockroachdb+asyncpg',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+    'mariadb': 'mariadb+aiomysql',
+}
+
+# libpq TLS settings that asyncpg_ssl translates; asyncpg accepts none of them as is
+LIBPQ_SSL_PARAMS = ('sslmode', 'sslrootcert', 'sslcert', 'sslkey')
+
+def asyncpg_ssl(params: Dict[str, str]):
+    """Translate libpq's sslmode/sslrootcert/sslcert/sslkey into asyncpg's 'ssl' argument.
+
+    Follows libpq: 'require' only verifies the server when a root certificate
+    is given, 'verify-ca' checks the chain and 'verify-full' the host name too.
+    """
+    mode = params.get('sslmode', 'prefer')
+    if mode == 'disable':
+        return False
+    if mode not in ('allow', 'prefer', 'require', 'verify-ca', 'verify-full'):
+        raise ValueError(f"Unknown sslmode: {mode}")
+    if mode in ('allow', 'prefer') and len(params) == 1:
+        return mode
+
+    context = ssl.create_default_context(cafile=params.get('sslrootcert'))
+    context.check_hostname = mode == 'verify-full'
+    if mode in ('allow', 'prefer', 'require') and 'sslrootcert' not in params:
+        context.verify_mode = ssl.CERT_NONE
+    if 'sslcert' in params:
+        context.load_cert_chain(params['sslcert'], params.get('sslkey'))
+    return context
+
+def to_async_url(url: str) -> Tuple[Any, Dict[str, Any]]:
+    """Rewrite a sync database URL to the matching asyncio driver.
+
+    Returns the URL and the connect_args it needs: asyncpg takes TLS settings
+    as one 'ssl' argument instead of libpq's query parameters. Other libpq
+    ssl* parameters have no asyncpg equivalent and are rejected.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver known for database backend: {backend}")
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+
+    connect_args = {}
+    if 'asyncpg' in url.drivername:
+        query = dict(url.query)
+        unsupported = sorted(name for name in query if name.startswith('ssl') and name not in LIBPQ_SSL_PARAMS)
+        if unsupported:
+            raise ValueError(f"asyncpg does not support the URL parameters {', '.join(unsupported)}, remove them for the async engine")
+        ssl_params = {name: query.pop(name) for name in LIBPQ_SSL_PARAMS if name in query}
+        if ssl_params:
+            connect_args['ssl'] = asyncpg_ssl(ssl_params)
+            url = url.set(query=query)
+    return url, connect_args
+
+class AsyncDatabaseConfig:
+    """Asyncio engines and sessions for the databases configured in DatabaseConfig."""
+
+    def __init__(self, sync_config=db_config):
+        self.sync_config = sync_config
+        self.engines = {}
+        self.session_factories = {}
+
+    def get_engine(self, db_name: str):
+        """Get or create the AsyncEngine for the specified database."""
+        if db_name not in self.engines:
+            config = self.sync_config.db_configs.get(db_name)
+            if not config or not config['url']:
+                raise ValueError(f"No configuration found for database: {db_name}")
+
+            url, url_connect_args = to_async_url(config['url'])
+            engine_args = dict(config['engine_args'])
+            connect_args = dict(engine_args.get('connect_args', {}), **url_connect_args)
+            if 'asyncpg' in url.drivername and 'connect_timeout' in connect_args:
+                # asyncpg names libpq's connect_timeout 'timeout'
+                connect_args['timeout'] = connect_args.pop('connect_timeout')
+            engine_args['connect_args'] = connect_args
+            self.engines[db_name] = create_async_engine(url, **engine_args)
+            self.session_factories[db_name] = async_sessionmaker(
+                bind=self.engines[db_name], expire_on_commit=False
+            )
+
+        return self.engines[db_name]
+
+    def get_session_factory(self, db_name: str):
+        """Get async session factory for the specified database."""
+        if db_name not in self.session_factories:
+            self.get_engine(db_name)
+        return self.session_factories[db_name]
+
+    def create_session(self, db_name: str, stale_reads: bool = False):
+        """Create a new AsyncSession for the specified database, see DatabaseConfig.create_session.
+
+        Raises DatabaseUnavailableError while the sync config's circuit breaker
+        for the backend is open. Failures on the async engines are not fed
+        back into the breaker.
+        """
+        if not self.sync_config.is_available(db_name):
+            breaker = self.sync_config.breakers[db_name]
+            raise DatabaseUnavailableError(f"{db_name} is down ({breaker.last_error})")
+        session = self.get_session_factory(db_name)()
+        if stale_reads:
+            apply_read_staleness(session.sync_session, self.sync_config.db_configs[db_name].get('read_staleness'))
+        return session
+
+    async def dispose(self, db_name: Optional[str] = None):
+        """Close the pooled connections of one or all async engines."""
+        for name in ([db_name] if db_name else list(self.engines)):
+            if name in self.engines:
+                await self.engines[name].dispose()
+
+# Global async database configuration instance
+async_db_config = AsyncDatabaseConfig()
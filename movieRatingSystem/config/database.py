@@ -1,55 +1,180 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
 import os
-from typing import Dict, Optional
+import threading
+from time import monotonic, perf_counter, sleep
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
+from movieRatingSystem.config.pool_telemetry import PoolTelemetry, timed_pool_class
+from movieRatingSystem.logging_config import get_logger
+
 # Load environment variables
 load_dotenv()
 
+logger = get_logger()
+
+# Circuit breaker: consecutive connection failures before a backend is marked
+# down, and how often a down backend is probed
+DB_BREAKER_FAILURES = int(os.getenv('DB_BREAKER_FAILURES', '3'))
+DB_BREAKER_PROBE_SECONDS = float(os.getenv('DB_BREAKER_PROBE_SECONDS', '5'))
+DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+
+class DatabaseUnavailableError(Exception):
+    """Raised without touching the network while a backend's circuit breaker is open."""
+
+class CircuitBreaker:
+    """Tracks connection failures of one backend and fails fast while it is down.
+
+    Trips after `failure_threshold` consecutive connection failures. While
+    open, a background thread pings the database every `probe_seconds` and
+    closes the breaker again once a ping succeeds.
+    """
+
+    def __init__(self, db_name: str, failure_threshold: int = DB_BREAKER_FAILURES,
+                 probe_seconds: float = DB_BREAKER_PROBE_SECONDS):
+        self.db_name = db_name
+        self.failure_threshold = failure_threshold
+        self.probe_seconds = probe_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def record_success(self):
+        # Called after every statement, only take the lock when there is something to reset
+        if self.failures:
+            with self._lock:
+                self.failures = 0
+
+    def record_failure(self, error: BaseException, engine):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error).strip()
+            if self.is_open or self.failures < self.failure_threshold:
+                return
+            self.opened_at = monotonic()
+        logger.error(f"{self.db_name} is down after {self.failures} connection failures, failing fast until it answers a ping")
+        # Pooled connections are most likely dead as well
+        engine.dispose()
+        threading.Thread(target=self._probe, args=(engine,), name=f'breaker-{self.db_name}', daemon=True).start()
+
+    def _probe(self, engine):
+        while True:
+            sleep(self.probe_seconds)
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+            except Exception as e:
+                self.last_error = str(e).strip()
+                continue
+            with self._lock:
+                down_for = monotonic() - self.opened_at
+                self.opened_at = None
+                self.failures = 0
+            logger.info(f"{self.db_name} is reachable again after {down_for:.1f}s")
+            return
+
+    def status(self) -> Dict[str, object]:
+        opened_at = self.opened_at
+        return {
+            'state': 'up' if opened_at is None else 'down',
+            'failures': self.failures,
+            'down_for': 0.0 if opened_at is None else monotonic() - opened_at,
+            'last_error': self.last_error
+        }
+
+def staleness_clause(setting: Optional[str]) -> Optional[str]:
+    """Translate a read staleness setting into an AS OF SYSTEM TIME expression.
+
+    'follower' reads at follower_read_timestamp(), the newest timestamp any
+    replica can serve; an interval such as '-10s' reads at that fixed
+    staleness; an empty value disables stale reads.
+    """
+    if not setting or setting.lower() in ('off', 'none', 'false'):
+        return None
+    if setting.lower() == 'follower':
+        return 'follower_read_timestamp()'
+    if not setting.startswith('-'):
+        raise ValueError(f"Read staleness must be 'follower' or a negative interval like '-10s', got: {setting}")
+    return "'" + setting.replace("'", "") + "'"
+
+def pool_setting(prefix: str, name: str, default: str, cast=int):
+    """Read a pool setting for one backend, e.g. COCKROACH_POOL_SIZE, falling back to DB_POOL_SIZE."""
+    value = os.getenv(f'{prefix}_{name}', os.getenv(f'DB_{name}', default))
+    if cast is bool:
+        return value.lower() in ('1', 'true', 'yes')
+    return cast(value)
+
 class DatabaseConfig:
     """Database configuration and connection management."""
     
     def __init__(self):
         self.engines = {}
+        self.autocommit_engines = {}
         self.session_factories = {}
+        self.pool_telemetry = {}
+        # Engines are created lazily from request threads and the warm-up thread
+        self._engine_lock = threading.RLock()
         self._load_config()
+        self.breakers = {db_name: CircuitBreaker(db_name) for db_name in self.db_configs}
     
     def _load_config(self):
         """Load database configurations from environment variables."""
         # CockroachDB configuration
         cockroach_config = {
             'url': os.getenv('COCKROACH_DATABASE_URL'),
+            # Bounded-staleness mode for read-only sessions, see staleness_clause
+            'read_staleness': staleness_clause(os.getenv('COCKROACH_READ_STALENESS')),
+            'warm_connections': pool_setting('COCKROACH', 'POOL_WARM', '2'),
             'engine_args': {
-                'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
-                'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
-                'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
-                'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+                'pool_size': pool_setting('COCKROACH', 'POOL_SIZE', '5'),
+                'max_overflow': pool_setting('COCKROACH', 'MAX_OVERFLOW', '10'),
+                'pool_timeout': pool_setting('COCKROACH', 'POOL_TIMEOUT', '30'),
+                'pool_recycle': pool_setting('COCKROACH', 'POOL_RECYCLE', '1800'),
+                # Cloud load balancers drop idle connections, check before use
+                'pool_pre_ping': pool_setting('COCKROACH', 'POOL_PRE_PING', 'true', bool),
+                'connect_args': {
+                    'connect_timeout': DB_CONNECT_TIMEOUT  # Fail fast when the server is unreachable
+                }
             }
         }
         
         # PostgreSQL configuration
         postgres_config = {
             'url': os.getenv('POSTGRES_DATABASE_URL'),
+            'warm_connections': pool_setting('POSTGRES', 'POOL_WARM', '2'),
             'engine_args': {
-                'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
-                'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
-                'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
-                'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+                'pool_size': pool_setting('POSTGRES', 'POOL_SIZE', '5'),
+                'max_overflow': pool_setting('POSTGRES', 'MAX_OVERFLOW', '10'),
+                'pool_timeout': pool_setting('POSTGRES', 'POOL_TIMEOUT', '30'),
+                'pool_recycle': pool_setting('POSTGRES', 'POOL_RECYCLE', '1800'),
+                # Local server, a dropped connection is rare and pre-ping costs a round trip per checkout
+                'pool_pre_ping': pool_setting('POSTGRES', 'POOL_PRE_PING', 'false', bool),
+                'connect_args': {
+                    'connect_timeout': DB_CONNECT_TIMEOUT  # Fail fast when the server is unreachable
+                }
             }
         }
         
         # MariaDB configuration
         mariadb_config = {
             'url': os.getenv('MARIADB_DATABASE_URL'),
+            'warm_connections': pool_setting('MARIADB', 'POOL_WARM', '2'),
             'engine_args': {
-                'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
-                'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
-                'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
-                'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
-                'pool_pre_ping': True,  # Verify connections before usage
+                'pool_size': pool_setting('MARIADB', 'POOL_SIZE', '5'),
+                'max_overflow': pool_setting('MARIADB', 'MAX_OVERFLOW', '10'),
+                'pool_timeout': pool_setting('MARIADB', 'POOL_TIMEOUT', '30'),
+                'pool_recycle': pool_setting('MARIADB', 'POOL_RECYCLE', '1800'),
+                # Verify connections before usage, wait_timeout closes idle ones server-side
+                'pool_pre_ping': pool_setting('MARIADB', 'POOL_PRE_PING', 'true', bool),
                 'connect_args': {
-                    'charset': 'utf8mb4'  # Proper UTF-8 support
+                    'charset': 'utf8mb4',  # Proper UTF-8 support
+                    'connect_timeout': DB_CONNECT_TIMEOUT
                 }
             }
         }
@@ -63,28 +188,163 @@ class DatabaseConfig:
     
     def get_engine(self, db_name: str):
         """Get or create SQLAlchemy engine for the specified database."""
-        if db_name not in self.engines:
+        engine = self.engines.get(db_name)
+        if engine is not None:
+            return engine
+
+        with self._engine_lock:
+            # Another thread may have created it while this one waited
+            if db_name in self.engines:
+                return self.engines[db_name]
+
             config = self.db_configs.get(db_name)
             if not config or not config['url']:
                 raise ValueError(f"No configuration found for database: {db_name}")
-            
-            self.engines[db_name] = create_engine(
+
+            telemetry = PoolTelemetry()
+            engine = create_engine(
                 config['url'],
+                poolclass=timed_pool_class(telemetry),
                 **config['engine_args']
             )
-            self.session_factories[db_name] = sessionmaker(bind=self.engines[db_name])
-        
-        return self.engines[db_name]
+            telemetry.attach(engine.pool)
+            self.pool_telemetry[db_name] = telemetry
+            self._track_health(db_name, engine)
+            self.session_factories[db_name] = sessionmaker(bind=engine)
+            # Published last, so the unlocked fast path never sees a half set up engine
+            self.engines[db_name] = engine
+
+        return engine
     
+    def _track_health(self, db_name: str, engine):
+        """Feed connection failures and successful statements into the backend's breaker."""
+        breaker = self.breakers[db_name]
+
+        @event.listens_for(engine, 'handle_error')
+        def on_error(context):
+            # Only connection-level failures count, not query errors or timeouts
+            if context.connection is None or context.is_disconnect:
+                breaker.record_failure(context.original_exception, engine)
+
+        # A checkout alone proves little (pre-ping may be off), a completed statement does
+        @event.listens_for(engine, 'after_cursor_execute')
+        def on_statement(connection, cursor, statement, parameters, context, executemany):
+            breaker.record_success()
+
+    def warm_up(self, db_names: Optional[List[str]] = None, background: bool = True):
+        """Open each backend's warm_connections ahead of the first request.
+
+        The connections are checked out concurrently and returned to the pool
+        right away, so TCP and TLS setup is paid at startup, not by the first
+        search. Backends without a URL are skipped.
+
+        The engines themselves are created before the background thread starts
+        (no connection is opened for that), so requests arriving meanwhile use
+        the same engines and pools as the warm-up.
+        """
+        if background:
+            for db_name in db_names or list(self.db_configs):
+                if self.db_configs[db_name]['url']:
+                    self.get_engine(db_name)
+            threading.Thread(target=self.warm_up, args=(db_names, False), name='pool-warm-up', daemon=True).start()
+            return
+
+        for db_name in db_names or list(self.db_configs):
+            config = self.db_configs[db_name]
+            count = min(config.get('warm_connections', 0), config['engine_args']['pool_size'])
+            if not config['url'] or count <= 0 or not self.is_available(db_name):
+                continue
+            start_time = perf_counter()
+            engine = self.get_engine(db_name)
+            connections = []
+            errors = []
+
+            def open_connection():
+                try:
+                    connections.append(engine.connect())
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=open_connection) for _ in range(count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            for connection in connections:
+                connection.close()
+
+            if errors:
+                logger.warning(f"Warmed {len(connections)}/{count} {db_name} connections: {str(errors[0]).strip()}")
+            else:
+                logger.info(f"Warmed {count} {db_name} connections in {perf_counter() - start_time:.3f}s")
+
+    def pool_stats(self) -> Dict[str, Dict[str, object]]:
+        """Pool telemetry and health of every backend whose engine has been created."""
+        status = self.backend_status()
+        return {
+            db_name: dict(
+                self.pool_telemetry[db_name].stats(engine.pool),
+                health=status[db_name]['state'],
+                pre_ping=self.db_configs[db_name]['engine_args'].get('pool_pre_ping', False)
+            )
+            for db_name, engine in list(self.engines.items())
+        }
+
+    def is_available(self, db_name: str) -> bool:
+        """False while the backend's circuit breaker is open."""
+        breaker = self.breakers.get(db_name)
+        return not (breaker and breaker.is_open)
+
+    def backend_status(self) -> Dict[str, Dict[str, object]]:
+        """Health of every configured backend, as tracked by the circuit breakers."""
+        return {db_name: breaker.status() for db_name, breaker in self.breakers.items()}
+
     def get_session_factory(self, db_name: str):
         """Get session factory for the specified database."""
-        if db_name not in self.session_factories:
-            self.get_engine(db_name)  # This will create both engine and session factory
+        self.get_engine(db_name)  # This will create both engine and session factory
         return self.session_factories[db_name]
     
-    def create_session(self, db_name: str):
-        """Create a new session for the specified database."""
-        return self.get_session_factory(db_name)()
+    def get_autocommit_engine(self, db_name: str):
+        """Get a view of the engine whose connections run in autocommit mode (same pool)."""
+        if db_name not in self.autocommit_engines:
+            engine = self.get_engine(db_name)
+            with self._engine_lock:
+                if db_name not in self.autocommit_engines:
+                    self.autocommit_engines[db_name] = engine.execution_options(isolation_level='AUTOCOMMIT')
+        return self.autocommit_engines[db_name]
+
+    def create_session(self, db_name: str, stale_reads: bool = False, read_only: bool = False):
+        """Create a new session for the specified database.
+
+        With stale_reads every transaction of the session starts with
+        SET TRANSACTION AS OF SYSTEM TIME, so CockroachDB can serve it from
+        the nearest replica without contending with writes. Only use it for
+        read-only work; writes in such a transaction are rejected.
+
+        A read_only session is never committed. Unless it also uses stale reads
+        (which need a transaction) it runs in autocommit mode, so no BEGIN or
+        COMMIT is sent. Either way it keeps one connection until it is closed.
+        """
+        if not self.is_available(db_name):
+            breaker = self.breakers[db_name]
+            raise DatabaseUnavailableError(f"{db_name} is down ({breaker.last_error})")
+        factory = self.get_session_factory(db_name)
+        clause = self.db_configs[db_name].get('read_staleness') if stale_reads else None
+        autocommit = read_only and not clause
+        session = factory(bind=self.get_autocommit_engine(db_name)) if autocommit else factory()
+        session.info['read_only'] = read_only
+        session.info['autocommit'] = autocommit
+        apply_read_staleness(session, clause)
+        return session
+
+def apply_read_staleness(session, clause: Optional[str]):
+    """Make every transaction of a (sync) session read at the given AS OF SYSTEM TIME."""
+    if not clause:
+        return
+
+    @event.listens_for(session, 'after_begin')
+    def set_transaction_timestamp(session, transaction, connection):
+        connection.exec_driver_sql(f"SET TRANSACTION AS OF SYSTEM TIME {clause}")
 
 # Global database configuration instance
 db_config = DatabaseConfig() 
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""Live connection pool telemetry for the database engines.
+
+Records how long checkouts wait for a connection and how old the pooled
+connections are, next to the pool's own size/checked-out/overflow counters.
+DatabaseConfig.pool_stats() exposes it and the /api/pool-stats route serves
+it, so pool sizes can be tuned from observed data.
+"""
+import threading
+from collections import deque
+from time import monotonic, perf_counter
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+WAIT_SAMPLES = 1000  # Most recent checkout waits kept for the percentiles
+
+class PoolTelemetry:
+    """Checkout wait times and connection ages of one engine's pool."""
+
+    def __init__(self):
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+        self.checkouts = 0
+        self.connections_opened = 0
+        self._created_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.waits.append(seconds)
+            self.checkouts += 1
+
+    def attach(self, pool):
+        """Track the age of every connection the pool opens."""
+
+        @event.listens_for(pool, 'connect')
+        def on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self._created_at[id(dbapi_connection)] = monotonic()
+                self.connections_opened += 1
+
+        @event.listens_for(pool, 'close')
+        def on_close(dbapi_connection, connection_record):
+            with self._lock:
+                self._created_at.pop(id(dbapi_connection), None)
+
+        @event.listens_for(pool, 'close_detached')
+        def on_close_detached(dbapi_connection):
+            with self._lock:
+                self._created_at.pop(id(dbapi_connection), None)
+
+    def stats(self, pool) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self.waits)
+            now = monotonic()
+            ages = [now - created_at for created_at in self._created_at.values()]
+            checkouts = self.checkouts
+            connections_opened = self.connections_opened
+
+        stats: Dict[str, Any] = {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'checkouts': checkouts,
+            'connections_opened': connections_opened,
+            'wait_ms': None,
+            'connection_age_s': None
+        }
+        if waits:
+            stats['wait_ms'] = {
+                'mean': 1000 * sum(waits) / len(waits),
+                'p95': 1000 * waits[int(0.95 * (len(waits) - 1))],
+                'max': 1000 * waits[-1]
+            }
+        if ages:
+            stats['connection_age_s'] = {'min': min(ages), 'mean': sum(ages) / len(ages), 'max': max(ages)}
+        return stats
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection."""
+
+    telemetry: PoolTelemetry
+
+    def _do_get(self):
+        start_time = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.telemetry.record_wait(perf_counter() - start_time)
+
+def timed_pool_class(telemetry: PoolTelemetry):
+    """A TimedQueuePool subclass bound to telemetry.
+
+    A class attribute rather than an instance one, because engine.dispose()
+    recreates the pool from its class.
+    """
+    return type('TimedQueuePool', (TimedQueuePool,), {'telemetry': telemetry})
@@ -10,12 +10,14 @@ import os
 import datetime
 from dotenv import load_dotenv
 from sqlalchemy import select
+from movieRatingSystem.utils.db_utils import get_actor_info, handle_db_error, run_in_session
 
 load_dotenv()
-DATABASE_URL = os.getenv('COCKROACH_DATABASE_URL')
 dash.register_page(__name__, path='/actor')
 
-def layout(actorID=None, **other_unknown_query_strings):
+SEARCH_DATABASES = ('cockroach', 'postgres', 'mariadb')
+
+def layout(actorID=None, db='cockroach', **other_unknown_query_strings):
     return html.Div(
         children=[
             dmc.LoadingOverlay(id='loading-overlay-actor-info',
@@ -25,6 +27,7 @@ def layout(actorID=None, **other_unknown_query_strings):
                                 ),
             html.Button(children='hello', id='test-button-actor', style={'display' : 'None'}),
             html.Span(id='actorID', style={'display' : 'None'},  children=actorID),
+            html.Span(id='actorDB', style={'display' : 'None'}, children=db if db in SEARCH_DATABASES else 'cockroach'),
             html.Div(id='actor-container'),
         ]
     )   
@@ -34,13 +37,24 @@ def layout(actorID=None, **other_unknown_query_strings):
     Output('loading-overlay-actor-info', 'visible'),
     Input('test-button-actor', 'n_clicks'),
     State('actorID', 'children'),
+    State('actorDB', 'children'),
 )
-def showActorInfo(nClicks, actorID):
+def showActorInfo(nClicks, actorID, db_name):
 
-    specificActor = pd.read_sql(f"SELECT a.\"movieId\", a.profile_path, a.actor_id, a.actor_name, a.character, m.poster_path FROM actors a JOIN movie_metadata m ON a.\"movieId\" = m.\"movieId\" WHERE actor_id = {actorID};", DATABASE_URL)
+    # One bound query on the cast JSON, no string-built SQL
+    try:
+        actorInfo = run_in_session(
+            db_name, lambda session: get_actor_info(session, int(actorID)),
+            read_only=True, stale_reads=True, label='showActorInfo'
+        )
+    except Exception as e:
+        error = handle_db_error(db_name, e)
+        return dmc.Alert(title="Database Error", color="red", children=[dmc.Text(error['message']), dmc.Text(error['details'], size="xs", c="dimmed")]), False
+    if not actorInfo:
+        return dmc.Alert(title="Actor not found", color="yellow", children=f"No actor with id {actorID} in {db_name}."), False
 
-    actorName = specificActor['actor_name'].unique()[0]
-    actorPicture = specificActor['profile_path'].unique()[0]
+    actorName = actorInfo['actor']['name']
+    actorPicture = actorInfo['actor']['profile_path']
     actorHTML = html.Div(
         dmc.Center(
             children=[
@@ -68,12 +82,12 @@ def showActorInfo(nClicks, actorID):
                                             children=[
                                                 dmc.Flex(
                                                     children=[
-                                                        dmc.Image(src=f"https://image.tmdb.org/t/p/original{actor['poster_path']}" if actor['poster_path'] else "https://www.themoviedb.org/assets/2/v4/glyphicons/basic/glyphicons-basic-4-user-grey-d8fe957375e70239d6abdd549fd7568c89281b2179b5f4470e2e12895792dfa5.svg", h=150, w=100),
-                                                        dcc.Link(dmc.Text(actor['character'], w=100), href=f"/info?movieID={actor['movieId']}"),
+                                                        dmc.Image(src=f"https://image.tmdb.org/t/p/original{movie['poster_path']}" if movie['poster_path'] else "https://www.themoviedb.org/assets/2/v4/glyphicons/basic/glyphicons-basic-4-user-grey-d8fe957375e70239d6abdd549fd7568c89281b2179b5f4470e2e12895792dfa5.svg", h=150, w=100),
+                                                        dcc.Link(dmc.Text(movie['character'], w=100), href=f"/info?movieID={movie['movieId']}&db={db_name}"),
                                                     ],
                                                     direction='column',
                                                     h=200,
-                                                ) for actor in specificActor.to_dict('records')
+                                                ) for movie in actorInfo['movies']
                                             ],
                                             gap='lg'
                                         )
@@ -10,13 +10,16 @@ import os
 import datetime
 from dotenv import load_dotenv
 from sqlalchemy import select
+from movieRatingSystem.utils.db_utils import handle_db_error
+from movieRatingSystem.utils.detail_documents import get_detail_document
 
 load_dotenv()
-DATABASE_URL = os.getenv('COCKROACH_DATABASE_URL')
 # session = Session()
 dash.register_page(__name__, path='/info')
 
-def layout(movieID=None, **other_unknown_query_strings):
+SEARCH_DATABASES = ('cockroach', 'postgres', 'mariadb')
+
+def layout(movieID=None, db='cockroach', **other_unknown_query_strings):
     return html.Div(
         children=[
             dmc.LoadingOverlay(id='loading-overlay-movie-info',
@@ -26,6 +29,8 @@ def layout(movieID=None, **other_unknown_query_strings):
             ),
             html.Button(children='hello', id='test-button', style={'display' : 'None'}),
             html.Span(id='movieID', style={'display' : 'None'}, children=movieID),
+            # Backend to read from, e.g. /info?movieID=1&db=postgres
+            html.Span(id='movieDB', style={'display' : 'None'}, children=db if db in SEARCH_DATABASES else 'cockroach'),
             dcc.Store(id='movie-recommend-data'),
             html.Div(id='movie-container'),
         ]
@@ -37,14 +42,21 @@ def layout(movieID=None, **other_unknown_query_strings):
     Output('loading-overlay-movie-info', 'visible'),
     Input('test-button', 'n_clicks'),
     State('movieID', 'children'),
+    State('movieDB', 'children'),
 )
-def showMovieInfo(nclicks, movieID):
+def showMovieInfo(nclicks, movieID, db_name):
 
-    specificMovieInfo = pd.read_sql(f"SELECT * FROM specificMovie WHERE \"movieId\" = {movieID};", DATABASE_URL).to_dict('records')[0]
-    specificMovieGenome = pd.read_sql(f"SELECT * FROM genome_non_materialized WHERE \"movieId\" = {movieID} ORDER BY keywordvalue DESC LIMIT 12;", DATABASE_URL).rename(columns={'keywordvalue' : 'value', 'tag' : 'label'})[['label', 'value']]
-    specificMovieActors = pd.read_sql(f"SELECT * FROM actors WHERE \"movieId\" = {movieID};", DATABASE_URL)
+    # One precomputed document per movie: a local mmap or primary key lookup
+    try:
+        specificMovieInfo = get_detail_document(db_name, int(movieID))
+    except Exception as e:
+        error = handle_db_error(db_name, e)
+        return dmc.Alert(title="Database Error", color="red", children=[dmc.Text(error['message']), dmc.Text(error['details'], size="xs", c="dimmed")]), [], False
+    if not specificMovieInfo:
+        return dmc.Alert(title="Movie not found", color="yellow", children=f"No movie with id {movieID} in {db_name}."), [], False
 
-    genomes = specificMovieGenome.head(3)['label'].to_list()
+    specificMovieGenome = pd.DataFrame(specificMovieInfo['genome'], columns=['label', 'value'])
+    specificMovieActors = pd.DataFrame(specificMovieInfo['actors'], columns=['actor_id', 'actor_name', 'character', 'profile_path'])
 
     movieHTML = html.Div(
         dmc.Center(
@@ -52,7 +64,7 @@ def showMovieInfo(nclicks, movieID):
                 dmc.Grid(
                     children=[
                         dmc.GridCol(span=3),
-                        dmc.GridCol(dmc.Title(children=f"{specificMovieInfo['title']} ({specificMovieInfo['release_date'].year})"), span=9),
+                        dmc.GridCol(dmc.Title(children=f"{specificMovieInfo['title']} ({specificMovieInfo['release_date'][:4] if specificMovieInfo['release_date'] else 'n/a'})"), span=9),
                         dmc.GridCol(span=3),
                         dmc.GridCol(
                                     children=[
@@ -123,7 +135,7 @@ def showMovieInfo(nclicks, movieID):
                                                 dmc.Flex(
                                                     children=[
                                                         dmc.Image(src=f"https://image.tmdb.org/t/p/original{actor['profile_path']}" if actor['profile_path'] else "https://www.themoviedb.org/assets/2/v4/glyphicons/basic/glyphicons-basic-4-user-grey-d8fe957375e70239d6abdd549fd7568c89281b2179b5f4470e2e12895792dfa5.svg", h=150, w=100),
-                                                        dcc.Link(dmc.Text(actor['actor_name'], w=100), href=f"/actor?actorID={actor['actor_id']}"),
+                                                        dcc.Link(dmc.Text(actor['actor_name'], w=100), href=f"/actor?actorID={actor['actor_id']}&db={db_name}"),
                                                         dmc.Text(actor['character'], w=100, size='sm'),
                                                     ],
                                                     direction='column',
@@ -149,21 +161,18 @@ def showMovieInfo(nclicks, movieID):
         )
     )
 
-    return movieHTML, genomes, False
+    return movieHTML, specificMovieInfo['similar'], False
 
 @dash.callback(
     Output("similar-movie-results", "children"),
     Input('movie-recommend-data', 'data'),
     State('movieID', 'children'),
+    State('movieDB', 'children'),
 )
-def showMovieRec(genomes, movieID):
-
-
-    for x in range(len(genomes)):
-        genomes[x] = f"'{genomes[x]}'"
+def showMovieRec(similar, movieID, db_name):
 
-    genomeString = f"({', '.join(genomes)})"
-    similarMovies = pd.read_sql(f"SELECT k.\"movieId\", k.score, m.title, m.poster_path FROM (SELECT \"movieId\", AVG(keywordvalue) AS score FROM genome WHERE tag in {genomeString} AND \"movieId\" <> {movieID} AND keywordvalue > 0.8 GROUP BY \"movieId\" ORDER BY score DESC LIMIT 35) k JOIN movie_metadata m ON k.\"movieId\" = m.\"movieId\";", DATABASE_URL)
+    # Precomputed with the detail document
+    similarMovies = pd.DataFrame(similar or [], columns=['movieId', 'title', 'poster_path'])
 
     movieRecsHTML = html.Div(
         children=[
@@ -179,7 +188,7 @@ def showMovieRec(genomes, movieID):
                                 dmc.Flex(
                                     children=[
                                         dmc.Image(src=f"https://image.tmdb.org/t/p/original{movie['poster_path']}" if movie['poster_path'] else "https://www.themoviedb.org/assets/2/v4/glyphicons/basic/glyphicons-basic-4-user-grey-d8fe957375e70239d6abdd549fd7568c89281b2179b5f4470e2e12895792dfa5.svg", h=150, w=100),
-                                        dcc.Link(dmc.Text(movie['title'], w=100), href=f"/info?movieID={movie['movieId']}"),
+                                        dcc.Link(dmc.Text(movie['title'], w=100), href=f"/info?movieID={movie['movieId']}&db={db_name}"),
                                     ],
                                     direction='column',
                                     h=200,
@@ -9,18 +9,24 @@ from dash_iconify import DashIconify
 import os
 from dotenv import load_dotenv
 from movieRatingSystem.utils.db_utils import (
-    with_db_session,
-    initialize_data,
-    search_movies
+    parse_search_conditions,
+    search_movies,
+    search_movies_in_memory
 )
+from movieRatingSystem.utils.result_cache import result_cache
+from movieRatingSystem.utils.reference_data import reference_data
+from movieRatingSystem.utils.catalog_engine import CATALOG_ENGINE_DATABASE
+from movieRatingSystem.utils.search_coordinator import search_coordinator
 from movieRatingSystem.styles.common import COLORS, STYLES
 from movieRatingSystem.logging_config import get_logger
 from datetime import datetime, date
 from time import perf_counter
 from dash.exceptions import PreventUpdate
+from functools import partial
 from typing import Union
 
 ITEMS_PER_PAGE = 20
+SEARCH_BACKENDS = ['cockroach', 'postgres', 'mariadb', 'memory']
 logger = get_logger()
 
 load_dotenv()
@@ -31,20 +37,6 @@ dash.register_page(
 )
 dash._dash_renderer._set_react_version('18.2.0')
 
-# Initialize data with error handling and fallback mechanism
-genres, languages, keywords = initialize_data()
-
-# Log the initialization results
-if any([genres, languages, keywords]):
-    logger.info(f"Successfully initialized data with {len(genres)} genres, {len(languages)} languages, and {len(keywords)} keywords")
-else:
-    logger.warning("All databases failed to provide initial data, using empty lists")
-
-# Create empty lists if any of the data is None
-genres = genres or []
-languages = languages or []
-keywords = keywords or []
-
 def get_rating_color(rating: Union[float, int]) -> str:
     """Return a color based on the rating value."""
     if rating >= 8.0:
@@ -56,8 +48,8 @@ def get_rating_color(rating: Union[float, int]) -> str:
     else:
         return "rgba(192, 57, 43, 0.618)"    # Poor
 
-def create_movie_grid(movies):
-    """Create a grid of movie cards."""
+def create_movie_grid(movies, db_name='cockroach'):
+    """Create a grid of movie cards linking to their details on db_name."""
     if not movies:
         return dmc.Text("No movies found", ta="center", c="dimmed", fz="lg")
     
@@ -67,10 +59,10 @@ def create_movie_grid(movies):
         style={
             '@media (max-width: 600px)': {'gridTemplateColumns': 'repeat(1, 1fr)'}
         },
-        children=[create_movie_card(movie) for movie in movies]
+        children=[create_movie_card(movie, db_name) for movie in movies]
     )
 
-def create_movie_card(movie):
+def create_movie_card(movie, db_name='cockroach'):
     """Create a movie card with rating badge."""
     rating = movie.get('vote_average', 0)
     rating_color = get_rating_color(rating)
@@ -183,7 +175,7 @@ def create_movie_card(movie):
                                                 width=16
                                             )
                                         ),
-                                        href=f"/info?movieID={movie['movieId']}"
+                                        href=f"/info?movieID={movie['movieId']}&db={db_name}"
                                     )
                                 ]
                             )
@@ -197,7 +189,7 @@ def create_movie_card(movie):
 def create_database_section(title, db_name):
     """Create a section for database results with performance metrics and query info."""
     return dmc.GridCol(
-        span=4,
+        span=3,
         children=[
             dmc.Paper(
                 p="md",
@@ -314,402 +306,456 @@ def handle_db_result(result, db_name):
         False
     )
 
-layout = [
-    html.Div(
-        style={**STYLES['page_container'], 'maxWidth': '95%', 'margin': '0 auto'},
-        children=[
-            # Central Search Panel
-            dmc.Stack(
-                pos="relative",
-                children=[
-                    dmc.LoadingOverlay(
-                        id="search-panel-loading",
-                        visible=True,
-                        overlayProps={"radius": "sm", "blur": 2},
-                        zIndex=10,
-                    ),
-                    dmc.Paper(
-                        p="md",
-                        shadow="md",
-                        withBorder=True,
-                        style={'marginBottom': '30px'},
-                        children=[
-                            # Search Header
-                            dmc.Text("Movie Search", size="xl", fw=700, style={'marginBottom': '20px'}),
+def layout(**other_unknown_query_strings):
+    # Dropdown data comes from the in-memory cache, never from a database round trip
+    genres, languages, keywords = reference_data.get()
+    return [
+        html.Div(
+            style={**STYLES['page_container'], 'maxWidth': '95%', 'margin': '0 auto'},
+            children=[
+                # Central Search Panel
+                dmc.Stack(
+                    pos="relative",
+                    children=[
+                        dmc.LoadingOverlay(
+                            id="search-panel-loading",
+                            visible=True,
+                            overlayProps={"radius": "sm", "blur": 2},
+                            zIndex=10,
+                        ),
+                        dmc.Paper(
+                            p="md",
+                            shadow="md",
+                            withBorder=True,
+                            style={'marginBottom': '30px'},
+                            children=[
+                                # Search Header
+                                dmc.Text("Movie Search", size="xl", fw=700, style={'marginBottom': '20px'}),
                             
-                            # Search Filters
-                            dmc.Grid(
-                                gutter="md",
-                                children=[
-                                    # Left Column - Basic Filters
-                                    dmc.GridCol(
-                                        span=4,
-                                        children=dmc.Paper(
-                                            p="md",
-                                            shadow="sm",
-                                            withBorder=True,
-                                            children=[
-                                                dmc.Text("Basic Filters", size="md", fw=500, style={'marginBottom': '10px'}),
-                                                dmc.TextInput(
-                                                    label="Search by Title",
-                                                    placeholder="Enter movie title...",
-                                                    leftSection=DashIconify(icon="ic:round-search"),
-                                                    id='title-search',
-                                                    style=STYLES['input']
-                                                ),
-                                                dmc.MultiSelect(
-                                                    data=genres,
-                                                    label='Genres',
-                                                    placeholder="Select genres...",
-                                                    id='genre-select',
-                                                    searchable=True,
-                                                    style=STYLES['input']
-                                                ),
-                                                dmc.MultiSelect(
-                                                    data=languages,
-                                                    label='Languages',
-                                                    placeholder="Select languages...",
-                                                    id='language-select',
-                                                    searchable=True,
-                                                    style=STYLES['input']
-                                                ),
-                                            ]
-                                        )
-                                    ),
+                                # Search Filters
+                                dmc.Grid(
+                                    gutter="md",
+                                    children=[
+                                        # Left Column - Basic Filters
+                                        dmc.GridCol(
+                                            span=4,
+                                            children=dmc.Paper(
+                                                p="md",
+                                                shadow="sm",
+                                                withBorder=True,
+                                                children=[
+                                                    dmc.Text("Basic Filters", size="md", fw=500, style={'marginBottom': '10px'}),
+                                                    dmc.TextInput(
+                                                        label="Search by Title",
+                                                        placeholder="Enter movie title...",
+                                                        leftSection=DashIconify(icon="ic:round-search"),
+                                                        id='title-search',
+                                                        style=STYLES['input']
+                                                    ),
+                                                    dmc.MultiSelect(
+                                                        data=genres,
+                                                        label='Genres',
+                                                        placeholder="Select genres...",
+                                                        id='genre-select',
+                                                        searchable=True,
+                                                        style=STYLES['input']
+                                                    ),
+                                                    dmc.MultiSelect(
+                                                        data=languages,
+                                                        label='Languages',
+                                                        placeholder="Select languages...",
+                                                        id='language-select',
+                                                        searchable=True,
+                                                        style=STYLES['input']
+                                                    ),
+                                                ]
+                                            )
+                                        ),
                                     
-                                    # Middle Column - Advanced Filters
-                                    dmc.GridCol(
-                                        span=4,
-                                        children=dmc.Paper(
-                                            p="md",
-                                            shadow="sm",
-                                            withBorder=True,
-                                            children=[
-                                                dmc.Text("Advanced Filters", size="md", fw=500, style={'marginBottom': '10px'}),
-                                                dmc.YearPickerInput(
-                                                    type="range",
-                                                    label="Release Year Range",
-                                                    placeholder="Select years",
-                                                    id='year-range-select',
-                                                    style=STYLES['input']
-                                                ),
-                                                dmc.Text(
-                                                    "Movie Rating (0-10)",
-                                                    size="sm",
-                                                    fw=500,
-                                                    style={'marginTop': '10px'}
-                                                ),
-                                                dmc.Text(
-                                                    "Filter movies by their average user rating",
-                                                    size="xs",
-                                                    c="dimmed",
-                                                    style={'marginBottom': '5px'}
-                                                ),
-                                                dmc.RangeSlider(
-                                                    id='rating-range',
-                                                    min=0,
-                                                    max=10,
-                                                    step=0.5,
-                                                    value=[0, 10],
-                                                    marks=[
-                                                        {"value": i, "label": str(i)}
-                                                        for i in range(0, 11, 1)
-                                                    ],
-                                                    minRange=0.5,
-                                                    style=STYLES['input']
-                                                ),
-                                                dmc.Text(
-                                                    "Movie Runtime (minutes)",
-                                                    size="sm",
-                                                    fw=500,
-                                                    style={'marginTop': '20px'}
-                                                ),
-                                                dmc.Text(
-                                                    "Filter movies by their duration",
-                                                    size="xs",
-                                                    c="dimmed",
-                                                    style={'marginBottom': '5px'}
-                                                ),
-                                                dmc.RangeSlider(
-                                                    id='runtime-range',
-                                                    min=0,
-                                                    max=240,
-                                                    step=15,
-                                                    value=[0, 240],
-                                                    marks=[
-                                                        {"value": i, "label": str(i)}
-                                                        for i in range(0, 241, 30)
-                                                    ],
-                                                    minRange=15,
-                                                    style=STYLES['input']
-                                                ),
-                                            ]
-                                        )
-                                    ),
+                                        # Middle Column - Advanced Filters
+                                        dmc.GridCol(
+                                            span=4,
+                                            children=dmc.Paper(
+                                                p="md",
+                                                shadow="sm",
+                                                withBorder=True,
+                                                children=[
+                                                    dmc.Text("Advanced Filters", size="md", fw=500, style={'marginBottom': '10px'}),
+                                                    dmc.YearPickerInput(
+                                                        type="range",
+                                                        label="Release Year Range",
+                                                        placeholder="Select years",
+                                                        id='year-range-select',
+                                                        style=STYLES['input']
+                                                    ),
+                                                    dmc.Text(
+                                                        "Movie Rating (0-10)",
+                                                        size="sm",
+                                                        fw=500,
+                                                        style={'marginTop': '10px'}
+                                                    ),
+                                                    dmc.Text(
+                                                        "Filter movies by their average user rating",
+                                                        size="xs",
+                                                        c="dimmed",
+                                                        style={'marginBottom': '5px'}
+                                                    ),
+                                                    dmc.RangeSlider(
+                                                        id='rating-range',
+                                                        min=0,
+                                                        max=10,
+                                                        step=0.5,
+                                                        value=[0, 10],
+                                                        marks=[
+                                                            {"value": i, "label": str(i)}
+                                                            for i in range(0, 11, 1)
+                                                        ],
+                                                        minRange=0.5,
+                                                        style=STYLES['input']
+                                                    ),
+                                                    dmc.Text(
+                                                        "Movie Runtime (minutes)",
+                                                        size="sm",
+                                                        fw=500,
+                                                        style={'marginTop': '20px'}
+                                                    ),
+                                                    dmc.Text(
+                                                        "Filter movies by their duration",
+                                                        size="xs",
+                                                        c="dimmed",
+                                                        style={'marginBottom': '5px'}
+                                                    ),
+                                                    dmc.RangeSlider(
+                                                        id='runtime-range',
+                                                        min=0,
+                                                        max=240,
+                                                        step=15,
+                                                        value=[0, 240],
+                                                        marks=[
+                                                            {"value": i, "label": str(i)}
+                                                            for i in range(0, 241, 30)
+                                                        ],
+                                                        minRange=15,
+                                                        style=STYLES['input']
+                                                    ),
+                                                ]
+                                            )
+                                        ),
                                     
-                                    # Right Column - Tags and Sort
-                                    dmc.GridCol(
-                                        span=4,
-                                        children=dmc.Paper(
-                                            p="md",
-                                            shadow="sm",
-                                            withBorder=True,
-                                            children=[
-                                                dmc.Text("Additional Options", size="md", fw=500, style={'marginBottom': '10px'}),
-                                                dmc.MultiSelect(
-                                                    data=keywords,
-                                                    label='Movie Keywords',
-                                                    placeholder="Select keywords...",
-                                                    id='type-select',
-                                                    searchable=True,
-                                                    style=STYLES['input']
-                                                ),
-                                                dmc.Switch(
-                                                    id='adult-content',
-                                                    label="Include Adult Content",
-                                                    size="md",
-                                                    style=STYLES['input']
-                                                ),
-                                                dmc.Select(
-                                                    data=[
-                                                        {"value": "popularity", "label": "Sort by Popularity"},
-                                                        {"value": "rating", "label": "Sort by Rating"},
-                                                        {"value": "release_date", "label": "Sort by Release Date"},
-                                                        {"value": "title", "label": "Sort by Title"}
-                                                    ],
-                                                    label="Sort Results",
-                                                    placeholder="Select sorting option...",
-                                                    id='sort-by-select',
-                                                    value="popularity",
-                                                    style=STYLES['input']
-                                                ),
-                                            ]
-                                        )
-                                    ),
-                                ]
-                            ),
+                                        # Right Column - Tags and Sort
+                                        dmc.GridCol(
+                                            span=4,
+                                            children=dmc.Paper(
+                                                p="md",
+                                                shadow="sm",
+                                                withBorder=True,
+                                                children=[
+                                                    dmc.Text("Additional Options", size="md", fw=500, style={'marginBottom': '10px'}),
+                                                    dmc.MultiSelect(
+                                                        data=keywords,
+                                                        label='Movie Keywords',
+                                                        placeholder="Select keywords...",
+                                                        id='type-select',
+                                                        searchable=True,
+                                                        style=STYLES['input']
+                                                    ),
+                                                    dmc.Switch(
+                                                        id='adult-content',
+                                                        label="Include Adult Content",
+                                                        size="md",
+                                                        style=STYLES['input']
+                                                    ),
+                                                    dmc.Switch(
+                                                        id='bypass-cache',
+                                                        label="Bypass Result Cache (cold timings)",
+                                                        size="md",
+                                                        checked=not result_cache.enabled,
+                                                        style=STYLES['input']
+                                                    ),
+                                                    dmc.Select(
+                                                        data=[
+                                                            {"value": "popularity", "label": "Sort by Popularity"},
+                                                            {"value": "rating", "label": "Sort by Rating"},
+                                                            {"value": "release_date", "label": "Sort by Release Date"},
+                                                            {"value": "title", "label": "Sort by Title"},
+                                                            {"value": "title_match", "label": "Sort by Title Match"}
+                                                        ],
+                                                        label="Sort Results",
+                                                        placeholder="Select sorting option...",
+                                                        id='sort-by-select',
+                                                        value="popularity",
+                                                        style=STYLES['input']
+                                                    ),
+                                                ]
+                                            )
+                                        ),
+                                    ]
+                                ),
                             
-                            # Search Button
-                            dmc.Group(
-                                justify="center",
-                                mt="xl",
-                                children=[
-                                    dmc.Button(
-                                        'Search Movies',
-                                        id='submit-selection',
-                                        variant="filled",
-                                        size="md",
-                                        leftSection=DashIconify(icon="ic:round-search"),
-                                        style=STYLES['button']
-                                    )
-                                ]
-                            )
-                        ]
-                    )
-                ]
-            ),
+                                # Search Button
+                                dmc.Group(
+                                    justify="center",
+                                    mt="xl",
+                                    children=[
+                                        dmc.Button(
+                                            'Search Movies',
+                                            id='submit-selection',
+                                            variant="filled",
+                                            size="md",
+                                            leftSection=DashIconify(icon="ic:round-search"),
+                                            style=STYLES['button']
+                                        )
+                                    ]
+                                )
+                            ]
+                        )
+                    ]
+                ),
             
-            # Results Grid with spacing between columns
-            dmc.Grid(
-                gutter="xl",
-                style={'marginTop': '20px'},
-                children=[
-                    create_database_section("CockroachDB Results", "cockroach"),
-                    create_database_section("PostgreSQL Results", "postgres"),
-                    create_database_section("MariaDB Results", "mariadb"),
-                ]
+                # Results Grid with spacing between columns
+                dmc.Grid(
+                    gutter="xl",
+                    style={'marginTop': '20px'},
+                    children=[
+                        create_database_section("CockroachDB Results", "cockroach"),
+                        create_database_section("PostgreSQL Results", "postgres"),
+                        create_database_section("MariaDB Results", "mariadb"),
+                        create_database_section("In-Memory Results", "memory"),
+                    ]
+                )
+            ]
+        ),
+
+        dcc.Store(id='query-info-cockroach'),
+        dcc.Store(id='query-info-postgres'),
+        dcc.Store(id='query-info-mariadb'),
+        dcc.Store(id='page-cursors-cockroach', data={}),
+        dcc.Store(id='page-cursors-postgres', data={}),
+        dcc.Store(id='page-cursors-mariadb', data={}),
+        dcc.Store(id='query-info-memory'),
+        dcc.Store(id='page-cursors-memory', data={}),
+        # Backend -> coordinator job id for searches still in flight
+        dcc.Store(id='search-jobs', data={}),
+        dcc.Interval(id='search-poll', interval=250, disabled=True),
+    ]
+
+def format_total_results(page_data):
+    """Format the result total according to how precise the count strategy is."""
+    total_count = page_data.get('total_count', 0)
+    if page_data.get('count_strategy') == 'estimated':
+        return f"about {total_count:,}"
+    if page_data.get('count_strategy') == 'has_more' and page_data.get('has_more'):
+        return f"{total_count:,}+"
+    return f"{total_count:,}"
+
+def build_search_conditions(sort_by, title=None, genres=None, languages=None, years=None,
+                            rating_range=None, runtime_range=None, keywords=None, include_adult=False):
+    """Build the structured search conditions from the search panel values."""
+    conditions = []
+
+    # Process title
+    if title is not None:
+        conditions.append({
+            'type': 'title',
+            'value': title
+        })
+        logger.info(f"Added title filter: {title}")
+
+    # Process genres
+    if genres is not None:
+        conditions.append({
+            'type': 'genres',
+            'value': genres
+        })
+        logger.info(f"Added genre filter: {genres}")
+
+    # Process languages (using ISO codes from MultiSelect values)
+    if languages is not None:
+        conditions.append({
+            'type': 'languages',
+            'value': languages  # MultiSelect already returns ISO codes as values
+        })
+        logger.info(f"Added language filter (ISO codes): {languages}")
+
+    # Process years
+    if years and isinstance(years, list) and len(years) == 2 and all(years):
+        try:
+            year_range = [y[:4] if y else None for y in years]
+            if all(year_range):  # Only add if both years are valid
+                conditions.append({
+                    'type': 'years',
+                    'value': (year_range[0], year_range[1])
+                })
+                logger.info(f"Added year filter: {year_range[0]} to {year_range[1]}")
+        except (TypeError, IndexError) as e:
+            logger.warning(f"Invalid year format: {years}. Error: {str(e)}")
+
+    # Process rating range
+    if rating_range is not None:
+        conditions.append({
+            'type': 'rating',
+            'value': {
+                'min': rating_range[0],
+                'max': rating_range[1]
+            }
+        })
+        logger.info(f"Added rating filter: {rating_range[0]} to {rating_range[1]}")
+
+    # Process runtime range
+    if runtime_range is not None:
+        conditions.append({
+            'type': 'runtime',
+            'value': {
+                'min': runtime_range[0],
+                'max': runtime_range[1]
+            }
+        })
+        logger.info(f"Added runtime filter: {runtime_range[0]} to {runtime_range[1]}")
+
+    # Process adult content
+    if include_adult is not None:
+        conditions.append({
+            'type': 'adult',
+            'value': False
+        })
+        logger.info("Excluded adult content")
+
+    # Process keywords
+    if keywords is not None:
+        conditions.append({
+            'type': 'keywords',
+            'value': keywords
+        })
+        logger.info(f"Added keyword filters: {keywords}")
+
+    # Add sorting condition
+    if sort_by is not None:
+        conditions.append({
+            'type': 'sort',
+            'value': sort_by
+        })
+        logger.info(f"Added sorting: {sort_by}")
+    # If no search has been performed yet, show default movies sorted by popularity
+    else:
+        conditions.append({
+            'type': 'sort',
+            'value': 'popularity'
+        })
+
+    return conditions
+
+def run_backend_search(db_name, conditions, page, page_cursors, cache_key, session):
+    """Search one backend and store the page in the result cache.
+
+    Runs on a search coordinator thread with a session for that backend. The
+    cached page holds only what the search returned; request-specific fields
+    such as the paging mode are added by finish_backend_search.
+    """
+    start_time = perf_counter()
+
+    logger.info(f"Final conditions list for {db_name}: {conditions}")
+    cursor = (page_cursors or {}).get(str(page))
+    if db_name == 'memory':
+        page_data = search_movies_in_memory(session, conditions, page=page)
+    else:
+        page_data = search_movies(session, conditions, page=page, cursor=cursor)
+
+    # Calculate query performance
+    query_time = perf_counter() - start_time
+
+    if cache_key:
+        result_cache.set(cache_key, page_data)
+    cache_status = 'miss' if cache_key else 'bypass'
+    return finish_backend_search(db_name, page, page_cursors, page_data, query_time, cache_status)
+
+def finish_backend_search(db_name, page, page_cursors, page_data, query_time, cache_status):
+    """Produce the page results, query info and updated cursors for one backend."""
+    page_cursors = dict(page_cursors or {})
+    pagination = 'keyset' if str(page) in page_cursors else 'offset'
+
+    # Remember where the next page starts so it can be fetched with a seek
+    if page_data.get('next_cursor'):
+        page_cursors[str(page + 1)] = page_data['next_cursor']
+
+    # Get the SQL query statement
+    cache_stats = result_cache.backend_stats(db_name)
+    query_info = {
+        'query_time': f"{query_time:.3f}s",
+        'query_statement': page_data.get('query_statement', 'N/A'),
+        'total_results': format_total_results(page_data),
+        'pagination': pagination,
+        'cache': f"{cache_status} ({cache_stats['hits']} hits / {cache_stats['misses']} misses)"
+    }
+
+    # Calculate total pages, at least up to the current page
+    total_pages = max((page_data.get('total_count', 0) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE, page)
+
+    # Log results
+    movie_titles = [movie.get('title', 'Unknown') for movie in page_data.get('results', [])]
+    logger.info(f"{db_name} results - Page {page}/{total_pages} (cache {cache_status}): {', '.join(movie_titles)}")
+
+    return page_data.get('results', []), total_pages, query_info, page_cursors
+
+def render_backend_outcome(outcome, db_name='cockroach'):
+    """Turn a coordinator outcome into the outputs of one backend column."""
+    if outcome['status'] == 'done':
+        movies, total_pages, query_info, page_cursors = outcome['result']
+        metrics = [
+            f"Query Time: {query_info['query_time']}",
+            f"Queue Wait: {outcome['queue_wait']:.3f}s",
+            f"Total Results: {query_info['total_results']}",
+            f"Paging: {query_info['pagination']}",
+            f"Cache: {query_info['cache']}"
+        ]
+        hover_content = [
+            dmc.Text("SQL Query:", size="sm", fw=700),
+            dmc.Code(
+                query_info['query_statement'],
+                block=True,
+                color="blue",
+                style={'whiteSpace': 'pre-wrap', 'overflowX': 'auto', 'maxHeight': '400px'}
             )
         ]
-    ),
-
-    dcc.Store(id='query-info-cockroach'),
-    dcc.Store(id='query-info-postgres'),
-    dcc.Store(id='query-info-mariadb'),
-]
-
-def update_movie_results(db_name, session, n_clicks, page, sort_by, title=None, genres=None, languages=None, 
-                      years=None, rating_range=None, runtime_range=None, keywords=None, include_adult=False):
-    """Generic function to update movie results for any database."""
-    if not page:
-        page = 1
-    
-    try:
-        start_time = perf_counter()
-        conditions = []
-        
-
-        # Process title
-        if title is not None:
-            conditions.append({
-                'type': 'title',
-                'value': title
-            })
-            logger.info(f"Added title filter: {title}")
-
-        # Process genres
-        if genres is not None:
-            conditions.append({
-                'type': 'genres',
-                'value': genres
-            })
-            logger.info(f"Added genre filter: {genres}")
-
-        # Process languages (using ISO codes from MultiSelect values)
-        if languages is not None:
-            conditions.append({
-                'type': 'languages',
-                'value': languages  # MultiSelect already returns ISO codes as values
-            })
-            logger.info(f"Added language filter (ISO codes): {languages}")
-
-            # Process years
-        if years and isinstance(years, list) and len(years) == 2 and all(years):
-            try:
-                year_range = [y[:4] if y else None for y in years]
-                if all(year_range):  # Only add if both years are valid
-                    conditions.append({
-                        'type': 'years',
-                        'value': (year_range[0], year_range[1])
-                    })
-                    logger.info(f"Added year filter: {year_range[0]} to {year_range[1]}")
-            except (TypeError, IndexError) as e:
-                logger.warning(f"Invalid year format: {years}. Error: {str(e)}")
-
-        # Process rating range
-        if rating_range is not None:
-            conditions.append({
-                'type': 'rating',
-                'value': {
-                    'min': rating_range[0],
-                    'max': rating_range[1]
-                }
-            })
-            logger.info(f"Added rating filter: {rating_range[0]} to {rating_range[1]}")
-
-        # Process runtime range
-        if runtime_range is not None:
-            conditions.append({
-                'type': 'runtime',
-                'value': {
-                    'min': runtime_range[0],
-                    'max': runtime_range[1]
-                }
-            })
-            logger.info(f"Added runtime filter: {runtime_range[0]} to {runtime_range[1]}")
-
-        # Process adult content
-        if include_adult is not None:
-            conditions.append({
-                'type': 'adult',
-                'value': False
-            })
-            logger.info("Excluded adult content")
-
-        # Process keywords
-        if keywords is not None:
-            conditions.append({
-                'type': 'keywords',
-                'value': keywords
-            })
-            logger.info(f"Added keyword filters: {keywords}")
-
-        # Add sorting condition
-        if sort_by is not None:
-            conditions.append({
-                'type': 'sort',
-                'value': sort_by
-            })
-            logger.info(f"Added sorting: {sort_by}")
-        # If no search has been performed yet, show default movies sorted by popularity
-        else:
-            conditions.append({
-                'type': 'sort',
-                'value': 'popularity'
-            })
-
-        # Execute search with structured conditions
-        logger.info(f"Final conditions list for {db_name}: {conditions}")
-        page_data = search_movies(session, conditions, page=page)
-        
-        # Calculate query performance
-        query_time = perf_counter() - start_time
-        
-        # Get the SQL query statement
-        query_info = {
-            'query_time': f"{query_time:.3f}s",
-            'query_statement': page_data.get('query_statement', 'N/A'),
-            'total_results': page_data.get('total_count', 0)
-        }
-        
-        # Calculate total pages
-        total_pages = (page_data.get('total_count', 0) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
-        
-        # Log results
-        movie_titles = [movie.get('title', 'Unknown') for movie in page_data.get('results', [])]
-        logger.info(f"{db_name} results - Page {page}/{total_pages}: {', '.join(movie_titles)}")
-        
-        return create_movie_grid(page_data.get('results', [])), total_pages, False, query_info
-    except Exception as e:
-        logger.error(f"Error updating {db_name} results: {str(e)}", exc_info=True)
-        return [], 1, False, {'query_time': 'N/A', 'query_statement': 'Error occurred', 'total_results': 0}
-
-# Callbacks for each database
-@callback(
-    [Output('movie-grid-cockroach', 'children', allow_duplicate=True),
-     Output('pagination-cockroach', 'total'),
-     Output('query-info-cockroach', 'data'),
-     Output('performance-metrics-cockroach', 'children', allow_duplicate=True),
-     Output('query-info-hover-cockroach', 'children', allow_duplicate=True)],
-    [Input('submit-selection', 'n_clicks'),
-     Input('pagination-cockroach', 'value'),
-     Input('sort-by-select', 'value')],
-    [State('title-search', 'value'),
-     State('genre-select', 'value'),
-     State('language-select', 'value'),
-     State('year-range-select', 'value'),
-     State('rating-range', 'value'),
-     State('runtime-range', 'value'),
-     State('type-select', 'value'),
-     State('adult-content', 'value')],
-     prevent_initial_call='initial_duplicate',
-     running=[(Output('results-loading-cockroach', 'visible'), True, False)]
-)
-@with_db_session
-def update_cockroach_results(session, n_clicks, page, sort_by, title=None, genres=None, languages=None, years=None, 
-                           rating_range=None, runtime_range=None, keywords=None, include_adult=False):
-    """Update movie grid with paginated results for CockroachDB."""
-    result = update_movie_results('cockroach', session, n_clicks, page, sort_by, title, genres, languages,
-                              years, rating_range, runtime_range, keywords, include_adult)
-    grid, total_pages, _, query_info = result
-    
-    # Create performance metrics text
-    metrics = [
-        f"Query Time: {query_info['query_time']}",
-        f"Total Results: {query_info['total_results']}"
-    ]
-    
-    # Create query info hover card content
-    hover_content = [
-        dmc.Text("SQL Query:", size="sm", fw=700),
-        dmc.Code(
-            query_info['query_statement'],
-            block=True,
-            color="blue",
-            style={'whiteSpace': 'pre-wrap', 'overflowX': 'auto', 'maxHeight': '400px'}
+        # The in-memory engine has no detail rows of its own, link to its source database
+        detail_db = CATALOG_ENGINE_DATABASE if db_name == 'memory' else db_name
+        return create_movie_grid(movies, detail_db), total_pages, query_info, " | ".join(metrics), hover_content, page_cursors, False
+
+    if outcome['status'] == 'down':
+        health = outcome['health']
+        grid = dmc.Alert(
+            title="Database Down",
+            color="gray",
+            children=[
+                dmc.Text(f"Not queried: the last {health['failures']} connection attempts failed. "
+                         f"Retrying in the background (down for {health['down_for']:.0f}s).", size="sm"),
+                dmc.Text(health.get('last_error') or '', size="xs", c="dimmed", mt="xs")
+            ]
         )
-    ]
-    
-    return grid, total_pages, query_info, " | ".join(metrics), hover_content
+        query_info = {'query_time': 'N/A', 'query_statement': 'Database down', 'total_results': 0, 'pagination': 'N/A'}
+        return grid, 1, query_info, "Status: down", [dmc.Code("Database down", color="gray")], {}, False
+
+    if outcome['status'] == 'timeout':
+        grid, _, _ = handle_db_result({
+            'error': True,
+            'message': f"Search timed out after {outcome['elapsed']:.1f}s.",
+            'details': 'The other databases were not held up by this one.'
+        }, None)
+        metrics = f"Query Time: timed out ({outcome['elapsed']:.1f}s)"
+    else:
+        grid, _, _ = handle_db_result(outcome['error'], None)
+        metrics = "Query Time: N/A"
+
+    query_info = {'query_time': 'N/A', 'query_statement': 'Error occurred', 'total_results': 0, 'pagination': 'N/A'}
+    hover_content = [dmc.Code("Error occurred", color="red")]
+    return grid, 1, query_info, metrics, hover_content, {}, False
 
 @callback(
-    [Output('movie-grid-postgres', 'children', allow_duplicate=True),
-     Output('pagination-postgres', 'total'),
-     Output('query-info-postgres', 'data'),
-     Output('performance-metrics-postgres', 'children', allow_duplicate=True),
-     Output('query-info-hover-postgres', 'children', allow_duplicate=True)],
+    [Output('search-jobs', 'data'),
+     Output('search-poll', 'disabled')] +
+    [Output(f'results-loading-{db_name}', 'visible') for db_name in SEARCH_BACKENDS],
     [Input('submit-selection', 'n_clicks'),
-     Input('pagination-postgres', 'value'),
-     Input('sort-by-select', 'value')],
+     Input('sort-by-select', 'value')] +
+    [Input(f'pagination-{db_name}', 'value') for db_name in SEARCH_BACKENDS],
     [State('title-search', 'value'),
      State('genre-select', 'value'),
      State('language-select', 'value'),
@@ -717,103 +763,104 @@ def update_cockroach_results(session, n_clicks, page, sort_by, title=None, genre
      State('rating-range', 'value'),
      State('runtime-range', 'value'),
      State('type-select', 'value'),
-     State('adult-content', 'value')],
-    prevent_initial_call='initial_duplicate',
-    running=[(Output('results-loading-postgres', 'visible'), True, False)]
+     State('adult-content', 'value'),
+     State('bypass-cache', 'checked'),
+     State('search-jobs', 'data')] +
+    [State(f'page-cursors-{db_name}', 'data') for db_name in SEARCH_BACKENDS],
 )
-@with_db_session
-def update_postgres_results(session, n_clicks, page, sort_by, title=None, genres=None, languages=None, years=None, 
-                          rating_range=None, runtime_range=None, keywords=None, include_adult=False):
-    """Update movie grid with paginated results for PostgreSQL."""
-    result = update_movie_results('postgres', session, n_clicks, page, sort_by, title, genres, languages,
-                              years, rating_range, runtime_range, keywords, include_adult)
-    grid, total_pages, _, query_info = result
-    
-    # Create performance metrics text
-    metrics = [
-        f"Query Time: {query_info['query_time']}",
-        f"Total Results: {query_info['total_results']}"
-    ]
-    
-    # Create query info hover card content
-    hover_content = [
-        dmc.Text("SQL Query:", size="sm", fw=700),
-        dmc.Code(
-            query_info['query_statement'],
-            block=True,
-            color="blue",
-            style={'whiteSpace': 'pre-wrap', 'overflowX': 'auto', 'maxHeight': '400px'}
-        )
-    ]
-    
-    return grid, total_pages, query_info, " | ".join(metrics), hover_content
+def start_search(n_clicks, sort_by, *args):
+    """Fan a search out to every backend (or one backend on a page change) concurrently."""
+    pages = dict(zip(SEARCH_BACKENDS, args[:len(SEARCH_BACKENDS)]))
+    filters = args[len(SEARCH_BACKENDS):len(SEARCH_BACKENDS) + 8]
+    bypass_cache = args[len(SEARCH_BACKENDS) + 8]
+    search_jobs = dict(args[len(SEARCH_BACKENDS) + 9] or {})
+    cursors = dict(zip(SEARCH_BACKENDS, args[len(SEARCH_BACKENDS) + 10:]))
+
+    conditions = build_search_conditions(sort_by, *filters)
+    params = parse_search_conditions(conditions)
+
+    # A page change only reloads that backend. Cursors are only valid for the
+    # search they were produced by, so anything else starts over without them.
+    paged_backend = next((db_name for db_name in SEARCH_BACKENDS if ctx.triggered_id == f'pagination-{db_name}'), None)
+    backends = [paged_backend] if paged_backend else SEARCH_BACKENDS
+
+    tasks = {}
+    for db_name in backends:
+        page = pages[db_name] or 1
+        page_cursors = cursors[db_name] if paged_backend else {}
+        cache_key = None if bypass_cache else result_cache.make_key(db_name, params, page)
+        cached = result_cache.get(db_name, cache_key)
+        if cached is not None:
+            # Served from the cache, no session or database round trip needed
+            tasks[db_name] = (None, partial(finish_backend_search, db_name, page, page_cursors, cached, 0.0, 'hit'))
+            continue
+        session_db = CATALOG_ENGINE_DATABASE if db_name == 'memory' else db_name
+        tasks[db_name] = (session_db, partial(run_backend_search, db_name, conditions, page, page_cursors, cache_key))
+
+    job_id = search_coordinator.submit(tasks)
+    search_jobs.update({db_name: job_id for db_name in backends})
+
+    loading = [True if db_name in backends else dash.no_update for db_name in SEARCH_BACKENDS]
+    return [search_jobs, False] + loading
 
 @callback(
-    [Output('movie-grid-mariadb', 'children', allow_duplicate=True),
-     Output('pagination-mariadb', 'total'),
-     Output('query-info-mariadb', 'data'),
-     Output('performance-metrics-mariadb', 'children', allow_duplicate=True),
-     Output('query-info-hover-mariadb', 'children', allow_duplicate=True),],
-    [Input('submit-selection', 'n_clicks'),
-     Input('pagination-mariadb', 'value'),
-     Input('sort-by-select', 'value')],
-    [State('title-search', 'value'),
-     State('genre-select', 'value'),
-     State('language-select', 'value'),
-     State('year-range-select', 'value'),
-     State('rating-range', 'value'),
-     State('runtime-range', 'value'),
-     State('type-select', 'value'),
-     State('adult-content', 'value')],
-    prevent_initial_call='initial_duplicate',
-    running=[(Output('results-loading-mariadb', 'visible'), True, False)]
+    [Output('search-jobs', 'data', allow_duplicate=True),
+     Output('search-poll', 'disabled', allow_duplicate=True)] +
+    [output for db_name in SEARCH_BACKENDS for output in (
+        Output(f'movie-grid-{db_name}', 'children'),
+        Output(f'pagination-{db_name}', 'total'),
+        Output(f'query-info-{db_name}', 'data'),
+        Output(f'performance-metrics-{db_name}', 'children'),
+        Output(f'query-info-hover-{db_name}', 'children'),
+        Output(f'page-cursors-{db_name}', 'data'),
+        Output(f'results-loading-{db_name}', 'visible', allow_duplicate=True),
+    )],
+    Input('search-poll', 'n_intervals'),
+    State('search-jobs', 'data'),
+    prevent_initial_call=True
 )
-@with_db_session
-def update_mariadb_results(session, n_clicks, page, sort_by, title=None, genres=None, languages=None, years=None, 
-                          rating_range=None, runtime_range=None, keywords=None, include_adult=False):
-    """Update movie grid with paginated results for MariaDB."""
-    result = update_movie_results('mariadb', session, n_clicks, page, sort_by, title, genres, languages,
-                              years, rating_range, runtime_range, keywords, include_adult)
-    grid, total_pages, _, query_info = result
-    
-    # Create performance metrics text
-    metrics = [
-        f"Query Time: {query_info['query_time']}",
-        f"Total Results: {query_info['total_results']}"
-    ]
-    
-    # Create query info hover card content
-    hover_content = [
-        dmc.Text("SQL Query:", size="sm", fw=700),
-        dmc.Code(
-            query_info['query_statement'],
-            block=True,
-            color="blue",
-            style={'whiteSpace': 'pre-wrap', 'overflowX': 'auto', 'maxHeight': '400px'}
-        )
-    ]
-    
-    return grid, total_pages, query_info, " | ".join(metrics), hover_content
+def collect_search_results(n_intervals, search_jobs):
+    """Show each backend's results as soon as its search has finished."""
+    search_jobs = dict(search_jobs or {})
+    if not search_jobs:
+        return [search_jobs, True] + [dash.no_update] * (7 * len(SEARCH_BACKENDS))
+
+    outcomes = {}
+    for job_id in set(search_jobs.values()):
+        outcomes.update({
+            db_name: outcome for db_name, outcome in search_coordinator.poll(job_id).items()
+            if search_jobs.get(db_name) == job_id
+        })
+
+    outputs = []
+    for db_name in SEARCH_BACKENDS:
+        if db_name in outcomes:
+            outputs.extend(render_backend_outcome(outcomes[db_name], db_name))
+            del search_jobs[db_name]
+        elif db_name in search_jobs and not search_coordinator.has_job(search_jobs[db_name]):
+            # Job expired or was superseded, stop waiting for it
+            outputs.extend(render_backend_outcome({'status': 'timeout', 'elapsed': search_coordinator.timeout}))
+            del search_jobs[db_name]
+        else:
+            outputs.extend([dash.no_update] * 7)
+
+    return [search_jobs, not search_jobs] + outputs
 
 # Add loading state callbacks
 @callback(
     [Output("search-panel-loading", "visible", allow_duplicate=True)],
     [Input("submit-selection", "n_clicks"),
-     Input("sort-by-select", "value"),
-     Input("pagination-cockroach", "value"),
-     Input("pagination-postgres", "value"),
-     Input("pagination-mariadb", "value")],
+     Input("sort-by-select", "value")] +
+    [Input(f"pagination-{db_name}", "value") for db_name in SEARCH_BACKENDS],
     prevent_initial_call=True
 )
-def show_search_loading(n_clicks, sort_by, page_cockroach, page_postgres, page_mariadb):
+def show_search_loading(n_clicks, sort_by, *pages):
     """Show loading overlay when search is triggered."""
     return True
 
 @callback(
     Output("search-panel-loading", "visible", allow_duplicate=True),
-    [Input('results-loading-cockroach', 'visible'),
-     Input('results-loading-postgres', 'visible'),
-     Input('results-loading-mariadb', 'visible')],
+    [Input(f'results-loading-{db_name}', 'visible') for db_name in SEARCH_BACKENDS],
     prevent_initial_call=True
 )
 def hide_search_loading(*results):
@@ -821,4 +868,3 @@ def hide_search_loading(*results):
     if not any(results):
         return False
     raise PreventUpdate
-
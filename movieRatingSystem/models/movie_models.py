@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, Text, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, Text, Date, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
 
+# Index features MariaDB/MySQL lack: GIN trigram indexes and NULLS LAST
+POSTGRES_DIALECTS = ('postgresql', 'cockroachdb')
+
 class MovieMetadata(Base):
     filename = 'movies_metadata.csv'
     __tablename__ = 'movie_metadata'
@@ -19,14 +22,34 @@ class MovieMetadata(Base):
     production_companies = Column(JSONB, nullable=True)
     production_countries = Column(JSONB, nullable=True)
     release_date = Column(Date, nullable=True)
+    release_year = Column(Integer, nullable=True)  # EXTRACT(YEAR FROM release_date), set by import_db.py
     revenue = Column(Integer, nullable=True)
     runtime = Column(Integer, nullable=True)
     spoken_languages = Column(JSONB, nullable=True)
     tagline = Column(Text, nullable=True)
     title = Column(String, nullable=True)
+    title_normalized = Column(String, nullable=True)  # lowercased, accents stripped
     vote_average = Column(Float, nullable=True)
     vote_count = Column(Integer, nullable=True)
 
+    __table_args__ = (
+        # Trigram inverted index for substring and fuzzy title search (pg_trgm on Postgres)
+        Index(
+            'ix_movie_metadata_title_trgm', 'title_normalized',
+            postgresql_using='gin',
+            postgresql_ops={'title_normalized': 'gin_trgm_ops'}
+        ).ddl_if(dialect=POSTGRES_DIALECTS),
+        # Year range scans, ordered by popularity within a year
+        Index('ix_movie_metadata_year_popularity', release_year, popularity),
+        # Sort keys in MovieQueryBuilder.apply_sorting order, with release_year
+        # carried along so year filters are evaluated from the index. MariaDB
+        # sorts on "column IS NULL" first, which these cannot serve.
+        Index('ix_movie_metadata_popularity', popularity.desc().nulls_last(), movieId.desc(), release_year).ddl_if(dialect=POSTGRES_DIALECTS),
+        Index('ix_movie_metadata_vote_average', vote_average.desc().nulls_last(), movieId.desc(), release_year).ddl_if(dialect=POSTGRES_DIALECTS),
+        Index('ix_movie_metadata_release_date', release_date.desc().nulls_last(), movieId.desc()).ddl_if(dialect=POSTGRES_DIALECTS),
+        Index('ix_movie_metadata_title', title, movieId),
+    )
+
 class Credits(Base):
     filename = 'credits.csv'
     __tablename__ = 'credits'
@@ -59,6 +82,22 @@ class Ratings(Base):
     
     movieId = Column(Integer, primary_key=True, nullable=False)
     rating = Column(Float, nullable=True)
+
+class MovieRatingStats(Base):
+    """Per-movie rating aggregate.
+
+    Computed by MovieLens/data_process.py, or from the ratings table by a CSV
+    import, and loaded by import_db.py. The app does not write ratings, so
+    the table only changes on import.
+    """
+    __tablename__ = 'movie_rating_stats'
+
+    movieId = Column(Integer, ForeignKey('movies.movieId'), primary_key=True, nullable=False)
+    rating_avg = Column(Float, nullable=True)
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    histogram = Column(JSONB, nullable=True)  # {"0.5": count, ..., "5.0": count}
+
 class GenomeTags(Base):
     filename = 'genome-tags.csv'
     __tablename__ = 'genome_tags'
@@ -74,3 +113,39 @@ class GenomeScores(Base):
     relevances = Column(JSONB, nullable=True)
     
     movie = relationship('Movies', back_populates='genome_scores')
+
+class GenomeRelevance(Base):
+    """Normalized (movieId, tagId, relevance) rows, the source of GenomeScores.relevances.
+
+    Only written by import_db.py: loaded from the processed files (or rebuilt
+    from genome_scores by a CSV import) together with genome_scores. The app
+    never writes genome scores, so the two cannot drift apart at runtime.
+    """
+    __tablename__ = 'genome_relevance'
+
+    movieId = Column(Integer, ForeignKey('movies.movieId'), primary_key=True, nullable=False)
+    tagId = Column(Integer, primary_key=True, nullable=False)
+    relevance = Column(Float, nullable=False)
+
+    __table_args__ = (
+        # Covers keyword filtering: tagId equality + relevance range -> movieId
+        Index('ix_genome_relevance_tag_relevance', 'tagId', 'relevance', 'movieId'),
+    )
+
+class MovieDetailDocument(Base):
+    """One precomputed movie info page document per movie, keyed by movieId.
+
+    Built by utils/detail_documents.py. `stale` is set for every document by
+    import_db.py and cleared when the document is rebuilt.
+    """
+    __tablename__ = 'movie_detail_documents'
+
+    movieId = Column(Integer, primary_key=True, nullable=False)
+    document = Column(Text, nullable=False)  # Compact JSON, served as is
+    checksum = Column(String(64), nullable=False)  # sha256 of document
+    stale = Column(Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        # Incremental rebuilds look up the stale documents
+        Index('ix_movie_detail_documents_stale', 'stale'),
+    )
@@ -0,0 +1,94 @@
+"""Asyncio variants of the data-access functions in db_utils.
+
+Statements are still built by MovieQueryBuilder and the sync helpers; only
+the I/O runs on the async drivers (asyncpg, aiomysql). A search runs its
+count and its page query on two connections at the same time, so a page
+costs one round trip of wall time instead of two.
+
+get_movie_by_id, get_similar_movies and get_actor_info are not ported: they
+run the sync implementation through AsyncSession.run_sync. Their statements
+go over the async driver and do not block the event loop, but they run one
+after another, so these calls are no faster than the sync ones.
+
+Every function is a read and returns handle_db_error's error dict instead of
+raising. Sessions fail fast while the backend's circuit breaker is open, but
+unlike db_utils.run_in_session nothing here retries serialization conflicts.
+"""
+import asyncio
+from functools import wraps
+from typing import Any, Dict, Optional
+
+from movieRatingSystem.config.async_database import async_db_config
+from movieRatingSystem.logging_config import get_logger
+from movieRatingSystem.utils import db_utils
+from movieRatingSystem.utils.db_utils import build_search_query, handle_db_error, parse_search_conditions
+
+logger = get_logger()
+
+def with_async_db_session(func):
+    """Run func in a read-only AsyncSession, returning handle_db_error's dict on failure.
+
+    The async counterpart of db_utils.run_in_session without its retries: the
+    session is never committed, only rolled back and closed.
+    """
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        db_name = kwargs.pop('db_name', 'cockroach')
+        stale_reads = kwargs.pop('stale_reads', False)
+
+        try:
+            session = async_db_config.create_session(db_name, stale_reads=stale_reads)
+        except Exception as e:
+            return handle_db_error(db_name, e)
+
+        try:
+            return await func(session, *args, **kwargs)
+        except Exception as e:
+            await session.rollback()
+            return handle_db_error(db_name, e)
+        finally:
+            await session.close()
+    return wrapper
+
+async def search_movies(db_name: str, conditions=None, page: int = 1, items_per_page: int = 20,
+                        cursor: Optional[str] = None, count_strategy: Optional[str] = None) -> Dict[str, Any]:
+    """Search movies like db_utils.search_movies, overlapping the count with the page query."""
+    try:
+        params = parse_search_conditions(conditions)
+        logger.info(f"Parsed search parameters: {params}")
+        page_session = async_db_config.create_session(db_name, stale_reads=True)
+        count_session = async_db_config.create_session(db_name, stale_reads=True)
+    except Exception as e:
+        return handle_db_error(db_name, e)
+
+    try:
+        # Building the statements does no I/O, the sync session only supplies the dialect
+        builder = build_search_query(page_session.sync_session, params)
+        plan = builder.prepare_page(page, items_per_page, cursor, count_strategy)
+
+        async def fetch_rows():
+            result = await page_session.execute(plan['stmt'])
+            return [dict(row._mapping) for row in result.all()]
+
+        total_count, results = await asyncio.gather(
+            count_session.run_sync(builder.count_total, plan),
+            fetch_rows()
+        )
+        return builder.finish_page(plan, results, total_count)
+    except Exception as e:
+        return handle_db_error(db_name, e)
+    finally:
+        await asyncio.gather(page_session.close(), count_session.close())
+
+# Sync implementations on the async session, see the module docstring
+@with_async_db_session
+async def get_movie_by_id(session, movie_id):
+    return await session.run_sync(db_utils.get_movie_by_id, movie_id)
+
+@with_async_db_session
+async def get_similar_movies(session, movie_id, limit=6):
+    return await session.run_sync(db_utils.get_similar_movies, movie_id, limit)
+
+@with_async_db_session
+async def get_actor_info(session, actor_id):
+    return await session.run_sync(db_utils.get_actor_info, actor_id)
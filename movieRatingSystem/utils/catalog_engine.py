@@ -0,0 +1,209 @@
+"""In-process columnar catalog engine for movie searches.
+
+The catalog is small and read-mostly, so the searchable columns are loaded
+into NumPy arrays once and refreshed on a schedule. Filters from
+parse_search_conditions become vectorized boolean masks, genres and keywords
+are packed bitsets, and every sort key has a precomputed argsort permutation,
+so a page is a masked gather of that permutation. The database is only used
+to hydrate the rows that are actually displayed.
+
+Only the numeric sorts run here. Title order depends on the database's
+collation and title_match ranks by pg_trgm similarity, so
+db_utils.search_movies_in_memory sends those sorts (SQL_SORTS) to SQL.
+"""
+import os
+import threading
+from time import perf_counter, time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from movieRatingSystem.config.database import db_config
+from movieRatingSystem.logging_config import get_logger
+from movieRatingSystem.models.movie_models import MovieMetadata, Movies, GenomeRelevance, GenomeTags
+from movieRatingSystem.utils.query_builder import normalize_title
+
+logger = get_logger()
+
+CATALOG_ENGINE_DATABASE = os.getenv('CATALOG_ENGINE_DATABASE', 'cockroach')
+CATALOG_REFRESH_SECONDS = int(os.getenv('CATALOG_REFRESH_SECONDS', '600'))
+KEYWORD_RELEVANCE_THRESHOLD = 0.7  # Same cut-off as MovieQueryBuilder.filter_by_keywords
+SQL_SORTS = ('title', 'title_match')  # Sorts that only MovieQueryBuilder orders like the SQL backends
+
+class CatalogSnapshot:
+    """Immutable column arrays for one load of the catalog, rows ordered by movieId."""
+
+    def __init__(self, rows, keyword_rows):
+        self.size = len(rows)
+        self.movie_ids = np.array([r.movieId for r in rows], dtype=np.int64)
+        self.titles = np.array([r.title_normalized or '' for r in rows], dtype=str)
+        self.languages = np.array([r.original_language or '' for r in rows], dtype=object)
+        self.runtime = np.array([np.nan if r.runtime is None else r.runtime for r in rows], dtype=np.float64)
+        self.vote_average = np.array([np.nan if r.vote_average is None else r.vote_average for r in rows], dtype=np.float64)
+        self.popularity = np.array([np.nan if r.popularity is None else r.popularity for r in rows], dtype=np.float64)
+        self.release_year = np.array([np.nan if r.release_year is None else r.release_year for r in rows], dtype=np.float64)
+        self.release_date = np.array(
+            [np.nan if r.release_date is None else r.release_date.toordinal() for r in rows], dtype=np.float64
+        )
+        # -1 for unknown so that "adult IS false" semantics carry over
+        self.adult = np.array([-1 if r.adult is None else int(r.adult) for r in rows], dtype=np.int8)
+
+        self.genre_bits = self._build_bitsets(
+            (genre, index) for index, r in enumerate(rows) for genre in (r.genres or [])
+        )
+        positions = np.searchsorted(self.movie_ids, np.array([movie_id for movie_id, _ in keyword_rows], dtype=np.int64))
+        self.keyword_bits = self._build_bitsets(
+            (tag, int(position)) for (_, tag), position in zip(keyword_rows, positions)
+        )
+
+        self.sort_orders = {
+            'popularity': self._descending_order(self.popularity),
+            'rating': self._descending_order(self.vote_average),
+            'release_date': self._descending_order(self.release_date),
+        }
+
+    def _build_bitsets(self, pairs) -> Dict[str, np.ndarray]:
+        """Pack (label, row index) pairs into one bitset per label."""
+        members: Dict[str, List[int]] = {}
+        for label, index in pairs:
+            members.setdefault(label, []).append(index)
+        bitsets = {}
+        for label, indexes in members.items():
+            mask = np.zeros(self.size, dtype=bool)
+            mask[indexes] = True
+            bitsets[label] = np.packbits(mask)
+        return bitsets
+
+    def _descending_order(self, values: np.ndarray) -> np.ndarray:
+        """Row order for (value DESC NULLS LAST, movieId DESC), as in MovieQueryBuilder."""
+        primary = np.where(np.isnan(values), np.inf, -values)
+        return np.lexsort((-self.movie_ids, primary))
+
+    def _any_of(self, bitsets: Dict[str, np.ndarray], labels: List[str]) -> np.ndarray:
+        """Rows that have at least one of the labels."""
+        mask = np.zeros(self.size, dtype=bool)
+        for label in labels:
+            if label in bitsets:
+                mask |= np.unpackbits(bitsets[label], count=self.size).astype(bool)
+        return mask
+
+    def build_mask(self, params: Dict[str, Any]) -> np.ndarray:
+        """Evaluate parsed search parameters as a boolean row mask."""
+        mask = np.ones(self.size, dtype=bool)
+
+        if params.get('title') and params['title'].strip():
+            mask &= np.char.find(self.titles, normalize_title(params['title'])) >= 0
+        if params.get('genres'):
+            mask &= self._any_of(self.genre_bits, params['genres'])
+        if params.get('languages'):
+            mask &= np.isin(self.languages, params['languages'])
+
+        # NaN never satisfies a range, matching SQL BETWEEN on NULL
+        min_rating, max_rating = params.get('rating_range') or (0, 10)
+        mask &= (self.vote_average >= min_rating) & (self.vote_average <= max_rating)
+        min_runtime, max_runtime = params.get('runtime_range') or (0, 240)
+        mask &= (self.runtime >= min_runtime) & (self.runtime <= max_runtime)
+
+        if not params.get('include_adult'):
+            mask &= self.adult == 0
+        if params.get('keywords'):
+            mask &= self._any_of(self.keyword_bits, params['keywords'])
+        if params.get('years') and len(params['years']) == 2:
+            start_year, end_year = params['years']
+            mask &= (self.release_year >= int(start_year)) & (self.release_year <= int(end_year))
+
+        return mask
+
+class CatalogEngine:
+    """Holds the current catalog snapshot and refreshes it in the background."""
+
+    def __init__(self, db_name: str = CATALOG_ENGINE_DATABASE, refresh_seconds: int = CATALOG_REFRESH_SECONDS):
+        self.db_name = db_name
+        self.refresh_seconds = refresh_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._load_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.loaded_at = None
+
+    def load(self) -> CatalogSnapshot:
+        """Read the catalog columns from the database and swap in a new snapshot."""
+        start_time = perf_counter()
+        session = db_config.create_session(self.db_name, stale_reads=True, read_only=True)
+        try:
+            rows = session.execute(
+                select(
+                    MovieMetadata.movieId,
+                    MovieMetadata.title_normalized,
+                    MovieMetadata.original_language,
+                    MovieMetadata.runtime,
+                    MovieMetadata.vote_average,
+                    MovieMetadata.popularity,
+                    MovieMetadata.release_year,
+                    MovieMetadata.release_date,
+                    MovieMetadata.adult,
+                    Movies.genres
+                )
+                .join(Movies, MovieMetadata.movieId == Movies.movieId)
+                .order_by(MovieMetadata.movieId)
+            ).all()
+            keyword_rows = session.execute(
+                select(GenomeRelevance.movieId, GenomeTags.tag)
+                .join(GenomeTags, GenomeTags.tagId == GenomeRelevance.tagId)
+                .join(MovieMetadata, MovieMetadata.movieId == GenomeRelevance.movieId)
+                .join(Movies, Movies.movieId == GenomeRelevance.movieId)
+                .where(GenomeRelevance.relevance > KEYWORD_RELEVANCE_THRESHOLD)
+            ).all()
+        finally:
+            session.close()
+
+        snapshot = CatalogSnapshot(rows, keyword_rows)
+        self._snapshot = snapshot
+        self.loaded_at = time()
+        logger.info(f"Loaded in-memory catalog from {self.db_name}: {snapshot.size} movies, "
+                    f"{len(snapshot.keyword_bits)} keywords in {perf_counter() - start_time:.3f}s")
+        return snapshot
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Return the current snapshot, loading it on first use."""
+        if self._snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self.load()
+                    self.start_refresh()
+        return self._snapshot
+
+    def start_refresh(self):
+        """Start the background thread that reloads the snapshot periodically."""
+        if self._refresh_thread or self.refresh_seconds <= 0:
+            return
+        self._refresh_thread = threading.Thread(target=self._refresh_loop, name='catalog-refresh', daemon=True)
+        self._refresh_thread.start()
+
+    def stop_refresh(self):
+        self._stop.set()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.load()
+            except Exception as e:
+                logger.error(f"Failed to refresh in-memory catalog: {str(e)}", exc_info=True)
+
+    def search(self, params: Dict[str, Any], page: int = 1, items_per_page: int = 20) -> Tuple[List[int], int]:
+        """Return the movieIds on the requested page and the total match count."""
+        snapshot = self.snapshot()
+        sort_by = params.get('sort_by') or 'popularity'
+        if sort_by not in snapshot.sort_orders:
+            raise ValueError(f"The in-memory catalog cannot sort by {sort_by}, search the database instead")
+        order = snapshot.sort_orders[sort_by]
+
+        mask = snapshot.build_mask(params)
+        matches = order[mask[order]]
+
+        offset = (page - 1) * items_per_page
+        page_rows = matches[offset:offset + items_per_page]
+        return snapshot.movie_ids[page_rows].tolist(), int(matches.size)
+
+catalog_engine = CatalogEngine()
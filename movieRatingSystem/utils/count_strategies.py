@@ -0,0 +1,118 @@
+"""Total-count strategies for paginated movie searches.
+
+- exact: count(distinct movieId) over the filters, cached per normalized filter set and database.
+- estimated: the planner's row estimate for the filtered rows, read from EXPLAIN.
+  The page query still fetches one extra row, so a low estimate never hides
+  a next page.
+- has_more: no count query at all, the page query fetches one extra row instead.
+"""
+import json
+import os
+import re
+import threading
+from time import monotonic
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from movieRatingSystem.logging_config import get_logger
+
+logger = get_logger()
+
+COUNT_STRATEGIES = ('exact', 'estimated', 'has_more')
+DEFAULT_COUNT_STRATEGY = os.getenv('SEARCH_COUNT_STRATEGY', 'exact')
+COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', '300'))
+COUNT_CACHE_SIZE = int(os.getenv('COUNT_CACHE_SIZE', '1024'))
+
+_COCKROACH_ESTIMATE = re.compile(r'estimated row count:\s*([\d,]+)')
+
+class CountCache:
+    """Thread-safe TTL cache of exact counts keyed by database and count SQL."""
+
+    def __init__(self, ttl: int = COUNT_CACHE_TTL, max_entries: int = COUNT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: Tuple[str, str], value: int):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Drop the entry closest to expiry to make room
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[key] = (monotonic() + self.ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+count_cache = CountCache()
+
+def _cache_key(session: Session, count_sql: str) -> Tuple[str, str]:
+    """Identify a count by the database it runs on and its literal SQL."""
+    url = session.get_bind().url.render_as_string(hide_password=True)
+    return url, count_sql
+
+def exact_count(session: Session, count_stmt, count_sql: str) -> int:
+    """Run the exact count query, reusing a cached result for the same filters."""
+    key = _cache_key(session, count_sql)
+    cached = count_cache.get(key)
+    if cached is not None:
+        logger.info("Count cache hit")
+        return cached
+
+    total_count = session.execute(count_stmt).scalar() or 0
+    count_cache.set(key, total_count)
+    return total_count
+
+def estimated_count(session: Session, rows_stmt) -> Optional[int]:
+    """Return the planner's row estimate for rows_stmt, or None if unavailable."""
+    bind = session.get_bind()
+    dialect_name = bind.dialect.name
+    compiled = rows_stmt.compile(dialect=bind.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if bind.dialect.positional:
+        # e.g. asyncpg's $1 placeholders take a tuple in bind order
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    connection = session.connection()
+
+    try:
+        if dialect_name == 'cockroachdb':
+            plan = connection.exec_driver_sql(f"EXPLAIN {compiled}", params).all()
+            for (line,) in plan:
+                match = _COCKROACH_ESTIMATE.search(line)
+                if match:
+                    return int(match.group(1).replace(',', ''))
+        elif dialect_name == 'postgresql':
+            plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        elif dialect_name in ('mysql', 'mariadb'):
+            # One row per table in join order; the joins are one-to-one, so the
+            # largest filtered estimate bounds the result
+            estimates = [
+                row['rows'] * float(row.get('filtered') or 100) / 100
+                for row in connection.exec_driver_sql(f"EXPLAIN {compiled}", params).mappings()
+                if row.get('rows') is not None
+            ]
+            if estimates:
+                return int(max(estimates))
+    except Exception as e:
+        logger.warning(f"Could not read row estimate from {dialect_name}: {str(e)}")
+        return None
+
+    logger.warning(f"No row estimate found in {dialect_name} plan")
+    return None
@@ -1,8 +1,13 @@
-from functools import wraps
-from movieRatingSystem.config.database import db_config
+from contextlib import contextmanager
+from movieRatingSystem.config.database import db_config, DatabaseUnavailableError
 from movieRatingSystem.utils.query_builder import MovieQueryBuilder
-from movieRatingSystem.models.movie_models import MovieMetadata, Movies, Credits, Links, Ratings, GenomeScores, GenomeTags
-from sqlalchemy import func, and_, or_, Integer, Float, String
+from movieRatingSystem.utils.catalog_engine import SQL_SORTS, catalog_engine
+from movieRatingSystem.utils.genome_index import genome_index
+from movieRatingSystem.utils.retry import RetryBudgetExceeded, retry_executor
+from movieRatingSystem.utils.sql_functions import json_array_agg, json_contains, json_object
+from movieRatingSystem.models.movie_models import MovieMetadata, Movies, Credits, Links, Ratings, MovieRatingStats, GenomeScores, GenomeTags, GenomeRelevance, MovieDetailDocument
+import json
+from sqlalchemy import event, func, and_, or_, case, select, literal_column, Integer, Float, String
 from movieRatingSystem.logging_config import get_logger
 from movieRatingSystem.utils.language_utils import create_language_options
 from datetime import date
@@ -22,35 +27,76 @@ def handle_db_error(db_name: str, error: Exception) -> dict:
     return {
         'error': True,
         'message': f"Connection to {db_name} failed. Please try again later.",
-        'details': str(error) if isinstance(error, (SQLAlchemyError, OperationalError)) else "Internal error"
+        'details': str(error) if isinstance(error, (SQLAlchemyError, OperationalError, DatabaseUnavailableError, RetryBudgetExceeded)) else "Internal error"
     }
 
-def with_db_session(func):
-    """Decorator to handle database session management."""
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        # Get the database name from the function name or kwargs
-        db_name = kwargs.pop('db_name', 'cockroach')  # Default to CockroachDB
-        
-        try:
-            session = db_config.create_session(db_name)
-        except Exception as e:
-            return handle_db_error(db_name, e)
-            
-        try:
-            # Add session to args if the function expects it
-            if 'session' in func.__code__.co_varnames:
-                result = func(session, *args, **kwargs)
-            else:
-                result = func(*args, **kwargs)
+class RoundTripCounter:
+    """Counts the round trips a session makes: statements plus BEGIN/COMMIT/ROLLBACK."""
+
+    def __init__(self, session):
+        self.count = 0
+        self.autocommit = session.info.get('autocommit', False)
+        self.in_transaction = False
+        self._connections = []
+        event.listen(session, 'after_begin', self._after_begin)
+        event.listen(session, 'after_commit', self._after_end)
+        event.listen(session, 'after_rollback', self._after_end)
+
+    def _after_begin(self, session, transaction, connection):
+        if not self.autocommit:
+            self.count += 1
+            self.in_transaction = True
+        if not any(seen is connection for seen in self._connections):
+            self._connections.append(connection)
+            event.listen(connection, 'before_cursor_execute', self._before_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def _after_end(self, session):
+        if self.in_transaction:
+            self.count += 1
+            self.in_transaction = False
+
+    def close(self):
+        """Account for the rollback the pool sends for a transaction that was left open."""
+        self._after_end(None)
+        return self.count
+
+@contextmanager
+def db_session(db_name='cockroach', read_only=False, stale_reads=False, label=None):
+    """Session scope that commits writable sessions and logs its round trips.
+
+    Read-only sessions are never committed and hold one connection for the
+    whole scope, see DatabaseConfig.create_session.
+    """
+    session = db_config.create_session(db_name, stale_reads=stale_reads, read_only=read_only)
+    round_trips = RoundTripCounter(session)
+    try:
+        yield session
+        if not read_only:
             session.commit()
-            return result
-        except Exception as e:
-            session.rollback()
-            return handle_db_error(db_name, e)
-        finally:
-            session.close()
-    return wrapper
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+        mode = 'read-only' if read_only else 'read-write'
+        logger.info(f"{label or 'db_session'}: {round_trips.close()} round trips on {db_name} ({mode})")
+
+def run_in_session(db_name, fn, read_only=False, stale_reads=False, label=None):
+    """Return fn(session) run in a db_session, retrying serialization conflicts.
+
+    Each attempt gets a fresh session, so fn must not have side effects
+    outside the session that a rerun would repeat.
+    """
+    label = label or fn.__name__
+
+    def attempt():
+        with db_session(db_name, read_only=read_only, stale_reads=stale_reads, label=label) as session:
+            return fn(session)
+
+    return retry_executor.run(label, attempt)
 
 def initialize_data(db_name='cockroach'):
     """Initialize data for dropdowns with error handling and fallback to other databases."""
@@ -63,7 +109,7 @@ def initialize_data(db_name='cockroach'):
     
     for db in available_dbs:
         try:
-            session = db_config.create_session(db)
+            session = db_config.create_session(db, stale_reads=True, read_only=True)
             try:
                 genres = get_all_genres(session)
                 languages = get_all_languages(session)
@@ -136,13 +182,133 @@ def get_movie_by_id(session, movie_id):
         result = (
             builder.base_query()
             .filter_by_movie_id(movie_id)
-            .paginate(page=1, items_per_page=1)
+            .paginate(page=1, items_per_page=1, count_strategy='has_more')
         )
         return result['results'][0] if result['results'] else None
     except Exception as e:
         logger.error(f"Error in get_movie_by_id: {str(e)}", exc_info=True)
         raise
 
+def _json_value(value):
+    """JSON columns come back decoded from Postgres drivers and as text from MariaDB."""
+    return json.loads(value) if isinstance(value, str) else value
+
+def _names(items):
+    """Comma-join the 'name' of each entry of a TMDB JSON list (companies, languages)."""
+    return ', '.join(item.get('name', '') for item in (_json_value(items) or []) if item.get('name'))
+
+def get_movie_details(session, movie_id, tag_limit=12):
+    """Everything the movie info page shows, fetched in a single statement.
+
+    Metadata, links, rating aggregate, genres and cast are joined on the
+    primary key; the top genome tags are aggregated into a JSON column by a
+    subquery. Works on every backend. Returns None for unknown movies.
+    """
+    try:
+        top_tags = (
+            select(GenomeTags.tag, GenomeRelevance.relevance)
+            .join(GenomeTags, GenomeTags.tagId == GenomeRelevance.tagId)
+            .where(GenomeRelevance.movieId == movie_id)
+            .order_by(GenomeRelevance.relevance.desc())
+            .limit(tag_limit)
+            .subquery()
+        )
+        genome = (
+            select(json_array_agg(json_object(
+                literal_column("'label'"), top_tags.c.tag,
+                literal_column("'value'"), top_tags.c.relevance
+            )))
+            .scalar_subquery()
+        )
+        stmt = (
+            select(
+                MovieMetadata.movieId,
+                MovieMetadata.title,
+                MovieMetadata.release_date,
+                MovieMetadata.poster_path,
+                MovieMetadata.overview,
+                MovieMetadata.vote_average,
+                MovieMetadata.vote_count,
+                MovieMetadata.production_companies,
+                MovieMetadata.spoken_languages,
+                Movies.genres,
+                Links.imdbId,
+                Links.tmdbId,
+                MovieRatingStats.rating_avg,
+                Credits.cast,
+                genome.label('genome')
+            )
+            .outerjoin(Movies, Movies.movieId == MovieMetadata.movieId)
+            .outerjoin(Links, Links.movieId == MovieMetadata.movieId)
+            .outerjoin(MovieRatingStats, MovieRatingStats.movieId == MovieMetadata.movieId)
+            .outerjoin(Credits, Credits.movieId == MovieMetadata.movieId)
+            .where(MovieMetadata.movieId == movie_id)
+        )
+        row = session.execute(stmt).first()
+        if not row:
+            return None
+
+        genres = _json_value(row.genres) or []
+        # JSON aggregates do not keep the subquery's order on every backend
+        genome_tags = sorted(_json_value(row.genome) or [], key=lambda tag: tag['value'], reverse=True)
+        actors = [
+            {
+                'actor_id': member.get('id'),
+                'actor_name': member.get('name'),
+                'character': member.get('character'),
+                'profile_path': member.get('profile_path')
+            }
+            for member in sorted(_json_value(row.cast) or [], key=lambda member: member.get('order', 0))
+        ]
+        return {
+            'movieId': row.movieId,
+            'title': row.title,
+            'release_date': row.release_date,
+            'poster_path': row.poster_path,
+            'overview': row.overview,
+            'vote_average': row.vote_average or 0,
+            'vote_count': row.vote_count or 0,
+            'rating': row.rating_avg or 0,
+            'imdbid': row.imdbId,
+            'tmdbid': row.tmdbId,
+            'production_studios': _names(row.production_companies),
+            'languages': _names(row.spoken_languages),
+            'genres': ', '.join(genres),
+            'genome': genome_tags,
+            'actors': actors
+        }
+    except Exception as e:
+        logger.error(f"Error in get_movie_details: {str(e)}", exc_info=True)
+        raise
+
+def get_movies_by_tags(session, movie_id, tags, min_relevance=0.8, limit=35):
+    """Movies (other than movie_id) that score highest on the given genome tags."""
+    try:
+        if not tags:
+            return []
+        scores = (
+            select(GenomeRelevance.movieId, func.avg(GenomeRelevance.relevance).label('score'))
+            .join(GenomeTags, GenomeTags.tagId == GenomeRelevance.tagId)
+            .where(
+                GenomeTags.tag.in_(tags),
+                GenomeRelevance.movieId != movie_id,
+                GenomeRelevance.relevance > min_relevance
+            )
+            .group_by(GenomeRelevance.movieId)
+            .order_by(func.avg(GenomeRelevance.relevance).desc())
+            .limit(limit)
+            .subquery()
+        )
+        stmt = (
+            select(scores.c.movieId, scores.c.score, MovieMetadata.title, MovieMetadata.poster_path)
+            .join(MovieMetadata, MovieMetadata.movieId == scores.c.movieId)
+            .order_by(scores.c.score.desc())
+        )
+        return [dict(r._mapping) for r in session.execute(stmt).all()]
+    except Exception as e:
+        logger.error(f"Error in get_movies_by_tags: {str(e)}", exc_info=True)
+        raise
+
 def get_movie_credits(session, movie_id):
     """Get movie credits."""
     try:
@@ -183,18 +349,20 @@ def get_movie_ratings(session, movie_id):
         logger.error(f"Error in get_movie_ratings: {str(e)}", exc_info=True)
         raise
 
-def get_movie_genome_scores(session, movie_id):
-    """Get movie genome scores."""
+def get_movie_genome_scores(session, movie_id, limit=10):
+    """Get the most relevant genome tags of a movie."""
     try:
         query = (
             session.query(
-                GenomeScores,
-                GenomeTags.tag
+                GenomeRelevance.movieId,
+                GenomeRelevance.tagId,
+                GenomeTags.tag,
+                GenomeRelevance.relevance
             )
-            .join(GenomeTags, GenomeTags.tagId == func.cast(func.jsonb_object_keys(GenomeScores.relevances), Integer))
-            .filter(GenomeScores.movieId == movie_id)
-            .order_by(func.cast(func.jsonb_extract_path_text(GenomeScores.relevances, func.jsonb_object_keys(GenomeScores.relevances)), Float).desc())
-            .limit(10)
+            .join(GenomeTags, GenomeTags.tagId == GenomeRelevance.tagId)
+            .filter(GenomeRelevance.movieId == movie_id)
+            .order_by(GenomeRelevance.relevance.desc())
+            .limit(limit)
         )
         results = query.all()
         return [dict(r._mapping) for r in results]
@@ -202,38 +370,85 @@ def get_movie_genome_scores(session, movie_id):
         logger.error(f"Error in get_movie_genome_scores: {str(e)}", exc_info=True)
         raise
 
-def search_movies(session, conditions=None, page=1, items_per_page=20):
-    """Search movies using the MovieQueryBuilder."""
+def build_search_query(session, params):
+    """Return a MovieQueryBuilder with the filters and sort of parsed search parameters applied."""
+    return (
+        MovieQueryBuilder(session)
+        .base_query()
+        .filter_by_title(params['title'], fuzzy=params.get('sort_by') == 'title_match')
+        .filter_by_genres(params['genres'])
+        .filter_by_languages(params['languages'])
+        .filter_by_rating_range(*(params['rating_range'] or (0, 10)))
+        .filter_by_runtime_range(*(params['runtime_range'] or (0, 240)))
+        .filter_by_adult_content(params['include_adult'])
+        .filter_by_keywords(params['keywords'])
+        .filter_by_years(params['years'])
+        .apply_sorting(params.get('sort_by'))
+    )
+
+def search_movies(session, conditions=None, page=1, items_per_page=20, cursor=None, count_strategy=None):
+    """Search movies using the MovieQueryBuilder.
+
+    Pass the `next_cursor` of the previous page as `cursor` to fetch the next
+    page with a keyset predicate instead of OFFSET. `count_strategy` selects
+    how the total is computed, see MovieQueryBuilder.paginate.
+    """
     try:
         # Parse conditions into individual parameters
         params = parse_search_conditions(conditions)
         logger.info(f"Parsed search parameters: {params}")
 
-        query_builder = MovieQueryBuilder(session)
-        query = query_builder.base_query()
-        
-        # Apply filters based on parsed parameters
-        query = (
-            query
-            .filter_by_title(params['title'])
-            .filter_by_genres(params['genres'])
-            .filter_by_languages(params['languages'])
-            .filter_by_rating_range(*(params['rating_range'] or (0, 10)))
-            .filter_by_runtime_range(*(params['runtime_range'] or (0, 240)))
-            .filter_by_adult_content(params['include_adult'])
-            .filter_by_keywords(params['keywords'])
-            .filter_by_years(params['years'])
-            .apply_sorting(params.get('sort_by'))
-        )
+        query = build_search_query(session, params)
         
         # Get paginated results
-        result = query.paginate(page=page, items_per_page=items_per_page)
+        result = query.paginate(page=page, items_per_page=items_per_page, cursor=cursor, count_strategy=count_strategy)
         
         return result
     except Exception as e:
         logger.error(f"Error in search_movies: {str(e)}", exc_info=True)
         raise
 
+def search_movies_in_memory(session, conditions=None, page=1, items_per_page=20):
+    """Search movies with the in-memory catalog engine and hydrate only the visible rows.
+
+    Title and title_match sorts run as a regular search_movies query, so
+    they order rows exactly like the database backends.
+    """
+    try:
+        params = parse_search_conditions(conditions)
+        if params.get('sort_by') in SQL_SORTS:
+            result = search_movies(session, conditions, page=page, items_per_page=items_per_page)
+            result['query_statement'] = f"-- Sorted by {params['sort_by']} in SQL:\n{result['query_statement']}"
+            return result
+
+        movie_ids, total_count = catalog_engine.search(params, page=page, items_per_page=items_per_page)
+
+        results = []
+        hydrate_sql = 'N/A (no matches)'
+        if movie_ids:
+            hydrated = (
+                MovieQueryBuilder(session)
+                .base_query()
+                .filter_by_movie_ids(movie_ids)
+                .paginate(page=1, items_per_page=len(movie_ids), count_strategy='has_more')
+            )
+            by_id = {movie['movieId']: movie for movie in hydrated['results']}
+            results = [by_id[movie_id] for movie_id in movie_ids if movie_id in by_id]
+            hydrate_sql = hydrated['query_statement']
+
+        return {
+            'total_count': total_count,
+            'count_strategy': 'exact',
+            'count_is_exact': True,
+            'has_more': (page - 1) * items_per_page + len(movie_ids) < total_count,
+            'results': results,
+            'next_cursor': None,
+            'query_statement': f"-- Filtered and sorted in memory, hydrated with:\n{hydrate_sql}"
+        }
+    except Exception as e:
+        logger.error(f"Error in search_movies_in_memory: {str(e)}", exc_info=True)
+        raise
+
 def parse_search_conditions(conditions):
     """Parse structured search conditions into parameter dictionary."""
     params = {
@@ -278,9 +493,34 @@ def parse_search_conditions(conditions):
     logger.info(f"Parsed parameters: {params}")
     return params
     
-def get_similar_movies(session, movie_id, limit=6):
-    """Get similar movies based on genres and genome scores."""
+def get_similar_movies(session, movie_id, limit=6, use_index=True):
+    """Get similar movies based on genres and genome scores.
+
+    Uses the precomputed genome neighbour index when it covers the movie, so
+    only the neighbours' rows are read. Otherwise falls back to filtering on
+    genre overlap and the movie's top tags in SQL.
+    """
     try:
+        neighbours = genome_index.similar(movie_id, limit) if use_index else None
+        if neighbours:
+            scores = dict(neighbours)
+            rows = (
+                session.query(
+                    MovieMetadata.movieId,
+                    MovieMetadata.title,
+                    MovieMetadata.poster_path,
+                    MovieMetadata.vote_average,
+                    Movies.genres,
+                    MovieRatingStats.rating_avg.label('user_rating')
+                )
+                .join(Movies, MovieMetadata.movieId == Movies.movieId)
+                .outerjoin(MovieRatingStats, MovieMetadata.movieId == MovieRatingStats.movieId)
+                .filter(MovieMetadata.movieId.in_(list(scores)))
+                .all()
+            )
+            similar = [dict(r._mapping, similarity=scores[r.movieId]) for r in rows]
+            return sorted(similar, key=lambda movie: movie['similarity'], reverse=True)
+
         # First get the current movie's genres and genome scores
         base_movie = (
             session.query(Movies.genres)
@@ -291,11 +531,8 @@ def get_similar_movies(session, movie_id, limit=6):
         if not base_movie:
             return []
 
-        base_genome = (
-            session.query(GenomeScores.relevances)
-            .filter(GenomeScores.movieId == movie_id)
-            .first()
-        )
+        # Most relevant genome tags of the current movie
+        top_tags = get_movie_genome_scores(session, movie_id, limit=5)
 
         # Query to find similar movies
         query = (
@@ -305,18 +542,11 @@ def get_similar_movies(session, movie_id, limit=6):
                 MovieMetadata.poster_path,
                 MovieMetadata.vote_average,
                 Movies.genres,
-                func.avg(Ratings.rating).label('user_rating')
+                MovieRatingStats.rating_avg.label('user_rating')
             )
             .join(Movies, MovieMetadata.movieId == Movies.movieId)
-            .outerjoin(Ratings, MovieMetadata.movieId == Ratings.movieId)
+            .outerjoin(MovieRatingStats, MovieMetadata.movieId == MovieRatingStats.movieId)
             .filter(MovieMetadata.movieId != movie_id)  # Exclude the current movie
-            .group_by(
-                MovieMetadata.movieId,
-                MovieMetadata.title,
-                MovieMetadata.poster_path,
-                MovieMetadata.vote_average,
-                Movies.genres
-            )
         )
 
         # Add genre similarity condition
@@ -325,35 +555,26 @@ def get_similar_movies(session, movie_id, limit=6):
             query = query.filter(or_(*genre_conditions))
 
         # Add genome score similarity if available
-        if base_genome and base_genome.relevances:
-            # Join with genome scores
-            query = (
-                query.join(GenomeScores, MovieMetadata.movieId == GenomeScores.movieId)
-                .filter(func.jsonb_typeof(GenomeScores.relevances) == 'object')
-            )
-            
+        if top_tags:
             # Find movies with similar high-relevance tags
-            top_tags = sorted(
-                [(k, float(v)) for k, v in base_genome.relevances.items()],
-                key=lambda x: x[1],
-                reverse=True
-            )[:5]
-            
-            tag_conditions = []
-            for tag_id, relevance in top_tags:
-                tag_conditions.append(
-                    func.cast(
-                        func.jsonb_extract_path_text(GenomeScores.relevances, str(tag_id)),
-                        Float
-                    ) > relevance * 0.7
-                )
-            query = query.filter(or_(*tag_conditions))
+            tag_conditions = [
+                and_(GenomeRelevance.tagId == tag['tagId'], GenomeRelevance.relevance > tag['relevance'] * 0.7)
+                for tag in top_tags
+            ]
+            similar_genome = (
+                select(GenomeRelevance.movieId)
+                .where(or_(*tag_conditions))
+            )
+            query = query.filter(MovieMetadata.movieId.in_(similar_genome))
 
-        # Order by similarity and rating
-        query = query.order_by(
-            func.count(func.array_intersect(Movies.genres, base_movie.genres)).desc(),
-            MovieMetadata.vote_average.desc()
-        ).limit(limit)
+        # Order by the number of shared genres, then rating. The baseline's
+        # count(array_intersect(...)) needed a GROUP BY and no such function
+        # exists on PostgreSQL; this counts the same overlap per row.
+        order = [MovieMetadata.vote_average.desc()]
+        if base_movie.genres:
+            genre_overlap = sum(case((json_contains(Movies.genres, genre), 1), else_=0) for genre in base_movie.genres)
+            order.insert(0, genre_overlap.desc())
+        query = query.order_by(*order).limit(limit)
 
         results = query.all()
         return [dict(r._mapping) for r in results]
@@ -377,27 +598,28 @@ def get_actor_info(session, actor_id):
             )
             .join(MovieMetadata, Credits.movieId == MovieMetadata.movieId)
             .join(Movies, MovieMetadata.movieId == Movies.movieId)
-            .filter(Credits.cast.op('?|')([str(actor_id)]))  # JSONB operator to check if actor_id exists in cast array
+            # JSON containment on a bound parameter: a cast entry with this id
+            .filter(json_contains(Credits.cast, {'id': int(actor_id)}))
         )
         
         movies = []
         actor_details = None
         
         for movie in movies_query.all():
-            # Extract actor details from cast if not already found
+            cast_list = movie.cast if isinstance(movie.cast, list) else []
+            cast_member = next((member for member in cast_list if str(member.get('id')) == str(actor_id)), None)
+            if cast_member is None:
+                continue
+            # Extract actor details from the first cast entry
             if not actor_details:
-                cast_list = movie.cast if isinstance(movie.cast, list) else []
-                for cast_member in cast_list:
-                    if str(cast_member.get('id')) == str(actor_id):
-                        actor_details = {
-                            'id': cast_member.get('id'),
-                            'name': cast_member.get('name'),
-                            'profile_path': cast_member.get('profile_path'),
-                            'character': cast_member.get('character'),
-                            'order': cast_member.get('order'),
-                            'gender': cast_member.get('gender')
-                        }
-                        break
+                actor_details = {
+                    'id': cast_member.get('id'),
+                    'name': cast_member.get('name'),
+                    'profile_path': cast_member.get('profile_path'),
+                    'character': cast_member.get('character'),
+                    'order': cast_member.get('order'),
+                    'gender': cast_member.get('gender')
+                }
             
             # Add movie to the list
             movies.append({
@@ -406,14 +628,15 @@ def get_actor_info(session, actor_id):
                 'poster_path': movie.poster_path,
                 'release_date': movie.release_date.isoformat() if movie.release_date else None,
                 'vote_average': movie.vote_average,
-                'genres': movie.genres
+                'genres': movie.genres,
+                'character': cast_member.get('character')
             })
         
         if not actor_details:
             return None
             
         # Sort movies by release date
-        movies.sort(key=lambda x: x.get('release_date', ''), reverse=True)
+        movies.sort(key=lambda x: x.get('release_date') or '', reverse=True)
         
         return {
             'actor': actor_details,
@@ -0,0 +1,364 @@
+"""Precomputed movie detail documents for the /info page.
+
+Each document holds everything the page renders: metadata, links, rating,
+the top genome tags, the billed cast and the similar movies, serialized as
+compact JSON. Documents are stored in two places:
+
+- the movie_detail_documents table, keyed by movieId, on every backend;
+- a local memory-mapped file (DETAIL_STORE_FILE) exported from
+  DETAIL_STORE_DATABASE, so the app can serve a page without a query.
+
+Rebuilds are incremental. import_db.py flags every document stale (the app
+itself does not write the source rows), and a rebuild only recomputes stale
+and missing documents. Unchanged documents are detected by checksum and not
+rewritten. Until then a stale document is not served: lookups fall back to
+building the page on the fly. Similar-movie lists also depend on other
+movies' tags, so run a full rebuild (--all) after bulk imports:
+
+    python -m movieRatingSystem.utils.detail_documents --db cockroach [--all]
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import threading
+from time import monotonic, perf_counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert, or_, select
+
+from movieRatingSystem.config.database import db_config
+from movieRatingSystem.logging_config import get_logger
+from movieRatingSystem.models.movie_models import MovieDetailDocument, MovieMetadata
+from movieRatingSystem.utils.db_utils import db_session, get_movie_details, get_movies_by_tags, get_similar_movies, run_in_session
+from movieRatingSystem.utils.genome_index import genome_index
+from movieRatingSystem.utils.retry import retry_executor
+
+logger = get_logger()
+
+DETAIL_STORE_DATABASE = os.getenv('DETAIL_STORE_DATABASE', 'cockroach')
+DETAIL_STORE_FILE = os.getenv(
+    'DETAIL_STORE_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'movie_details.bin')
+)
+DETAIL_BUILD_BATCH = int(os.getenv('DETAIL_BUILD_BATCH', '100'))  # movies per transaction
+# Seconds between checks for a replaced store file and for newly stale documents
+DETAIL_STORE_CHECK_INTERVAL = float(os.getenv('DETAIL_STORE_CHECK_INTERVAL', '5'))
+BILLED_CAST_LIMIT = 20
+SIMILAR_TAGS = 3  # Top genome tags used to find similar movies without the genome index
+SIMILAR_MOVIES_LIMIT = 35
+
+# Store file layout: header, index sorted by movieId, then the documents
+STORE_MAGIC = b'MOVIEDOC'
+STORE_HEADER = np.dtype([('magic', 'S8'), ('count', '<u8')])
+STORE_INDEX = np.dtype([('movieId', '<i8'), ('offset', '<u8'), ('length', '<u8')])
+
+def build_detail_document(session, movie_id) -> Optional[Dict[str, Any]]:
+    """Assemble the detail document of one movie, or None if it does not exist."""
+    details = get_movie_details(session, movie_id)
+    if not details:
+        return None
+
+    if genome_index.contains(movie_id):
+        similar = get_similar_movies(session, movie_id, limit=SIMILAR_MOVIES_LIMIT)
+    else:
+        tags = [tag['label'] for tag in details['genome'][:SIMILAR_TAGS]]
+        similar = get_movies_by_tags(session, movie_id, tags, limit=SIMILAR_MOVIES_LIMIT)
+    release_date = details['release_date']
+    return dict(
+        details,
+        release_date=release_date.isoformat() if release_date else None,
+        actors=details['actors'][:BILLED_CAST_LIMIT],
+        similar=[
+            {'movieId': movie['movieId'], 'title': movie['title'], 'poster_path': movie['poster_path']}
+            for movie in similar
+        ]
+    )
+
+def encode_document(document: Dict[str, Any]) -> str:
+    return json.dumps(document, separators=(',', ':'), ensure_ascii=False)
+
+def _stale_movie_ids(session) -> List[int]:
+    """Movies whose document is missing or flagged stale."""
+    stmt = (
+        select(MovieMetadata.movieId)
+        .outerjoin(MovieDetailDocument, MovieDetailDocument.movieId == MovieMetadata.movieId)
+        .where(or_(MovieDetailDocument.movieId.is_(None), MovieDetailDocument.stale.is_(True)))
+        .order_by(MovieMetadata.movieId)
+    )
+    return session.execute(stmt).scalars().all()
+
+def _build_batch(session, batch: List[int], changed: Dict[int, str]) -> Dict[str, int]:
+    """Rebuild one batch of documents and write the ones that changed.
+
+    Runs in one transaction with the source reads, so a concurrent source
+    write either lands before the rebuild or marks the new document stale.
+    """
+    counts = {'written': 0, 'unchanged': 0, 'missing': 0}
+    existing = dict(session.execute(
+        select(MovieDetailDocument.movieId, MovieDetailDocument.checksum)
+        .where(MovieDetailDocument.movieId.in_(batch), MovieDetailDocument.stale.is_(False))
+    ).all())
+
+    rows = []
+    for movie_id in batch:
+        document = build_detail_document(session, movie_id)
+        if document is None:
+            counts['missing'] += 1
+            continue
+        encoded = encode_document(document)
+        checksum = hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+        if existing.get(movie_id) == checksum:
+            counts['unchanged'] += 1
+            continue
+        rows.append({'movieId': movie_id, 'document': encoded, 'checksum': checksum, 'stale': False})
+
+    if rows:
+        # Portable upsert: replace the batch's rows
+        session.execute(delete(MovieDetailDocument).where(MovieDetailDocument.movieId.in_([r['movieId'] for r in rows])))
+        session.execute(insert(MovieDetailDocument), rows)
+    counts['written'] = len(rows)
+    # Only published once the transaction commits, see rebuild_detail_documents
+    changed.update({r['movieId']: r['document'] for r in rows})
+    return counts
+
+def rebuild_detail_documents(db_name: str = DETAIL_STORE_DATABASE, full: bool = False,
+                             movie_ids: Optional[Iterable[int]] = None,
+                             batch_size: int = DETAIL_BUILD_BATCH) -> Dict[int, str]:
+    """Rebuild stale and missing documents (or all, or the given movies) on db_name.
+
+    Returns the documents that were written, keyed by movieId.
+    """
+    start_time = perf_counter()
+    MovieDetailDocument.__table__.create(db_config.get_engine(db_name), checkfirst=True)
+
+    if movie_ids is not None:
+        targets = sorted(set(movie_ids))
+    else:
+        with db_session(db_name, read_only=True, label='detail_documents.targets') as session:
+            if full:
+                targets = session.execute(select(MovieMetadata.movieId).order_by(MovieMetadata.movieId)).scalars().all()
+            else:
+                targets = _stale_movie_ids(session)
+    logger.info(f"Rebuilding {len(targets)} detail documents on {db_name}")
+
+    changed: Dict[int, str] = {}
+    totals = {'written': 0, 'unchanged': 0, 'missing': 0}
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start:start + batch_size]
+        batch_changed: Dict[int, str] = {}
+
+        def build(session):
+            # A retried attempt starts over with an empty result
+            batch_changed.clear()
+            return _build_batch(session, batch, batch_changed)
+
+        counts = retry_executor.run_transaction(
+            'detail_documents.rebuild', lambda: db_config.create_session(db_name), build
+        )
+        changed.update(batch_changed)
+        for key, value in counts.items():
+            totals[key] += value
+
+    logger.info(f"Detail documents on {db_name}: {totals['written']} written, {totals['unchanged']} unchanged, "
+                f"{totals['missing']} missing in {perf_counter() - start_time:.1f}s")
+    return changed
+
+def _iter_table_documents(db_name: str):
+    """All stored documents in movieId order, streamed from the table."""
+    with db_session(db_name, read_only=True, label='detail_documents.export') as session:
+        stmt = select(MovieDetailDocument.movieId, MovieDetailDocument.document).order_by(MovieDetailDocument.movieId)
+        for movie_id, document in session.execute(stmt.execution_options(yield_per=1000)):
+            yield movie_id, document.encode('utf-8')
+
+class DetailDocumentStore:
+    """Read-only memory-mapped file of detail documents.
+
+    The index is a sorted movieId array, so a lookup is a binary search plus
+    one slice of the mapping. The file is replaced atomically by write().
+    Lookups check whether it was replaced at most every check_interval
+    seconds; reload() picks up a new file right away.
+    """
+
+    def __init__(self, path: str = DETAIL_STORE_FILE, check_interval: float = DETAIL_STORE_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._mapping: Optional[Tuple[int, mmap.mmap, np.ndarray]] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def reload(self):
+        """Check for a replaced file on the next lookup instead of after the interval."""
+        self._next_check = 0.0
+
+    def _open(self):
+        """Return (file version, mapping, index), remapping if the file was replaced."""
+        mapping = self._mapping
+        if mapping and monotonic() < self._next_check:
+            return mapping
+
+        try:
+            version = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+        self._next_check = monotonic() + self.check_interval
+        if mapping and mapping[0] == version:
+            return mapping
+
+        with self._lock:
+            if self._mapping and self._mapping[0] == version:
+                return self._mapping
+            with open(self.path, 'rb') as store_file:
+                buffer = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ)
+            header = np.frombuffer(buffer, dtype=STORE_HEADER, count=1)[0]
+            if header['magic'] != STORE_MAGIC:
+                logger.error(f"{self.path} is not a detail document store")
+                return None
+            index = np.frombuffer(buffer, dtype=STORE_INDEX, count=int(header['count']), offset=STORE_HEADER.itemsize)
+            # The previous mapping is released once no reader holds it
+            self._mapping = (version, buffer, index)
+            logger.info(f"Mapped {len(index)} detail documents from {self.path}")
+            return self._mapping
+
+    def get_raw(self, movie_id: int) -> Optional[bytes]:
+        mapping = self._open()
+        if not mapping:
+            return None
+        _, buffer, index = mapping
+        position = int(np.searchsorted(index['movieId'], movie_id))
+        if position >= len(index) or index['movieId'][position] != movie_id:
+            return None
+        entry = index[position]
+        offset = int(entry['offset'])
+        return buffer[offset:offset + int(entry['length'])]
+
+    def get(self, movie_id: int) -> Optional[Dict[str, Any]]:
+        raw = self.get_raw(movie_id)
+        return json.loads(raw) if raw is not None else None
+
+    def movie_ids(self) -> np.ndarray:
+        mapping = self._open()
+        return mapping[2]['movieId'] if mapping else np.empty(0, dtype=np.int64)
+
+    def write(self, documents: Iterable[Tuple[int, bytes]], count: int):
+        """Write count (movieId, document) pairs, sorted by movieId, to a new file."""
+        index = np.zeros(count, dtype=STORE_INDEX)
+        offset = STORE_HEADER.itemsize + index.nbytes
+        temp_file = f"{self.path}.tmp"
+        with open(temp_file, 'wb') as store_file:
+            header = np.array([(STORE_MAGIC, count)], dtype=STORE_HEADER)
+            store_file.write(header.tobytes())
+            store_file.seek(offset)
+            written = 0
+            for movie_id, document in documents:
+                index[written] = (movie_id, offset, len(document))
+                store_file.write(document)
+                offset += len(document)
+                written += 1
+            if written != count:
+                raise ValueError(f"Expected {count} documents, got {written}")
+            store_file.seek(STORE_HEADER.itemsize)
+            store_file.write(index.tobytes())
+        os.replace(temp_file, self.path)
+        self.reload()
+
+    def export(self, db_name: str = DETAIL_STORE_DATABASE, changed: Optional[Dict[int, str]] = None):
+        """Refresh the file from db_name.
+
+        With changed (as returned by rebuild_detail_documents) and an
+        existing file, the changed documents are merged into the file's
+        contents. Otherwise all documents are exported from the table.
+        """
+        start_time = perf_counter()
+        if changed is not None and self._open():
+            if not changed:
+                return
+            updates = {movie_id: document.encode('utf-8') for movie_id, document in changed.items()}
+            merged_ids = np.union1d(self.movie_ids(), np.fromiter(updates, dtype=np.int64))
+            self.write(
+                ((movie_id, updates.get(movie_id) or self.get_raw(movie_id)) for movie_id in merged_ids.tolist()),
+                len(merged_ids)
+            )
+            count = len(merged_ids)
+        else:
+            with db_session(db_name, read_only=True, label='detail_documents.count') as session:
+                count = session.query(MovieDetailDocument).count()
+            self.write(_iter_table_documents(db_name), count)
+        logger.info(f"Wrote {count} detail documents to {self.path} in {perf_counter() - start_time:.1f}s")
+
+detail_store = DetailDocumentStore()
+
+class StaleDocumentIds:
+    """The movieIds whose stored document is flagged stale, re-read at most every check_interval seconds.
+
+    The local store cannot see the stale flag, so its lookups consult this
+    set; the query uses ix_movie_detail_documents_stale.
+    """
+
+    def __init__(self, db_name: str = DETAIL_STORE_DATABASE, check_interval: float = DETAIL_STORE_CHECK_INTERVAL):
+        self.db_name = db_name
+        self.check_interval = check_interval
+        self._ids = frozenset()
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def __contains__(self, movie_id: int) -> bool:
+        if monotonic() >= self._next_check:
+            self._refresh()
+        return movie_id in self._ids
+
+    def _refresh(self):
+        with self._lock:
+            if monotonic() < self._next_check:
+                return
+            try:
+                with db_session(self.db_name, read_only=True, stale_reads=True, label='detail_documents.stale') as session:
+                    self._ids = frozenset(session.execute(
+                        select(MovieDetailDocument.movieId).where(MovieDetailDocument.stale.is_(True))
+                    ).scalars().all())
+            except Exception as e:
+                # Keep serving with the last known set rather than failing the page
+                logger.error(f"Could not read stale detail documents from {self.db_name}: {str(e)}")
+            self._next_check = monotonic() + self.check_interval
+
+stale_document_ids = StaleDocumentIds()
+
+def get_detail_document(db_name: str, movie_id: int) -> Optional[Dict[str, Any]]:
+    """The movie's detail document with a single lookup.
+
+    Served from the local store for DETAIL_STORE_DATABASE, otherwise by
+    primary key from db_name's table. Movies without a document yet, or
+    with a stale one, are built on the fly.
+    """
+    if db_name == DETAIL_STORE_DATABASE and movie_id not in stale_document_ids:
+        document = detail_store.get(movie_id)
+        if document is not None:
+            return document
+
+    def lookup(session):
+        stored = session.get(MovieDetailDocument, movie_id)
+        if stored is not None and not stored.stale:
+            return json.loads(stored.document)
+        state = 'Stale' if stored is not None else 'No'
+        logger.warning(f"{state} detail document for movie {movie_id} on {db_name}, building it on the fly")
+        return build_detail_document(session, movie_id)
+
+    return run_in_session(db_name, lookup, read_only=True, stale_reads=True, label='get_detail_document')
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the precomputed movie detail documents.")
+    parser.add_argument('--db', default=DETAIL_STORE_DATABASE, choices=['cockroach', 'postgres', 'mariadb'])
+    parser.add_argument('--all', action='store_true', help="Rebuild every document, not only stale and missing ones")
+    parser.add_argument('--movie-ids', type=int, nargs='+', help="Rebuild only these movies")
+    parser.add_argument('--batch-size', type=int, default=DETAIL_BUILD_BATCH)
+    parser.add_argument('--no-store', action='store_true', help="Do not refresh the local memory-mapped store")
+    args = parser.parse_args()
+
+    changed = rebuild_detail_documents(args.db, full=args.all, movie_ids=args.movie_ids, batch_size=args.batch_size)
+    if not args.no_store and args.db == DETAIL_STORE_DATABASE:
+        detail_store.export(args.db, None if args.all else changed)
+
+if __name__ == '__main__':
+    main()
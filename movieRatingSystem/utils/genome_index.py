@@ -0,0 +1,479 @@
+"""Nearest-neighbour index over the genome tag vectors, for similar movies.
+
+An offline job loads GenomeScores.relevances into a dense movies x tags
+float16 matrix, L2-normalizes the rows and computes every movie's top-k
+cosine neighbours, one block of rows at a time so the similarity matrix is
+never materialized in full. The result is written to GENOME_INDEX_FILE:
+
+    python -m movieRatingSystem.utils.genome_index --db cockroach --k 50
+
+The app serves neighbours from the file in memory, optionally re-ranked by
+genre overlap, and reloads it when the job writes a new one.
+
+Exact all-pairs neighbours cost O(movies^2). For larger catalogs set
+GENOME_INDEX_MODE=ann to serve from an IVF index instead (--ann to build,
+--insert to add movies incrementally); benchmarks/genome_ann_recall.py
+measures its recall against the exact neighbours.
+"""
+import argparse
+import json
+import os
+import threading
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from movieRatingSystem.config.database import db_config
+from movieRatingSystem.logging_config import get_logger
+from movieRatingSystem.models.movie_models import GenomeScores, GenomeTags, Movies
+
+logger = get_logger()
+
+GENOME_INDEX_DATABASE = os.getenv('GENOME_INDEX_DATABASE', 'cockroach')
+GENOME_INDEX_FILE = os.getenv(
+    'GENOME_INDEX_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'genome_index.npz')
+)
+GENOME_NEIGHBOURS = int(os.getenv('GENOME_NEIGHBOURS', '50'))  # k stored per movie
+GENOME_BLOCK_SIZE = int(os.getenv('GENOME_BLOCK_SIZE', '1024'))  # rows per similarity block
+GENOME_GENRE_WEIGHT = float(os.getenv('GENOME_GENRE_WEIGHT', '0.1'))  # 0 disables genre re-ranking
+
+# Approximate (IVF) index for catalogs too large for exact all-pairs neighbours
+GENOME_INDEX_MODE = os.getenv('GENOME_INDEX_MODE', 'exact')  # exact | ann
+GENOME_ANN_FILE = os.getenv(
+    'GENOME_ANN_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'genome_ann.npz')
+)
+GENOME_ANN_LISTS = int(os.getenv('GENOME_ANN_LISTS', '0'))  # 0 = 4 x sqrt(movies)
+GENOME_ANN_PROBES = int(os.getenv('GENOME_ANN_PROBES', '8'))  # lists scanned per query
+GENOME_ANN_ITERATIONS = 10  # k-means iterations
+
+def load_genome_matrix(session, movie_ids: Optional[List[int]] = None) -> Dict[str, np.ndarray]:
+    """Read the genome scores and genres (of all movies, or movie_ids) into dense arrays, rows ordered by movieId."""
+    tag_ids = np.array(session.execute(select(GenomeTags.tagId).order_by(GenomeTags.tagId)).scalars().all(), dtype=np.int64)
+    stmt = (
+        select(GenomeScores.movieId, GenomeScores.relevances, Movies.genres)
+        .outerjoin(Movies, Movies.movieId == GenomeScores.movieId)
+        .order_by(GenomeScores.movieId)
+    )
+    if movie_ids is not None:
+        stmt = stmt.where(GenomeScores.movieId.in_(movie_ids))
+    rows = session.execute(stmt).all()
+
+    vectors = np.zeros((len(rows), len(tag_ids)), dtype=np.float16)
+    for row_index, (_, relevances, _) in enumerate(rows):
+        relevances = json.loads(relevances) if isinstance(relevances, str) else relevances or {}
+        if not relevances:
+            continue
+        columns = np.searchsorted(tag_ids, np.fromiter((int(tag_id) for tag_id in relevances), dtype=np.int64))
+        vectors[row_index, columns] = np.fromiter(relevances.values(), dtype=np.float32, count=len(relevances))
+
+    genre_names = sorted({genre for _, _, genres in rows for genre in (genres or [])})
+    genre_columns = {genre: column for column, genre in enumerate(genre_names)}
+    genres = np.zeros((len(rows), len(genre_names)), dtype=bool)
+    for row_index, (_, _, movie_genres) in enumerate(rows):
+        genres[row_index, [genre_columns[genre] for genre in (movie_genres or [])]] = True
+
+    return {
+        'movie_ids': np.array([row[0] for row in rows], dtype=np.int64),
+        'tag_ids': tag_ids,
+        'vectors': vectors,
+        'genres': genres,
+        'genre_names': np.array(genre_names, dtype=str),
+    }
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Unit-length rows (all-zero rows stay zero), in float16."""
+    vectors = vectors.astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (vectors / norms).astype(np.float16)
+
+def top_k_neighbours(vectors: np.ndarray, k: int, block_size: int = GENOME_BLOCK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k cosine neighbours of every row of unit-length vectors, excluding itself.
+
+    Returns (row indexes, similarities), both rows x k, best first. Each
+    block is a (block_size x movies) matrix product in float32; CPUs have
+    no fast float16 GEMM, so only the stored matrix is half precision.
+    """
+    count = len(vectors)
+    k = min(k, count - 1)
+    matrix = vectors.astype(np.float32)
+    neighbours = np.empty((count, k), dtype=np.int32)
+    similarities = np.empty((count, k), dtype=np.float16)
+
+    for start in range(0, count, block_size):
+        block = matrix[start:start + block_size]
+        scores = block @ matrix.T
+        rows = np.arange(len(block))
+        scores[rows, start + rows] = -np.inf
+        candidates = np.argpartition(scores, -k, axis=1)[:, -k:]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        neighbours[start:start + len(block)] = np.take_along_axis(candidates, order, axis=1)
+        similarities[start:start + len(block)] = np.take_along_axis(candidate_scores, order, axis=1)
+    return neighbours, similarities
+
+def build_genome_index(db_name: str = GENOME_INDEX_DATABASE, k: int = GENOME_NEIGHBOURS,
+                       block_size: int = GENOME_BLOCK_SIZE, path: str = GENOME_INDEX_FILE):
+    """Build the neighbour index from db_name and write it to path."""
+    start_time = perf_counter()
+    session = db_config.create_session(db_name, read_only=True)
+    try:
+        arrays = load_genome_matrix(session)
+    finally:
+        session.close()
+    load_time = perf_counter() - start_time
+
+    arrays['vectors'] = l2_normalize(arrays['vectors'])
+    arrays['neighbours'], arrays['similarities'] = top_k_neighbours(arrays['vectors'], k, block_size)
+
+    # np.savez appends .npz to names without it, so keep the suffix on the temp file
+    temp_file = f"{path}.tmp.npz"
+    np.savez(temp_file, **arrays)
+    os.replace(temp_file, path)
+    logger.info(f"Built genome index for {len(arrays['movie_ids'])} movies x {len(arrays['tag_ids'])} tags "
+                f"(k={arrays['neighbours'].shape[1]}) in {perf_counter() - start_time:.1f}s, "
+                f"{load_time:.1f}s of it loading from {db_name}")
+
+def rerank_by_genre(genres: np.ndarray, row: int, candidates: np.ndarray, scores: np.ndarray,
+                    genre_weight: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Add genre_weight x the genre Jaccard overlap with row to the scores and re-sort."""
+    if not genre_weight or not genres.shape[1]:
+        return candidates, scores
+    shared = (genres[candidates] & genres[row]).sum(axis=1)
+    combined = (genres[candidates] | genres[row]).sum(axis=1)
+    scores = scores + genre_weight * shared / np.maximum(combined, 1)
+    order = np.argsort(-scores, kind='stable')
+    return candidates[order], scores[order]
+
+class GenomeNeighbourIndex:
+    """In-memory precomputed genome neighbours, reloaded when the file changes."""
+
+    def __init__(self, path: str = GENOME_INDEX_FILE):
+        self.path = path
+        self._arrays: Optional[Dict[str, Any]] = None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _get_arrays(self) -> Optional[Dict[str, Any]]:
+        try:
+            version = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+        if version == self._version:
+            return self._arrays
+
+        with self._lock:
+            if version != self._version:
+                start_time = perf_counter()
+                with np.load(self.path) as index_file:
+                    arrays = {name: index_file[name] for name in index_file.files}
+                self._arrays = arrays
+                self._version = version
+                logger.info(f"Loaded genome index for {len(arrays['movie_ids'])} movies in {perf_counter() - start_time:.3f}s")
+            return self._arrays
+
+    def _row(self, arrays, movie_id: int) -> Optional[int]:
+        movie_ids = arrays['movie_ids']
+        row = int(np.searchsorted(movie_ids, movie_id))
+        return row if row < len(movie_ids) and movie_ids[row] == movie_id else None
+
+    def contains(self, movie_id: int) -> bool:
+        arrays = self._get_arrays()
+        return arrays is not None and self._row(arrays, movie_id) is not None
+
+    def similar(self, movie_id: int, limit: int = 10, genre_weight: float = GENOME_GENRE_WEIGHT) -> Optional[List[Tuple[int, float]]]:
+        """The limit most similar movies as (movieId, score), best first.
+
+        score is the genome cosine similarity plus genre_weight times the
+        Jaccard overlap of the two movies' genres. None if the movie is not
+        in the index (or there is no index).
+        """
+        arrays = self._get_arrays()
+        if arrays is None:
+            return None
+        row = self._row(arrays, movie_id)
+        if row is None:
+            return None
+
+        neighbours = arrays['neighbours'][row]
+        scores = arrays['similarities'][row].astype(np.float32)
+        neighbours, scores = rerank_by_genre(arrays['genres'], row, neighbours, scores, genre_weight)
+        return [(int(arrays['movie_ids'][n]), float(s)) for n, s in zip(neighbours[:limit], scores[:limit])]
+
+    def cosine(self, movie_id: int, other_ids: List[int]) -> Optional[np.ndarray]:
+        """Genome cosine similarity between movie_id and each of other_ids (NaN if not indexed)."""
+        arrays = self._get_arrays()
+        if arrays is None:
+            return None
+        row = self._row(arrays, movie_id)
+        if row is None:
+            return None
+        vectors = arrays['vectors']
+        other_rows = [self._row(arrays, other_id) for other_id in other_ids]
+        return np.array([
+            np.nan if other is None else float(vectors[row].astype(np.float32) @ vectors[other].astype(np.float32))
+            for other in other_rows
+        ])
+
+def train_centroids(vectors: np.ndarray, lists: int, iterations: int = GENOME_ANN_ITERATIONS,
+                    sample_size: Optional[int] = None, seed: int = 0) -> np.ndarray:
+    """Spherical k-means: unit-length centroids of `lists` clusters, trained on a sample."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), sample_size or lists * 64)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)].astype(np.float32)
+    centroids = sample[rng.choice(sample_size, lists, replace=False)]
+
+    for _ in range(iterations):
+        assignments = assign_lists(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=lists)
+        # Restart empty clusters from random sample points
+        empty = counts == 0
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = l2_normalize(sums).astype(np.float32)
+    return centroids
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray, block_size: int = GENOME_BLOCK_SIZE) -> np.ndarray:
+    """Index of the most similar centroid of every vector."""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block_size):
+        block = vectors[start:start + block_size].astype(np.float32)
+        assignments[start:start + block_size] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+class GenomeANNIndex:
+    """Approximate genome neighbours from an inverted file (IVF) index.
+
+    Vectors are partitioned into `lists` clusters by spherical k-means. A
+    query scores the centroids, then only the vectors of its `probes` best
+    lists, so a lookup costs about probes / lists of an exact scan. More
+    probes raise recall and latency; more lists make each probe cheaper but
+    less likely to hold the true neighbours. New movies are assigned to
+    their nearest list without retraining. Rebuild with --ann after the
+    catalog has grown a lot, so the lists stay balanced.
+
+    Same lookup API as GenomeNeighbourIndex.
+    """
+
+    def __init__(self, path: str = GENOME_ANN_FILE, probes: int = GENOME_ANN_PROBES):
+        self.path = path
+        self.probes = probes
+        self._state: Optional[Dict[str, Any]] = None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _index_state(arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """Arrays plus the list layout and movieId lookup derived from them."""
+        members = np.argsort(arrays['assignments'], kind='stable').astype(np.int32)
+        counts = np.bincount(arrays['assignments'], minlength=len(arrays['centroids']))
+        state = dict(arrays)
+        state['members'] = members
+        state['offsets'] = np.concatenate(([0], np.cumsum(counts)))
+        state['rows'] = {int(movie_id): row for row, movie_id in enumerate(arrays['movie_ids'].tolist())}
+        return state
+
+    def build(self, arrays: Dict[str, np.ndarray], lists: int = GENOME_ANN_LISTS, iterations: int = GENOME_ANN_ITERATIONS):
+        """Train the lists on normalized vectors (as from load_genome_matrix) and index them."""
+        vectors = l2_normalize(arrays['vectors'])
+        lists = lists or max(1, int(4 * np.sqrt(len(vectors))))
+        centroids = train_centroids(vectors, min(lists, len(vectors)), iterations)
+        with self._lock:
+            self._state = self._index_state({
+                'movie_ids': arrays['movie_ids'],
+                'tag_ids': arrays['tag_ids'],
+                'vectors': vectors,
+                'genres': arrays['genres'],
+                'genre_names': arrays['genre_names'],
+                'centroids': centroids,
+                'assignments': assign_lists(vectors, centroids),
+            })
+
+    def add(self, arrays: Dict[str, np.ndarray]):
+        """Insert (or replace) movies without retraining the lists."""
+        state = self._get_state()
+        if state is None:
+            raise ValueError("Build or load the ANN index before adding movies")
+        if not np.array_equal(arrays['tag_ids'], state['tag_ids']):
+            raise ValueError("Genome tags changed since the index was built, rebuild it")
+
+        vectors = l2_normalize(arrays['vectors'])
+        # Align the genre columns of old and new movies
+        genre_names = sorted(set(state['genre_names'].tolist()) | set(arrays['genre_names'].tolist()))
+        genres = np.zeros((len(state['movie_ids']) + len(vectors), len(genre_names)), dtype=bool)
+        columns = np.searchsorted(genre_names, state['genre_names'])
+        genres[:len(state['movie_ids']), columns] = state['genres']
+        columns = np.searchsorted(genre_names, arrays['genre_names'])
+        genres[len(state['movie_ids']):, columns] = arrays['genres']
+
+        merged = {
+            'movie_ids': np.concatenate((state['movie_ids'], arrays['movie_ids'])),
+            'tag_ids': state['tag_ids'],
+            'vectors': np.concatenate((state['vectors'], vectors)),
+            'genres': genres,
+            'genre_names': np.array(genre_names, dtype=str),
+            'centroids': state['centroids'],
+            'assignments': np.concatenate((state['assignments'], assign_lists(vectors, state['centroids']))),
+        }
+        # Movies that were already indexed keep only their new row
+        replaced = np.isin(state['movie_ids'], arrays['movie_ids'])
+        if replaced.any():
+            keep = np.concatenate((~replaced, np.ones(len(vectors), dtype=bool)))
+            merged = {name: (value[keep] if name not in ('tag_ids', 'genre_names', 'centroids') else value)
+                      for name, value in merged.items()}
+        with self._lock:
+            self._state = self._index_state(merged)
+        logger.info(f"Added {len(vectors)} movies to the ANN genome index ({len(merged['movie_ids'])} total)")
+
+    def insert(self, arrays: Dict[str, np.ndarray], path: Optional[str] = None):
+        """Add movies (as from load_genome_matrix) and write the index, see add and save."""
+        self.add(arrays)
+        self.save(path)
+
+    def save(self, path: Optional[str] = None):
+        """Write the in-memory index; this process then treats the file as current."""
+        state = self._state
+        path = path or self.path
+        temp_file = f"{path}.tmp.npz"
+        np.savez(temp_file, **{name: state[name] for name in
+                               ('movie_ids', 'tag_ids', 'vectors', 'genres', 'genre_names', 'centroids', 'assignments')})
+        os.replace(temp_file, path)
+        with self._lock:
+            self._version = os.stat(path).st_mtime_ns
+
+    def _get_state(self) -> Optional[Dict[str, Any]]:
+        """The in-memory index, (re)loaded from the file when that is newer."""
+        try:
+            version = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self._state
+        if version == self._version:
+            return self._state
+
+        with self._lock:
+            if version != self._version:
+                start_time = perf_counter()
+                with np.load(self.path) as index_file:
+                    self._state = self._index_state({name: index_file[name] for name in index_file.files})
+                self._version = version
+                logger.info(f"Loaded ANN genome index for {len(self._state['movie_ids'])} movies "
+                            f"in {len(self._state['centroids'])} lists in {perf_counter() - start_time:.3f}s")
+            return self._state
+
+    def contains(self, movie_id: int) -> bool:
+        state = self._get_state()
+        return state is not None and int(movie_id) in state['rows']
+
+    def movie_ids(self) -> Optional[np.ndarray]:
+        """The indexed movieIds, or None without an index."""
+        state = self._get_state()
+        return None if state is None else state['movie_ids']
+
+    def search(self, state: Dict[str, Any], row: int, k: int, probes: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k (rows, cosine similarities) of the indexed vector at row, best first."""
+        probes = min(probes or self.probes, len(state['centroids']))
+        query = state['vectors'][row].astype(np.float32)
+        probed = np.argpartition(-(state['centroids'] @ query), probes - 1)[:probes]
+        offsets = state['offsets']
+        candidates = np.concatenate([state['members'][offsets[p]:offsets[p + 1]] for p in probed])
+        candidates = candidates[candidates != row]
+        if not len(candidates):
+            return candidates, np.empty(0, dtype=np.float32)
+
+        scores = state['vectors'][candidates].astype(np.float32) @ query
+        k = min(k, len(candidates))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return candidates[best], scores[best]
+
+    def similar(self, movie_id: int, limit: int = 10, genre_weight: float = GENOME_GENRE_WEIGHT,
+                probes: Optional[int] = None) -> Optional[List[Tuple[int, float]]]:
+        """Same as GenomeNeighbourIndex.similar, re-ranking the best GENOME_NEIGHBOURS candidates."""
+        state = self._get_state()
+        if state is None:
+            return None
+        row = state['rows'].get(int(movie_id))
+        if row is None:
+            return None
+
+        candidates, scores = self.search(state, row, max(limit, GENOME_NEIGHBOURS), probes)
+        candidates, scores = rerank_by_genre(state['genres'], row, candidates, scores, genre_weight)
+        return [(int(state['movie_ids'][c]), float(s)) for c, s in zip(candidates[:limit], scores[:limit])]
+
+    def cosine(self, movie_id: int, other_ids: List[int]) -> Optional[np.ndarray]:
+        """Genome cosine similarity between movie_id and each of other_ids (NaN if not indexed)."""
+        state = self._get_state()
+        if state is None:
+            return None
+        row = state['rows'].get(int(movie_id))
+        if row is None:
+            return None
+        vectors = state['vectors']
+        query = vectors[row].astype(np.float32)
+        return np.array([
+            np.nan if other is None else float(vectors[other].astype(np.float32) @ query)
+            for other in (state['rows'].get(int(other_id)) for other_id in other_ids)
+        ])
+
+def build_ann_index(db_name: str = GENOME_INDEX_DATABASE, lists: int = GENOME_ANN_LISTS, path: str = GENOME_ANN_FILE):
+    """Train and write the ANN index from db_name."""
+    start_time = perf_counter()
+    session = db_config.create_session(db_name, read_only=True)
+    try:
+        arrays = load_genome_matrix(session)
+    finally:
+        session.close()
+    index = GenomeANNIndex(path)
+    index.build(arrays, lists)
+    index.save()
+    logger.info(f"Built ANN genome index for {len(arrays['movie_ids'])} movies in {perf_counter() - start_time:.1f}s")
+
+def update_ann_index(db_name: str = GENOME_INDEX_DATABASE, movie_ids: Optional[List[int]] = None, path: str = GENOME_ANN_FILE):
+    """Insert movie_ids, or all movies with genome scores that are not indexed yet, into the ANN index."""
+    index = GenomeANNIndex(path)
+    session = db_config.create_session(db_name, read_only=True)
+    try:
+        indexed_ids = index.movie_ids()
+        if indexed_ids is None:
+            logger.error(f"No ANN genome index at {path}, build it with --ann first")
+            return
+        if movie_ids is None:
+            indexed = set(indexed_ids.tolist())
+            movie_ids = [movie_id for movie_id in session.execute(select(GenomeScores.movieId)).scalars() if movie_id not in indexed]
+        if not movie_ids:
+            logger.info("ANN genome index is up to date")
+            return
+        arrays = load_genome_matrix(session, movie_ids)
+    finally:
+        session.close()
+    index.insert(arrays)
+
+# GENOME_INDEX_MODE picks the index behind get_similar_movies
+genome_index = GenomeANNIndex() if GENOME_INDEX_MODE == 'ann' else GenomeNeighbourIndex()
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the genome nearest-neighbour index for similar movies.")
+    parser.add_argument('--db', default=GENOME_INDEX_DATABASE, choices=['cockroach', 'postgres', 'mariadb'])
+    parser.add_argument('--k', type=int, default=GENOME_NEIGHBOURS, help="neighbours stored per movie")
+    parser.add_argument('--block-size', type=int, default=GENOME_BLOCK_SIZE, help="rows per similarity block")
+    parser.add_argument('--ann', action='store_true', help="build the approximate (IVF) index instead of the exact one")
+    parser.add_argument('--lists', type=int, default=GENOME_ANN_LISTS, help="IVF lists, 0 for 4 x sqrt(movies)")
+    parser.add_argument('--insert', type=int, nargs='*', metavar='MOVIE_ID',
+                        help="add these movies (or, without ids, all unindexed ones) to the existing ANN index")
+    parser.add_argument('--output', help="index file, defaults to GENOME_INDEX_FILE or GENOME_ANN_FILE")
+    args = parser.parse_args()
+
+    if args.insert is not None:
+        update_ann_index(args.db, args.insert or None, args.output or GENOME_ANN_FILE)
+    elif args.ann:
+        build_ann_index(args.db, args.lists, args.output or GENOME_ANN_FILE)
+    else:
+        build_genome_index(args.db, args.k, args.block_size, args.output or GENOME_INDEX_FILE)
+
+if __name__ == '__main__':
+    main()
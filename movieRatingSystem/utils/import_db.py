@@ -1,15 +1,74 @@
 #!/usr/bin/env python3
 
 import os
+import io
+import re
+import json
+import time
+import unicodedata
+import tempfile
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
 import argparse
 
-from sqlalchemy import create_engine, inspect, text
-from psycopg2.errors import SerializationFailure, Error
-from psycopg2 import Error
+from sqlalchemy.engine import make_url
+from sqlalchemy import create_engine, inspect, text, select, delete, insert, update, bindparam, func, cast, Integer
 from models.movie_models import *
+from utils.retry import retry_executor
 
-MAX_RETRIES = 5
+# Read by the app's search result cache, see utils/result_cache.py
+CATALOG_VERSION_FILE = os.getenv(
+    'CATALOG_VERSION_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'catalog_version')
+)
+GENOME_RELEVANCE_BATCH = 200  # movies per transaction, ~1,128 tags each
+# Written by MovieLens/data_process.py, in <data dir>/processed/ by default
+MANIFEST_FILE = 'manifest.json'
+# Processed tables in foreign key order, with rows per transaction
+PROCESSED_TABLES = [
+    (MovieMetadata, 50000),
+    (Credits, 2000),
+    (Links, 50000),
+    (Movies, 50000),
+    (Ratings, 50000),
+    (MovieRatingStats, 10000),
+    (GenomeTags, 50000),
+    (GenomeRelevance, 50000),
+]
+# Bulk loading of processed tables: COPY on Postgres/CockroachDB, LOAD DATA
+# LOCAL INFILE on MariaDB/MySQL, in transactions of about this much CSV
+BULK_BATCH_BYTES = int(os.getenv('IMPORT_BATCH_MB', '16')) << 20
+BULK_SLICE_ROWS = 4096  # rows encoded at a time while a batch fills up
+COPY_DIALECTS = ('postgresql', 'cockroachdb')
+LOAD_DATA_DIALECTS = ('mysql', 'mariadb')
+
+# Postgres and CockroachDB explode the JSONB object server-side
+GENOME_RELEVANCE_SQL = text("""
+    INSERT INTO genome_relevance ("movieId", "tagId", relevance)
+    SELECT g."movieId", r.key::INT, r.value::FLOAT
+    FROM genome_scores g, jsonb_each_text(g.relevances) r
+    WHERE g."movieId" IN :movie_ids
+""").bindparams(bindparam('movie_ids', expanding=True))
+
+# The reverse direction: genome_scores.relevances aggregated from
+# genome_relevance, so JSON is only ever built by the database
+GENOME_SCORES_SQL = {
+    'postgresql': """
+        INSERT INTO genome_scores ("movieId", relevances)
+        SELECT "movieId", jsonb_object_agg(CAST("tagId" AS TEXT), relevance)
+        FROM genome_relevance WHERE "movieId" IN :movie_ids GROUP BY "movieId"
+    """,
+    'mysql': """
+        INSERT INTO genome_scores (movieId, relevances)
+        SELECT movieId, JSON_OBJECTAGG(tagId, relevance)
+        FROM genome_relevance WHERE movieId IN :movie_ids GROUP BY movieId
+    """
+}
+GENOME_SCORES_SQL['cockroachdb'] = GENOME_SCORES_SQL['postgresql']
+GENOME_SCORES_SQL['mariadb'] = GENOME_SCORES_SQL['mysql']
 
 def createTables(engine, drop=False):
     if drop:
@@ -17,10 +76,16 @@ def createTables(engine, drop=False):
         Base.metadata.drop_all(engine)
 
     try:
+        if engine.dialect.name == 'postgresql':
+            # Trigram operator classes for the title search index
+            with engine.begin() as con:
+                con.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         Base.metadata.create_all(engine)
         print("Tables created successfully!\n")
-    except Exception as e: 
+    except Exception as e:
+        # Loading into a half-created schema would leave it unindexed
         print(f"An error occurred: {e}\n")
+        raise
 
 def showTables(engine):
     # Get the inspector for the engine
@@ -32,27 +97,332 @@ def showTables(engine):
 
     return tables
 
-def uploadTablesData(file_path, table_name, engine, chunk_size):
+def normalizeTitle(title):
+    # Must match normalize_title in movieRatingSystem/utils/query_builder.py
+    decomposed = unicodedata.normalize('NFKD', title)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.sub(r'\s+', ' ', stripped).strip().lower()
+
+def uploadTablesData(file_path, table_name, engine, chunk_size, df=None):
     print(f"Inserting [{file_path}] into table [{table_name}]\n")
 
+    if df is None:
+        df = pd.read_csv(open(file_path,'r', newline=None))
+
+    # One transaction per chunk: a conflict only retries that chunk, and a
+    # rolled back chunk leaves no rows behind
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        retry_executor.run_connection_transaction(
+            f"import.{table_name}",
+            engine,
+            lambda con: chunk.to_sql(table_name, con=con, index=False, if_exists='append', method='multi')
+        )
+
+    print(f"Data inserted into [{table_name}] successfully ({retry_executor.call_site_stats(f'import.{table_name}')}).\n")
+
+def populateReleaseYear(engine):
+    """Fill the stored release_year column from release_date."""
+    result = retry_executor.run_connection_transaction(
+        "import.release_year",
+        engine,
+        lambda con: con.execute(
+            update(MovieMetadata)
+            .where(MovieMetadata.release_year.is_(None), MovieMetadata.release_date.isnot(None))
+            .values(release_year=cast(func.extract('year', MovieMetadata.release_date), Integer))
+        )
+    )
+    print(f"Populated release_year for {result.rowcount} movies.\n")
+
+def populateRatingStats(engine):
+    """Fill movie_rating_stats from the loaded ratings table.
+
+    For CSV imports, which have no rating_stats.csv. The CSVs of the older
+    data_process.py hold one averaged rating per movie, so each movie then
+    counts one rating and has no histogram.
+    """
+    aggregate = (
+        select(Ratings.movieId, func.count(Ratings.rating), func.sum(Ratings.rating), func.avg(Ratings.rating))
+        .where(Ratings.rating.isnot(None))
+        .group_by(Ratings.movieId)
+    )
+    result = retry_executor.run_connection_transaction(
+        f"import.{MovieRatingStats.__tablename__}",
+        engine,
+        lambda con: con.execute(
+            insert(MovieRatingStats).from_select(['movieId', 'rating_count', 'rating_sum', 'rating_avg'], aggregate)
+        )
+    )
+    print(f"Aggregated ratings into [{MovieRatingStats.__tablename__}] for {result.rowcount} movies.\n")
+
+def findManifest(data_path):
+    """The manifest in data_path itself or in its processed/ directory, if any."""
+    for directory in (data_path, os.path.join(data_path, 'processed')):
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            return manifest_path
+    return None
+
+def readTableFile(file_path, file_format):
+    """Memory-map a processed table. Arrow IPC is read without a copy; Parquet pages are decompressed from the mapping."""
+    if file_format == 'arrow':
+        return pa.ipc.open_file(pa.memory_map(file_path)).read_all()
+    return pq.read_table(file_path, memory_map=True)
+
+def insertTable(table, table_name, engine, chunk_size):
+    for batch in table.to_batches(max_chunksize=chunk_size):
+        # Python ints/None and dates, which every driver binds as is
+        chunk = batch.to_pandas(integer_object_nulls=True, date_as_object=True)
+        retry_executor.run_connection_transaction(
+            f"import.{table_name}",
+            engine,
+            lambda con: chunk.to_sql(table_name, con=con, index=False, if_exists='append', method='multi')
+        )
+
+def uploadTableFile(file_path, file_format, table_name, engine, chunk_size):
+    print(f"Inserting [{file_path}] into table [{table_name}]\n")
+
+    table = readTableFile(file_path, file_format)
+    insertTable(table, table_name, engine, chunk_size)
+
+    print(f"Data inserted into [{table_name}] successfully ({table.num_rows} rows, {retry_executor.call_site_stats(f'import.{table_name}')}).\n")
+
+def loadDataRows(table):
+    """Encode rows in LOAD DATA's own text format: tab separated, backslash escaped, \\N for NULL."""
+    columns = []
+    for column in table.columns:
+        if pa.types.is_boolean(column.type):
+            # LOAD DATA reads 'true'/'false' as 0, so booleans go as 1/0
+            column = column.cast(pa.int8())
+        text_column = column.cast(pa.string())
+        for raw, escaped in (('\\', '\\\\'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r')):
+            text_column = pc.replace_substring(text_column, raw, escaped)
+        columns.append(pc.fill_null(text_column, '\\N'))
+    lines = pc.binary_join_element_wise(*columns, '\t')
+    return ''.join(pc.binary_join_element_wise(lines, '', '\n').to_pylist()).encode('utf-8')
+
+def bulkBatches(table, batch_bytes, mysql=False):
+    """Encode the table for bulk loading, yielding (first row, rows, buffer) about every batch_bytes.
+
+    COPY gets header-less CSV. Strings are always quoted there, so "" is an
+    empty string and an empty field is NULL. LOAD DATA gets its own text
+    format (see loadDataRows), which tells the two apart with \\N.
+    """
+    options = pv.WriteOptions(include_header=False)
+    first_row = 0
+    buffer = io.BytesIO()
+    for start in range(0, table.num_rows, BULK_SLICE_ROWS):
+        table_slice = table.slice(start, BULK_SLICE_ROWS)
+        if mysql:
+            buffer.write(loadDataRows(table_slice))
+        else:
+            pv.write_csv(table_slice, buffer, options)
+        end = min(start + BULK_SLICE_ROWS, table.num_rows)
+        if buffer.tell() >= batch_bytes or end == table.num_rows:
+            yield first_row, end - first_row, buffer
+            first_row = end
+            buffer = io.BytesIO()
+
+def copyBatch(con, table_name, columns, buffer):
+    """COPY one CSV batch in through psycopg2, inside the connection's transaction."""
+    preparer = con.dialect.identifier_preparer
+    buffer.seek(0)
+    cursor = con.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {preparer.quote(table_name)} ({', '.join(preparer.quote(column) for column in columns)}) FROM STDIN WITH CSV",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+def loadDataBatch(con, table_name, columns, buffer):
+    """LOAD DATA LOCAL INFILE one batch from a temporary file."""
+    preparer = con.dialect.identifier_preparer
+    with tempfile.NamedTemporaryFile(suffix='.tsv') as batch_file:
+        batch_file.write(buffer.getvalue())
+        batch_file.flush()
+        con.exec_driver_sql(
+            f"LOAD DATA LOCAL INFILE '{batch_file.name}' INTO TABLE {preparer.quote(table_name)} CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+            f"({', '.join(preparer.quote(column) for column in columns)})"
+        )
+
+def bulkLoader(engine):
+    """(name, batch loader) for the engine's backend and driver, or None if it only has INSERT."""
+    if engine.dialect.name in COPY_DIALECTS and engine.dialect.driver == 'psycopg2':
+        return 'COPY', copyBatch
+    if engine.dialect.name in LOAD_DATA_DIALECTS:
+        return 'LOAD DATA', loadDataBatch
+    return None
+
+def bulkUploadTableFile(file_path, file_format, table_name, engine, chunk_size, batch_bytes=BULK_BATCH_BYTES):
+    """Stream a processed table in as batches of about batch_bytes, one transaction each.
+
+    If the backend has no bulk loader, or a batch fails (e.g. local_infile is
+    off on the server), the rest of the table goes through INSERT instead,
+    and the summary says how many rows each path loaded.
+    """
+    bulk_loader = bulkLoader(engine)
+    if bulk_loader is None:
+        print(f"No bulk loader for {engine.dialect.name}+{engine.dialect.driver}, falling back to INSERT.\n")
+        uploadTableFile(file_path, file_format, table_name, engine, chunk_size)
+        return
+    loader_name, loader = bulk_loader
+
+    print(f"Bulk loading [{file_path}] into table [{table_name}] with {loader_name}\n")
+
+    table = readTableFile(file_path, file_format)
+    columns = table.column_names
+    loaded_rows = 0
+    loaded_bytes = 0
+    inserted_rows = 0
+    start_time = time.perf_counter()
+    for first_row, rows, buffer in bulkBatches(table, batch_bytes, engine.dialect.name in LOAD_DATA_DIALECTS):
+        size = buffer.tell()
+        try:
+            retry_executor.run_connection_transaction(
+                f"import.{table_name}",
+                engine,
+                lambda con: loader(con, table_name, columns, buffer)
+            )
+        except Exception as e:
+            # The failed batch was rolled back, so INSERT picks up from its first row
+            print(f"{loader_name} into [{table_name}] failed at row {first_row:,}, inserting rows {first_row:,}-{table.num_rows - 1:,} instead: {e}\n")
+            insertTable(table.slice(first_row), table_name, engine, chunk_size)
+            inserted_rows = table.num_rows - first_row
+            break
+        loaded_rows += rows
+        loaded_bytes += size
+        elapsed = max(time.perf_counter() - start_time, 1e-9)
+        print(f"  [{table_name}] {loaded_rows:,}/{table.num_rows:,} rows ({loaded_rows / table.num_rows:.0%}), "
+              f"{loaded_bytes / 2 ** 20:,.1f} MB, {loaded_rows / elapsed:,.0f} rows/s, {loaded_bytes / 2 ** 20 / elapsed:,.1f} MB/s")
+
+    elapsed = time.perf_counter() - start_time
+    stats = retry_executor.call_site_stats(f'import.{table_name}')
+    if inserted_rows:
+        print(f"Data loaded into [{table_name}] partly by {loader_name}: {loaded_rows:,} rows by {loader_name}, "
+              f"{inserted_rows:,} rows by INSERT in {elapsed:.1f}s ({stats}).\n")
+    else:
+        print(f"Data loaded into [{table_name}] successfully: {loaded_rows:,} rows by {loader_name} in {elapsed:.1f}s ({stats}).\n")
+
+def importProcessed(manifest_path, engine, bulk=True, batch_bytes=BULK_BATCH_BYTES):
+    """Load the typed tables listed in a data_process.py manifest, bulk loaded unless bulk is False."""
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    directory = os.path.dirname(manifest_path)
+    print(f"Importing {manifest['format']} tables processed at {manifest['created_at']}\n")
+
+    for model, chunk_size in PROCESSED_TABLES:
+        entry = manifest['tables'].get(model.__tablename__)
+        if not entry:
+            print(f"No [{model.__tablename__}] in {manifest_path}, skipping.\n")
+            continue
+        file_path = os.path.join(directory, entry['file'])
+        if bulk:
+            bulkUploadTableFile(file_path, manifest['format'], model.__tablename__, engine, chunk_size, batch_bytes)
+        else:
+            uploadTableFile(file_path, manifest['format'], model.__tablename__, engine, chunk_size)
+        if model is MovieMetadata:
+            populateReleaseYear(engine)
+    buildGenomeScores(engine)
+
+def importCsv(data_path, engine):
+    """Load the CSVs processed in place by an older data_process.py."""
+    movies_metadata = pd.read_csv(open(data_path + MovieMetadata.filename,'r', newline=None))
+    # The older data_process.py did not write the normalized title the title search filters on
+    movies_metadata['title_normalized'] = movies_metadata['title'].fillna('').map(normalizeTitle)
+    uploadTablesData(data_path + MovieMetadata.filename, MovieMetadata.__tablename__, engine, 50000, movies_metadata)
+    populateReleaseYear(engine)
+    uploadTablesData(data_path + Credits.filename, Credits.__tablename__, engine, 2000)
+    uploadTablesData(data_path + Links.filename, Links.__tablename__, engine, 50000)
+    uploadTablesData(data_path + Movies.filename, Movies.__tablename__, engine, 50000)
+    uploadTablesData(data_path + Ratings.filename, Ratings.__tablename__, engine, 50000)
+    populateRatingStats(engine)
+    uploadTablesData(data_path + GenomeTags.filename, GenomeTags.__tablename__, engine, 50000)
+    uploadTablesData(data_path + GenomeScores.filename, GenomeScores.__tablename__, engine, 2000)
+    syncGenomeRelevance(engine)
+
+def buildGenomeScores(engine, batch_size=GENOME_RELEVANCE_BATCH):
+    """Aggregate genome_relevance into the genome_scores.relevances JSON column in movieId batches."""
+    print(f"Building [{GenomeScores.__tablename__}] from [{GenomeRelevance.__tablename__}]\n")
+
+    with engine.connect() as con:
+        movie_ids = con.execute(select(GenomeRelevance.movieId).distinct().order_by(GenomeRelevance.movieId)).scalars().all()
+
+    aggregate = text(GENOME_SCORES_SQL[engine.dialect.name]).bindparams(bindparam('movie_ids', expanding=True))
+
+    def build_batch(con, batch):
+        con.execute(delete(GenomeScores).where(GenomeScores.movieId.in_(batch)))
+        con.execute(aggregate, {'movie_ids': batch})
+
+    for start in range(0, len(movie_ids), batch_size):
+        batch = movie_ids[start:start + batch_size]
+        retry_executor.run_connection_transaction(
+            f"import.{GenomeScores.__tablename__}",
+            engine,
+            lambda con: build_batch(con, batch)
+        )
+
+    print(f"Data built into [{GenomeScores.__tablename__}] for {len(movie_ids)} movies.\n")
+
+def syncGenomeRelevance(engine, batch_size=GENOME_RELEVANCE_BATCH):
+    """Rebuild genome_relevance from genome_scores.relevances in movieId batches."""
+    print(f"Syncing [{GenomeRelevance.__tablename__}] from [{GenomeScores.__tablename__}]\n")
+
     with engine.connect() as con:
-        # Safe truncation with retry logic
-        for attempt in range(MAX_RETRIES):
-            try:
-                # Upload data to the table
-                df = pd.read_csv(open(file_path,'r', newline=None))
-                df.to_sql(table_name, con=engine, index=False, if_exists='append', chunksize=chunk_size, method='multi')
-                print(f"Data inserted into [{table_name}] successfully.\n")
-                break
-            except SerializationFailure as e: # This is a TransactionRetryError
-                if attempt < MAX_RETRIES - 1:
-                    print(f"Retrying transaction for table [{table_name}] (attempt {attempt + 1})...")
-                    continue
-                else:
-                    raise Error("Transaction maximum retry reached!\n")
-            except Error as e:
-                print(f"Failed to upload data to table [{table_name}]: {e}\n")
-                raise e
+        movie_ids = con.execute(select(GenomeScores.movieId).order_by(GenomeScores.movieId)).scalars().all()
+
+    server_side = engine.dialect.name in ('postgresql', 'cockroachdb')
+
+    def sync_batch(con, batch):
+        con.execute(delete(GenomeRelevance).where(GenomeRelevance.movieId.in_(batch)))
+        if server_side:
+            con.execute(GENOME_RELEVANCE_SQL, {'movie_ids': batch})
+        else:
+            rows = con.execute(
+                select(GenomeScores.movieId, GenomeScores.relevances)
+                .where(GenomeScores.movieId.in_(batch))
+            ).all()
+            values = [
+                {'movieId': movie_id, 'tagId': int(tag_id), 'relevance': float(relevance)}
+                for movie_id, relevances in rows
+                for tag_id, relevance in (json.loads(relevances) if isinstance(relevances, str) else relevances or {}).items()
+            ]
+            if values:
+                con.execute(insert(GenomeRelevance), values)
+
+    for start in range(0, len(movie_ids), batch_size):
+        batch = movie_ids[start:start + batch_size]
+        retry_executor.run_connection_transaction(
+            f"import.{GenomeRelevance.__tablename__}",
+            engine,
+            lambda con: sync_batch(con, batch)
+        )
+
+    print(f"Data synced into [{GenomeRelevance.__tablename__}] for {len(movie_ids)} movies.\n")
+
+def markDetailDocumentsStale(engine):
+    """Flag every precomputed detail document for the next incremental rebuild."""
+    result = retry_executor.run_connection_transaction(
+        "import.detail_documents",
+        engine,
+        lambda con: con.execute(update(MovieDetailDocument).values(stale=True))
+    )
+    print(f"Marked {result.rowcount} detail documents stale, run utils/detail_documents.py to rebuild them.\n")
+
+def touchCatalogVersion():
+    """Record a new catalog version so running apps drop their cached search results."""
+    version = str(time.time_ns())
+    with open(CATALOG_VERSION_FILE, 'w') as version_file:
+        version_file.write(version)
+    print(f"Catalog version set to [{version}].\n")
+
+def connectArgs(url):
+    """Driver options: session settings for CockroachDB/Postgres, LOAD DATA LOCAL for MariaDB/MySQL."""
+    if make_url(url).get_backend_name() in LOAD_DATA_DIALECTS:
+        return {"local_infile": True}
+    return {"application_name": "movieDB", "options": "--retry_write=true"}
 
 def main():
     # Set up argument parser
@@ -63,6 +433,13 @@ def main():
         action="store_true", 
         help="If set, clean the database before setup."
     )
+    parser.add_argument(
+        "--loader",
+        choices=['copy', 'insert'],
+        default='copy',
+        help="copy: COPY / LOAD DATA LOCAL INFILE for processed tables (INSERT where unsupported); insert: INSERT only"
+    )
+    parser.add_argument("--batch-mb", type=int, default=BULK_BATCH_BYTES >> 20, help="MB of CSV per bulk load transaction")
     args = parser.parse_args()
 
     # Get the path from the arguments
@@ -74,7 +451,7 @@ def main():
         return
 
     try:
-        engine = create_engine(os.environ["DATABASE_URL"], connect_args={"application_name": "movieDB", "options": "--retry_write=true"})
+        engine = create_engine(os.environ["DATABASE_URL"], connect_args=connectArgs(os.environ["DATABASE_URL"]))
         print("Database connection successful.\n")
     except Exception as e:
         print("Failed to connect to database.\n")
@@ -83,14 +460,13 @@ def main():
     createTables(engine, args.clean)
     showTables(engine)
     
-    # Uploading dataset tables to CockroachDB Cloud.
-    uploadTablesData(data_path + MovieMetadata.filename, MovieMetadata.__tablename__, engine, 50000)
-    uploadTablesData(data_path + Credits.filename, Credits.__tablename__, engine, 2000)
-    uploadTablesData(data_path + Links.filename, Links.__tablename__, engine, 50000)
-    uploadTablesData(data_path + Movies.filename, Movies.__tablename__, engine, 50000)
-    uploadTablesData(data_path + Ratings.filename, Ratings.__tablename__, engine, 50000)
-    uploadTablesData(data_path + GenomeTags.filename, GenomeTags.__tablename__, engine, 50000)
-    uploadTablesData(data_path + GenomeScores.filename, GenomeScores.__tablename__, engine, 2000)
+    manifest_path = findManifest(data_path)
+    if manifest_path:
+        importProcessed(manifest_path, engine, args.loader == 'copy', args.batch_mb << 20)
+    else:
+        importCsv(data_path, engine)
+    markDetailDocumentsStale(engine)
+    touchCatalogVersion()
 
     engine.dispose()
     
@@ -1,23 +1,88 @@
-from sqlalchemy import func, and_, or_, Integer, Float, select, text, desc, asc
+from sqlalchemy import func, and_, or_, case, Integer, Float, select, text, desc, asc, tuple_
 from sqlalchemy.orm import Session
-from movieRatingSystem.models.movie_models import MovieMetadata, Movies, Ratings, Credits, Links, GenomeScores, GenomeTags
+from movieRatingSystem.models.movie_models import MovieMetadata, Movies, MovieRatingStats, Credits, Links, GenomeRelevance, GenomeTags
 from typing import Optional, List, Dict, Any
 from datetime import date
+import base64
+import json
 import logging
+import re
+import unicodedata
+from movieRatingSystem.utils.count_strategies import COUNT_STRATEGIES, DEFAULT_COUNT_STRATEGY, exact_count, estimated_count
 import shutil
 from sqlalchemy.dialects import postgresql
 from sqlalchemy import String
 
 logger = logging.getLogger(__name__)
 
+# Sort key -> (column, descending). movieId is always appended as tie-breaker
+# in the same direction so that (sort column, movieId) is a total order.
+SORT_CONFIG = {
+    'rating': (MovieMetadata.vote_average, True),
+    'popularity': (MovieMetadata.popularity, True),
+    'release_date': (MovieMetadata.release_date, True),
+    'title': (MovieMetadata.title, False)
+}
+
+# Backends with trigram inverted indexes and similarity() (pg_trgm on Postgres)
+TRIGRAM_DIALECTS = ('postgresql', 'cockroachdb')
+# Backends that accept NULLS LAST; MariaDB/MySQL sort on "column IS NULL" first
+NULLS_LAST_DIALECTS = ('postgresql', 'cockroachdb')
+# Weight of log-popularity relative to trigram similarity (0-1) in title ranking
+TITLE_POPULARITY_WEIGHT = 0.05
+
+def normalize_title(title: str) -> str:
+    """Lowercase, strip accents and collapse whitespace, matching movie_metadata.title_normalized."""
+    decomposed = unicodedata.normalize('NFKD', title)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.sub(r'\s+', ' ', stripped).strip().lower()
+
+def encode_cursor(sort_by: str, value: Any, movie_id: int) -> str:
+    """Encode the sort key and movieId of a row into an opaque page cursor."""
+    if isinstance(value, date):
+        value = value.isoformat()
+    payload = json.dumps({'s': sort_by, 'v': value, 'id': movie_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a page cursor created by encode_cursor."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        sort_by, value, movie_id = payload['s'], payload['v'], int(payload['id'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor}") from e
+
+    if sort_by not in SORT_CONFIG:
+        raise ValueError(f"Invalid sort key in page cursor: {sort_by}")
+    if sort_by == 'release_date' and value is not None:
+        value = date.fromisoformat(value)
+
+    return {'sort_by': sort_by, 'value': value, 'movie_id': movie_id}
+
 class MovieQueryBuilder:
     def __init__(self, session: Session):
         self.session = session
         self.query = None
         self.conditions = []
+        self.sort_by = None
+        self.title_term = None
+
+    @property
+    def supports_trigram(self) -> bool:
+        """Whether the bound database has trigram indexes and similarity()."""
+        return self.session.get_bind().dialect.name in TRIGRAM_DIALECTS
+
+    @property
+    def supports_nulls_last(self) -> bool:
+        """Whether the bound database accepts NULLS LAST in ORDER BY."""
+        return self.session.get_bind().dialect.name in NULLS_LAST_DIALECTS
 
     def base_query(self):
-        """Initialize the base query with all necessary columns."""
+        """Initialize the base query with all necessary columns.
+
+        The user rating comes from the precomputed movie_rating_stats row, so
+        every join is one-to-one and no GROUP BY is needed before LIMIT.
+        """
         self.query = (
             select(
                 MovieMetadata.movieId,
@@ -33,14 +98,11 @@ class MovieQueryBuilder:
                 MovieMetadata.overview,
                 MovieMetadata.tagline,
                 Movies.genres,
-                func.avg(Ratings.rating).label('user_rating')
+                MovieRatingStats.rating_avg.label('user_rating'),
+                MovieRatingStats.rating_count.label('user_rating_count')
             )
             .join(Movies, MovieMetadata.movieId == Movies.movieId)
-            .outerjoin(Ratings, MovieMetadata.movieId == Ratings.movieId)
-            .group_by(
-                MovieMetadata.movieId,
-                Movies.genres
-            )
+            .outerjoin(MovieRatingStats, MovieMetadata.movieId == MovieRatingStats.movieId)
         )
         return self
 
@@ -50,33 +112,46 @@ class MovieQueryBuilder:
             self.conditions.append(MovieMetadata.movieId == movie_id)
         return self
 
-    def filter_by_title(self, title: Optional[str]):
-        """Add title filter."""
-        if title:
-            self.conditions.append(MovieMetadata.title.ilike(f'%{title}%'))
+    def filter_by_movie_ids(self, movie_ids: Optional[List[int]]):
+        """Restrict the query to a set of movie IDs."""
+        if movie_ids is not None:
+            self.conditions.append(MovieMetadata.movieId.in_(movie_ids))
+        return self
+
+    def filter_by_title(self, title: Optional[str], fuzzy: bool = False):
+        """Add title filter on the normalized title.
+
+        Substring matches use the trigram index where the backend has one.
+        With fuzzy=True, titles that are merely similar (typos, word order)
+        match as well.
+        """
+        if title and title.strip():
+            self.title_term = normalize_title(title)
+            condition = MovieMetadata.title_normalized.contains(self.title_term, autoescape=True)
+            if fuzzy and self.supports_trigram:
+                condition = or_(condition, MovieMetadata.title_normalized.op('%')(self.title_term))
+            self.conditions.append(condition)
         return self
 
     def filter_by_genres(self, genres: Optional[List[str]]):
         """Add genres filter."""
         if genres:
-            genre_conditions = [Movies.genres.contains([genre]) for genre in genres]
+            genre_conditions = [Movies.genres.contains([genre]) for genre in sorted(genres)]
             self.conditions.append(or_(*genre_conditions))
         return self
 
     def filter_by_languages(self, languages: Optional[List[str]]):
         """Add languages filter."""
         if languages:
-            self.conditions.append(MovieMetadata.original_language.in_(languages))
+            self.conditions.append(MovieMetadata.original_language.in_(sorted(languages)))
         return self
 
     def filter_by_years(self, years: Optional[tuple]):
-        """Add year range filter."""
+        """Add year range filter on the stored, indexed release_year column."""
         if years and len(years) == 2:
             start_year, end_year = years
             self.conditions.append(
-                func.extract('year', MovieMetadata.release_date).between(
-                    int(start_year), int(end_year)
-                )
+                MovieMetadata.release_year.between(int(start_year), int(end_year))
             )
             logger.info(f"Added year filter: {start_year} to {end_year}")
         return self
@@ -98,23 +173,16 @@ class MovieQueryBuilder:
         return self
 
     def filter_by_keywords(self, keywords: Optional[List[str]]):
-        """Add keyword filter using genome scores."""
+        """Add keyword filter using the normalized genome relevance table."""
         if keywords:
-            # Create a subquery to find movies with matching tags and high relevance
+            # Index range scan on (tagId, relevance) for each selected tag
             relevant_movies = (
-                select(GenomeScores.movieId)
-                .select_from(GenomeScores)
-                .join(
-                    GenomeTags,
-                    and_(
-                        GenomeTags.tag.in_(keywords),
-                        func.jsonb_extract_path_text(
-                            GenomeScores.relevances,
-                            func.cast(GenomeTags.tagId, String)
-                        ).cast(Float) > 0.7
-                    )
+                select(GenomeRelevance.movieId)
+                .join(GenomeTags, GenomeTags.tagId == GenomeRelevance.tagId)
+                .where(
+                    GenomeTags.tag.in_(sorted(keywords)),
+                    GenomeRelevance.relevance > 0.7
                 )
-                .group_by(GenomeScores.movieId)
             ).scalar_subquery()
 
             # Add the condition to the main query
@@ -126,31 +194,98 @@ class MovieQueryBuilder:
 
     def apply_sorting(self, sort_by: Optional[str]):
         """Apply sorting at the database level based on the specified field."""
-        if not sort_by:
-            # Default sort by popularity descending
-            self.query = self.query.order_by(desc(MovieMetadata.popularity))
-            return self
-
-        sort_config = {
-            'rating': MovieMetadata.vote_average,
-            'popularity': MovieMetadata.popularity,
-            'release_date': MovieMetadata.release_date,
-            'title': MovieMetadata.title
-        }
+        if sort_by == 'title_match':
+            if self.title_term:
+                return self._order_by_title_match()
+            sort_by = None
+
+        # Default sort by popularity descending
+        sort_by = sort_by or 'popularity'
 
-        if sort_by in sort_config:
-            column = sort_config[sort_by]
-            # Sort in descending order for all except title
-            if sort_by == 'title':
-                self.query = self.query.order_by(asc(column))
+        if sort_by in SORT_CONFIG:
+            column, descending = SORT_CONFIG[sort_by]
+            # Sort in descending order for all except title, NULLs always last
+            # (the order _seek_condition pages through)
+            direction = desc if descending else asc
+            if self.supports_nulls_last:
+                sort_keys = [direction(column).nulls_last()]
             else:
-                self.query = self.query.order_by(desc(column))
+                sort_keys = [column.is_(None), direction(column)]
+            self.query = self.query.order_by(*sort_keys, direction(MovieMetadata.movieId))
+            self.sort_by = sort_by
 
         return self
 
-    def paginate(self, page: int = 1, items_per_page: int = 20) -> Dict[str, Any]:
-        """Execute the query with pagination and return results."""
-        from sqlalchemy.dialects import postgresql
+    def _order_by_title_match(self):
+        """Rank title matches by match quality combined with popularity."""
+        popularity = func.ln(1 + func.coalesce(MovieMetadata.popularity, 0))
+        if self.supports_trigram:
+            match_quality = func.similarity(MovieMetadata.title_normalized, self.title_term)
+        else:
+            # Without trigrams, exact and prefix matches rank above other substrings
+            match_quality = case(
+                (MovieMetadata.title_normalized == self.title_term, 1.0),
+                (MovieMetadata.title_normalized.startswith(self.title_term, autoescape=True), 0.5),
+                else_=0.0
+            )
+        self.query = self.query.order_by(
+            desc(match_quality + TITLE_POPULARITY_WEIGHT * popularity),
+            desc(MovieMetadata.movieId)
+        )
+        # Rank is not a stored column, so this sort pages with OFFSET only
+        self.sort_by = None
+        return self
+
+    def _seek_condition(self, cursor: Dict[str, Any]):
+        """Build the keyset predicate selecting rows that sort after the cursor."""
+        column, descending = SORT_CONFIG[cursor['sort_by']]
+        value, movie_id = cursor['value'], cursor['movie_id']
+
+        if value is None:
+            # Already inside the trailing NULL block, only the tie-breaker is left
+            tie_breaker = MovieMetadata.movieId < movie_id if descending else MovieMetadata.movieId > movie_id
+            return and_(column.is_(None), tie_breaker)
+
+        key = tuple_(column, MovieMetadata.movieId)
+        after_cursor = key < tuple_(value, movie_id) if descending else key > tuple_(value, movie_id)
+        return or_(after_cursor, column.is_(None))
+
+    def _next_cursor(self, results: List[Dict[str, Any]], items_per_page: int) -> Optional[str]:
+        """Return the cursor of the last row if there may be another page."""
+        if not self.sort_by or not results or len(results) < items_per_page:
+            return None
+        column, _ = SORT_CONFIG[self.sort_by]
+        last_row = results[-1]
+        return encode_cursor(self.sort_by, last_row.get(column.key), last_row['movieId'])
+
+    def paginate(self, page: int = 1, items_per_page: int = 20, cursor: Optional[str] = None,
+                 count_strategy: Optional[str] = None) -> Dict[str, Any]:
+        """Execute the query with pagination and return results.
+
+        When a cursor from a previous page is given the page is fetched with a
+        keyset (seek) predicate instead of OFFSET, so deep pages cost the same
+        as the first one. Cursors that do not match the current sort are ignored.
+
+        count_strategy picks how total_count is produced (see count_strategies):
+        'exact' (cached per filter set), 'estimated' (planner estimate, never
+        below the rows seen so far) or 'has_more' (total_count is only a lower
+        bound). The last two fetch one extra row to tell whether a next page exists.
+        """
+        plan = self.prepare_page(page, items_per_page, cursor, count_strategy)
+        total_count = self.count_total(self.session, plan)
+        results = [dict(row._mapping) for row in self.session.execute(plan['stmt']).all()]
+        return self.finish_page(plan, results, total_count)
+
+    def prepare_page(self, page: int = 1, items_per_page: int = 20, cursor: Optional[str] = None,
+                     count_strategy: Optional[str] = None) -> Dict[str, Any]:
+        """Build the count and page statements without executing them.
+
+        Split out of paginate so that async callers can run the count and the
+        page query on separate connections at the same time.
+        """
+        count_strategy = count_strategy or DEFAULT_COUNT_STRATEGY
+        if count_strategy not in COUNT_STRATEGIES:
+            raise ValueError(f"Unknown count strategy: {count_strategy}")
 
         # Apply all conditions
         if self.conditions:
@@ -162,33 +297,96 @@ class MovieQueryBuilder:
             .select_from(MovieMetadata)
             .join(Movies, MovieMetadata.movieId == Movies.movieId)
         )
+        rows_stmt = (
+            select(MovieMetadata.movieId)
+            .join(Movies, MovieMetadata.movieId == Movies.movieId)
+        )
         
         # Apply the same conditions to the count query
         if self.conditions:
             count_stmt = count_stmt.where(and_(*self.conditions))
+            rows_stmt = rows_stmt.where(and_(*self.conditions))
         
         # Log the count query
         count_sql = str(count_stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
-        logger.info("Count SQL Query:" + '\n' + count_sql)
-        
-        total_count = self.session.execute(count_stmt).scalar()
+        logger.info(f"Count SQL Query ({count_strategy}):" + '\n' + count_sql)
+
+        seek = None
+        if cursor:
+            seek = decode_cursor(cursor)
+            if seek['sort_by'] != self.sort_by:
+                logger.warning(f"Ignoring page cursor for sort '{seek['sort_by']}', query is sorted by '{self.sort_by}'")
+                seek = None
+
+        # Without an exact count, peek one row past the page to know if there is a next one
+        peek = count_strategy in ('estimated', 'has_more')
+        fetch_limit = items_per_page + 1 if peek else items_per_page
 
         # Get paginated results
-        offset = (page - 1) * items_per_page
-        stmt = (
-            self.query
-            .limit(items_per_page)
-            .offset(offset)
-        )
+        if seek:
+            stmt = (
+                self.query
+                .where(self._seek_condition(seek))
+                .limit(fetch_limit)
+            )
+        else:
+            offset = (page - 1) * items_per_page
+            stmt = (
+                self.query
+                .limit(fetch_limit)
+                .offset(offset)
+            )
         
         # Log the final SQL query
         sql_query = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
         logger.info("Main SQL Query:" + '\n' + sql_query)
-        
-        results = self.session.execute(stmt).all()
+
+        return {
+            'page': page,
+            'items_per_page': items_per_page,
+            'count_strategy': count_strategy,
+            'peek': peek,
+            'count_stmt': count_stmt,
+            'count_sql': count_sql,
+            'rows_stmt': rows_stmt,
+            'stmt': stmt,
+            'sql_query': sql_query
+        }
+
+    def count_total(self, session: Session, plan: Dict[str, Any]) -> Optional[int]:
+        """Compute the total for a prepared page with its count strategy.
+
+        Falls back from 'estimated' to 'exact' (recorded in the plan) when the
+        backend gives no estimate. Returns None for 'has_more'.
+        """
+        if plan['count_strategy'] == 'estimated':
+            total_count = estimated_count(session, plan['rows_stmt'])
+            if total_count is not None:
+                return total_count
+            plan['count_strategy'] = 'exact'
+        if plan['count_strategy'] == 'exact':
+            return exact_count(session, plan['count_stmt'], plan['count_sql'])
+        return None
+
+    def finish_page(self, plan: Dict[str, Any], results: List[Dict[str, Any]], total_count: Optional[int]) -> Dict[str, Any]:
+        """Assemble the paginate() result from the fetched rows and the total."""
+        items_per_page = plan['items_per_page']
+        rows_before_page = (plan['page'] - 1) * items_per_page
+        if plan['peek']:
+            has_more = len(results) > items_per_page
+            results = results[:items_per_page]
+            rows_seen = rows_before_page + len(results) + (1 if has_more else 0)
+            # A low planner estimate must not make the next page unreachable
+            total_count = rows_seen if total_count is None else max(total_count, rows_seen)
+        else:
+            has_more = rows_before_page + len(results) < total_count
 
         return {
             'total_count': total_count,
-            'results': [dict(row._mapping) for row in results],
-            'query_statement': sql_query
-        }
\ No newline at end of file
+            'count_strategy': plan['count_strategy'],
+            'count_is_exact': plan['count_strategy'] == 'exact',
+            'has_more': has_more,
+            'results': results,
+            'next_cursor': self._next_cursor(results, items_per_page),
+            'query_statement': plan['sql_query']
+        }
@@ -0,0 +1,106 @@
+"""Cached reference data for the search dropdowns (genres, languages, keywords).
+
+Page layouts read the data from memory and never wait for a database. On
+startup the last snapshot is read from a local JSON file. A background
+thread then loads fresh data through initialize_data, writes it back to the
+snapshot and repeats every REFERENCE_DATA_REFRESH_SECONDS seconds.
+"""
+import json
+import os
+import threading
+from time import perf_counter, time
+from typing import Any, Dict, List, Optional, Tuple
+
+from movieRatingSystem.logging_config import get_logger
+from movieRatingSystem.utils.db_utils import initialize_data
+
+logger = get_logger()
+
+REFERENCE_DATA_REFRESH_SECONDS = int(os.getenv('REFERENCE_DATA_REFRESH_SECONDS', '3600'))
+REFERENCE_DATA_FILE = os.getenv(
+    'REFERENCE_DATA_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'reference_data.json')
+)
+# Retry sooner after a failed refresh
+REFERENCE_DATA_RETRY_SECONDS = 30
+
+class ReferenceDataCache:
+    """Holds the dropdown data in memory, backed by a snapshot file and a refresh thread."""
+
+    def __init__(self, snapshot_file: str = REFERENCE_DATA_FILE, refresh_seconds: int = REFERENCE_DATA_REFRESH_SECONDS):
+        self.snapshot_file = snapshot_file
+        self.refresh_seconds = refresh_seconds
+        self._data: Dict[str, List[Any]] = {'genres': [], 'languages': [], 'keywords': []}
+        self.loaded_at: Optional[float] = None
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def get(self) -> Tuple[List[Any], List[Any], List[Any]]:
+        """Return (genres, languages, keywords); empty lists until the first load."""
+        data = self._data
+        return data['genres'], data['languages'], data['keywords']
+
+    def load_snapshot(self) -> bool:
+        """Read the snapshot file written by a previous run, if there is one."""
+        try:
+            with open(self.snapshot_file) as snapshot:
+                payload = json.load(snapshot)
+        except (OSError, ValueError) as e:
+            logger.info(f"No usable reference data snapshot at {self.snapshot_file}: {str(e)}")
+            return False
+
+        self._data = {name: payload.get(name) or [] for name in ('genres', 'languages', 'keywords')}
+        self.loaded_at = payload.get('saved_at')
+        logger.info(f"Loaded reference data snapshot: {len(self._data['genres'])} genres, "
+                    f"{len(self._data['languages'])} languages, {len(self._data['keywords'])} keywords")
+        return True
+
+    def refresh(self) -> bool:
+        """Load fresh data from the databases and persist it. Keeps the old data on failure."""
+        start_time = perf_counter()
+        genres, languages, keywords = initialize_data()
+        if not any([genres, languages, keywords]):
+            logger.warning("Reference data refresh failed, keeping the cached data")
+            return False
+
+        self._data = {'genres': genres, 'languages': languages, 'keywords': keywords}
+        self.loaded_at = time()
+        self._save_snapshot()
+        logger.info(f"Refreshed reference data in {perf_counter() - start_time:.3f}s")
+        return True
+
+    def _save_snapshot(self):
+        """Write the snapshot atomically so a crash never leaves a truncated file."""
+        payload = dict(self._data, saved_at=self.loaded_at)
+        temp_file = f"{self.snapshot_file}.tmp"
+        try:
+            with open(temp_file, 'w') as snapshot:
+                json.dump(payload, snapshot)
+            os.replace(temp_file, self.snapshot_file)
+        except OSError as e:
+            logger.error(f"Could not write reference data snapshot: {str(e)}")
+
+    def start(self):
+        """Serve the snapshot immediately and refresh from the databases in the background."""
+        if self._refresh_thread:
+            return
+        self.load_snapshot()
+        self._refresh_thread = threading.Thread(target=self._refresh_loop, name='reference-data-refresh', daemon=True)
+        self._refresh_thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                refreshed = self.refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh reference data: {str(e)}", exc_info=True)
+                refreshed = False
+            if refreshed and self.refresh_seconds <= 0:
+                return  # Periodic refresh disabled, one fresh load is enough
+            if self._stop.wait(self.refresh_seconds if refreshed else REFERENCE_DATA_RETRY_SECONDS):
+                return
+
+reference_data = ReferenceDataCache()
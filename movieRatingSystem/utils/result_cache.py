@@ -0,0 +1,118 @@
+"""Size-bounded LRU + TTL cache for search result pages.
+
+Entries are keyed on the backend, the page and the normalized output of
+parse_search_conditions. import_db.py touches the catalog version file after
+loading data; the cache notices the new version on its next lookup and drops
+everything, together with the cached exact counts.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Optional
+
+from movieRatingSystem.logging_config import get_logger
+from movieRatingSystem.utils.count_strategies import count_cache
+
+logger = get_logger()
+
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', '300'))
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '512'))
+CATALOG_VERSION_FILE = os.getenv(
+    'CATALOG_VERSION_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'catalog_version')
+)
+
+def normalize_params(params: Dict[str, Any]) -> str:
+    """Serialize parsed search parameters so equivalent searches share a key."""
+    normalized = {}
+    for name, value in params.items():
+        if isinstance(value, (list, set)):
+            value = sorted(value)
+        elif isinstance(value, tuple):
+            value = list(value)
+        if isinstance(value, str):
+            value = value.strip() or None
+        normalized[name] = value
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+def read_catalog_version() -> Optional[str]:
+    """Return the version written by the last import, or None if there was none."""
+    try:
+        with open(CATALOG_VERSION_FILE) as version_file:
+            return version_file.read().strip()
+    except OSError:
+        return None
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry TTL and per-backend hit/miss counters."""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, ttl: int = RESULT_CACHE_TTL, enabled: bool = RESULT_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = read_catalog_version()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def make_key(backend: str, params: Dict[str, Any], page: int) -> str:
+        return f"{backend}:{page}:{normalize_params(params)}"
+
+    def _record(self, backend: str, outcome: str):
+        backend_stats = self.stats.setdefault(backend, {'hits': 0, 'misses': 0})
+        backend_stats[outcome] += 1
+
+    def _check_version(self):
+        """Drop everything if the catalog was re-imported since the last lookup."""
+        version = read_catalog_version()
+        if version != self._version:
+            logger.info(f"Catalog version changed ({self._version} -> {version}), clearing search caches")
+            self._entries.clear()
+            count_cache.clear()
+            self._version = version
+
+    def get(self, backend: str, key: Optional[str]) -> Optional[Any]:
+        """Return the cached page for key, or None.
+
+        A disabled cache or a None key (cache bypassed) always misses without
+        being counted, but still clears the count cache on a new catalog version.
+        """
+        with self._lock:
+            self._check_version()
+            if not self.enabled or key is None:
+                return None
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._record(backend, 'misses')
+                return None
+            self._entries.move_to_end(key)
+            self._record(backend, 'hits')
+            return entry[1]
+
+    def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Clear all cached pages, e.g. after data was written in-process."""
+        with self._lock:
+            self._entries.clear()
+        count_cache.clear()
+
+    def backend_stats(self, backend: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats.get(backend, {'hits': 0, 'misses': 0}))
+
+result_cache = ResultCache()
@@ -0,0 +1,174 @@
+"""Shared retry executor for transactions aborted by serialization conflicts.
+
+CockroachDB runs every transaction at SERIALIZABLE and reports conflicts as
+SQLSTATE 40001 ("restart transaction"); the client is expected to retry.
+Postgres deadlocks (40P01) and MariaDB deadlocks/lock wait timeouts
+(1213/1205) are retried the same way. Retries back off exponentially with
+full jitter and stop after a maximum number of attempts or elapsed time.
+On CockroachDB, transactions retry in place through
+SAVEPOINT cockroach_restart, so they keep their priority across attempts.
+
+Attempts, retries and outcomes are counted per call site, see
+RetryExecutor.call_site_stats.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+# import_db.py imports this module outside the movieRatingSystem package, so
+# it uses the root logger directly (the one get_logger() configures)
+logger = logging.getLogger()
+
+RETRY_MAX_ATTEMPTS = int(os.getenv('DB_RETRY_MAX_ATTEMPTS', '10'))
+RETRY_BASE_DELAY = float(os.getenv('DB_RETRY_BASE_DELAY', '0.05'))
+RETRY_MAX_DELAY = float(os.getenv('DB_RETRY_MAX_DELAY', '2'))
+RETRY_MAX_ELAPSED = float(os.getenv('DB_RETRY_MAX_ELAPSED', '30'))
+
+RETRYABLE_SQLSTATES = ('40001', '40P01')  # serialization_failure, deadlock_detected
+RETRYABLE_MYSQL_ERRORS = (1205, 1213)  # lock wait timeout, deadlock
+RESTART_SAVEPOINT = 'cockroach_restart'
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether the error means the whole transaction can safely be run again."""
+    orig = error.orig if isinstance(error, DBAPIError) else error
+    sqlstate = getattr(orig, 'pgcode', None) or getattr(orig, 'sqlstate', None)
+    if sqlstate in RETRYABLE_SQLSTATES:
+        return True
+    args = getattr(orig, 'args', ())
+    return bool(args) and args[0] in RETRYABLE_MYSQL_ERRORS
+
+class RetryBudgetExceeded(Exception):
+    """Raised from the last retryable error once attempts or time ran out."""
+
+class RetryExecutor:
+    """Runs transactional work with backoff and per-call-site counters."""
+
+    def __init__(self, max_attempts: int = RETRY_MAX_ATTEMPTS, base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY, max_elapsed: float = RETRY_MAX_ELAPSED):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_elapsed = max_elapsed
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, call_site: str, outcome: str):
+        with self._lock:
+            site_stats = self._stats.setdefault(
+                call_site, {'calls': 0, 'retries': 0, 'succeeded': 0, 'failed': 0, 'exhausted': 0}
+            )
+            site_stats[outcome] += 1
+
+    def call_site_stats(self, call_site: Optional[str] = None) -> Dict[str, Any]:
+        """Counters for one call site, or for all of them."""
+        with self._lock:
+            if call_site is not None:
+                return dict(self._stats.get(call_site, {}))
+            return {site: dict(site_stats) for site, site_stats in self._stats.items()}
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: a uniform delay up to the capped exponential bound."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def run(self, call_site: str, attempt_fn: Callable[[], Any]) -> Any:
+        """Call attempt_fn until it succeeds, retrying retryable errors.
+
+        attempt_fn must leave no partial effects behind when it raises, i.e.
+        roll back its own transaction.
+        """
+        self._record(call_site, 'calls')
+        start_time = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = attempt_fn()
+            except Exception as e:
+                if not is_retryable(e):
+                    self._record(call_site, 'failed')
+                    raise
+                delay = self.backoff(attempt)
+                elapsed = time.monotonic() - start_time
+                if attempt >= self.max_attempts or elapsed + delay > self.max_elapsed:
+                    self._record(call_site, 'exhausted')
+                    logger.error(f"{call_site}: giving up after {attempt} attempts in {elapsed:.2f}s")
+                    raise RetryBudgetExceeded(f"{call_site} failed after {attempt} attempts") from e
+                self._record(call_site, 'retries')
+                logger.warning(f"{call_site}: retryable error on attempt {attempt}, "
+                               f"retrying in {delay * 1000:.0f}ms: {getattr(e, 'orig', e)}")
+                time.sleep(delay)
+                continue
+            self._record(call_site, 'succeeded')
+            return result
+
+    def run_transaction(self, call_site: str, session_factory: Callable, fn: Callable) -> Any:
+        """Run fn(session) in one ORM transaction and commit it, retrying on conflicts.
+
+        On CockroachDB a failed attempt is undone with ROLLBACK TO SAVEPOINT
+        cockroach_restart and retried in the same transaction. Everything the
+        attempt added to the session is discarded. If the session can no
+        longer be used (e.g. the conflict surfaced during a flush), it falls
+        back to a full rollback and a new transaction.
+        """
+        session = session_factory()
+        cockroach = session.get_bind().dialect.name == 'cockroachdb'
+        state = {'savepoint': False}
+
+        def attempt():
+            if cockroach and not state['savepoint']:
+                session.execute(text(f"SAVEPOINT {RESTART_SAVEPOINT}"))
+                state['savepoint'] = True
+            try:
+                result = fn(session)
+                if cockroach:
+                    session.flush()
+                    session.execute(text(f"RELEASE SAVEPOINT {RESTART_SAVEPOINT}"))
+                    state['savepoint'] = False
+                session.commit()
+                return result
+            except Exception as e:
+                if state['savepoint'] and is_retryable(e) and session.is_active:
+                    session.execute(text(f"ROLLBACK TO SAVEPOINT {RESTART_SAVEPOINT}"))
+                    session.expunge_all()
+                else:
+                    session.rollback()
+                    state['savepoint'] = False
+                raise
+
+        try:
+            return self.run(call_site, attempt)
+        finally:
+            session.close()
+
+    def run_connection_transaction(self, call_site: str, engine, fn: Callable) -> Any:
+        """Core counterpart of run_transaction: fn(connection) inside one committed transaction."""
+        with engine.connect() as connection:
+            cockroach = connection.dialect.name == 'cockroachdb'
+
+            def attempt():
+                if not connection.in_transaction():
+                    connection.begin()
+                    if cockroach:
+                        connection.exec_driver_sql(f"SAVEPOINT {RESTART_SAVEPOINT}")
+                try:
+                    result = fn(connection)
+                    if cockroach:
+                        connection.exec_driver_sql(f"RELEASE SAVEPOINT {RESTART_SAVEPOINT}")
+                    connection.commit()
+                    return result
+                except Exception as e:
+                    if cockroach and is_retryable(e) and connection.in_transaction():
+                        connection.exec_driver_sql(f"ROLLBACK TO SAVEPOINT {RESTART_SAVEPOINT}")
+                    else:
+                        connection.rollback()
+                    raise
+
+            return self.run(call_site, attempt)
+
+retry_executor = RetryExecutor()
@@ -0,0 +1,175 @@
+"""Concurrent fan-out of one search to several backends.
+
+A search is submitted as one job with a task per backend. Tasks run on a
+shared thread pool, each with its own session, so the Dash callback that
+submits the job returns immediately and a slow database only occupies a pool
+thread. Results are collected per backend as soon as they finish; a backend
+that exceeds its timeout is reported as timed out while the others proceed.
+Python threads cannot be interrupted, so a timed-out task keeps its pool
+thread until the server-side statement timeout ends its query.
+"""
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import monotonic, perf_counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.pool import Pool
+
+from movieRatingSystem.config.database import db_config, DatabaseUnavailableError
+from movieRatingSystem.logging_config import get_logger
+from movieRatingSystem.utils.db_utils import handle_db_error, run_in_session
+
+logger = get_logger()
+
+SEARCH_POOL_SIZE = int(os.getenv('SEARCH_POOL_SIZE', '8'))
+SEARCH_TIMEOUT_SECONDS = float(os.getenv('SEARCH_TIMEOUT_SECONDS', '15'))
+# Jobs nobody collects (closed browser tabs) are dropped after this long
+SEARCH_JOB_TTL_SECONDS = 300
+
+def apply_statement_timeout(session, timeout: float):
+    """Bound every statement of the session on the server side.
+
+    In a transaction (stale reads on CockroachDB) the limit is SET LOCAL and
+    ends with it. Autocommit sessions have no transaction to scope it to, so
+    it is set on the connection and reset_statement_timeout undoes it when
+    the connection goes back to the pool; other paths sharing the pool never
+    inherit the search timeout.
+    """
+    connection = session.connection()
+    dialect_name = connection.dialect.name
+    if dialect_name in ('postgresql', 'cockroachdb') and not session.info.get('autocommit'):
+        connection.execute(text(f"SET LOCAL statement_timeout = '{int(timeout * 1000)}ms'"))
+    elif dialect_name in ('postgresql', 'cockroachdb'):
+        connection.execute(text(f"SET SESSION statement_timeout = '{int(timeout * 1000)}ms'"))
+        connection.info['statement_timeout_reset'] = "RESET statement_timeout"
+    elif dialect_name in ('mysql', 'mariadb'):
+        connection.execute(text(f"SET SESSION max_statement_time = {float(timeout)}"))
+        connection.info['statement_timeout_reset'] = "SET SESSION max_statement_time = DEFAULT"
+
+@event.listens_for(Pool, 'checkin')
+def reset_statement_timeout(dbapi_connection, connection_record):
+    """Undo a session-level search timeout before the connection is reused."""
+    reset_sql = connection_record.info.pop('statement_timeout_reset', None)
+    if reset_sql is None or dbapi_connection is None:
+        return
+    try:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(reset_sql)
+        finally:
+            cursor.close()
+        dbapi_connection.commit()
+    except Exception as e:
+        # Never hand out a connection that still carries the search timeout
+        logger.warning(f"Could not reset statement timeout, discarding connection: {str(e)}")
+        connection_record.invalidate(e)
+
+class SearchCoordinator:
+    """Runs one task per backend on a thread pool and hands back results as they finish."""
+
+    def __init__(self, max_workers: int = SEARCH_POOL_SIZE, timeout: float = SEARCH_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='search')
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, tasks: Dict[str, Tuple[Optional[str], Callable]], timeout: Optional[float] = None) -> str:
+        """Start a job. tasks maps backend -> (database for the session, fn(session)).
+
+        A task whose database is None needs no session and is called as fn().
+        """
+        timeout = timeout or self.timeout
+        submitted_at = monotonic()
+        job = {'created': submitted_at, 'tasks': {}}
+
+        for backend, (db_name, fn) in tasks.items():
+            if db_name is not None and not db_config.is_available(db_name):
+                # Known to be down: report it right away instead of occupying a pool thread
+                future = Future()
+                future.set_result(self._down_outcome(db_name, 0.0))
+            else:
+                future = self._executor.submit(self._run_task, backend, db_name, fn, submitted_at, timeout)
+            job['tasks'][backend] = (future, submitted_at + timeout)
+
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._expire_jobs()
+            self._jobs[job_id] = job
+        return job_id
+
+    def _run_task(self, backend: str, db_name: Optional[str], fn: Callable, submitted_at: float, timeout: float) -> Dict[str, Any]:
+        """Execute one backend's task in a pool thread with its own read-only session."""
+        queue_wait = monotonic() - submitted_at
+        start_time = perf_counter()
+        if db_name is None:
+            try:
+                return {'status': 'done', 'result': fn(), 'elapsed': perf_counter() - start_time, 'queue_wait': queue_wait}
+            except Exception as e:
+                return {'status': 'error', 'error': handle_db_error(backend, e), 'queue_wait': queue_wait}
+
+        def search(session):
+            apply_statement_timeout(session, timeout)
+            return fn(session)
+
+        try:
+            # Searches only read: no commit, and the backend's stale read mode if configured
+            result = run_in_session(db_name, search, read_only=True, stale_reads=True, label=f"search on {backend}")
+            return {
+                'status': 'done',
+                'result': result,
+                'elapsed': perf_counter() - start_time,
+                'queue_wait': queue_wait
+            }
+        except DatabaseUnavailableError:
+            return self._down_outcome(db_name, queue_wait)
+        except Exception as e:
+            return {'status': 'error', 'error': handle_db_error(db_name, e), 'queue_wait': queue_wait}
+
+    @staticmethod
+    def _down_outcome(db_name: str, queue_wait: float) -> Dict[str, Any]:
+        return {'status': 'down', 'health': db_config.backend_status()[db_name], 'queue_wait': queue_wait}
+
+    def poll(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        """Return the outcomes that are ready for a job, each backend only once."""
+        ready = {}
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return ready
+
+            now = monotonic()
+            for backend, (future, deadline) in list(job['tasks'].items()):
+                if future.done():
+                    ready[backend] = future.result()
+                elif now > deadline:
+                    # cancel() only helps if the task has not started yet; a
+                    # running pool thread is not interrupted and finishes on
+                    # its own once the statement timeout hits
+                    future.cancel()
+                    logger.warning(f"Search on {backend} timed out after {now - job['created']:.1f}s")
+                    ready[backend] = {'status': 'timeout', 'elapsed': now - job['created']}
+                else:
+                    continue
+                del job['tasks'][backend]
+
+            if not job['tasks']:
+                del self._jobs[job_id]
+        return ready
+
+    def has_job(self, job_id: str) -> bool:
+        """Whether the job still has backends that have not been collected."""
+        with self._lock:
+            return job_id in self._jobs
+
+    def _expire_jobs(self):
+        """Forget jobs whose results were never collected."""
+        cutoff = monotonic() - SEARCH_JOB_TTL_SECONDS
+        for job_id in [job_id for job_id, job in self._jobs.items() if job['created'] < cutoff]:
+            for future, _ in self._jobs[job_id]['tasks'].values():
+                future.cancel()
+            del self._jobs[job_id]
+
+search_coordinator = SearchCoordinator()
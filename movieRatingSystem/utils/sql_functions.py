@@ -0,0 +1,64 @@
+"""Dialect-portable SQL functions for building JSON inside a query.
+
+PostgreSQL and CockroachDB spell them json_agg/json_build_object, MariaDB
+and MySQL JSON_ARRAYAGG/JSON_OBJECT. Aggregating child rows into a JSON
+column lets one statement return a row together with its related rows.
+Containment is the @> operator on PostgreSQL and CockroachDB and
+JSON_CONTAINS on MariaDB and MySQL.
+"""
+import json
+from sqlalchemy import literal
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import JSON, Boolean
+
+class json_array_agg(FunctionElement):
+    """Aggregate one value per row into a JSON array (NULL when there are no rows)."""
+    type = JSON()
+    inherit_cache = True
+    name = 'json_array_agg'
+
+class json_object(FunctionElement):
+    """Build a JSON object from alternating key, value arguments."""
+    type = JSON()
+    inherit_cache = True
+    name = 'json_object'
+
+class json_contains(FunctionElement):
+    """True when an element of the array column target contains value (a dict or scalar)."""
+    type = Boolean()
+    inherit_cache = True
+    name = 'json_contains'
+
+    def __init__(self, target, value):
+        # Bind both spellings; each dialect renders only its own.
+        super().__init__(target, literal([value], type_=target.type), literal(json.dumps(value)))
+
+@compiles(json_array_agg)
+def _compile_json_array_agg(element, compiler, **kw):
+    return f"json_agg({compiler.process(element.clauses, **kw)})"
+
+@compiles(json_array_agg, 'mysql')
+@compiles(json_array_agg, 'mariadb')
+def _compile_json_array_agg_mysql(element, compiler, **kw):
+    return f"JSON_ARRAYAGG({compiler.process(element.clauses, **kw)})"
+
+@compiles(json_object)
+def _compile_json_object(element, compiler, **kw):
+    return f"json_build_object({compiler.process(element.clauses, **kw)})"
+
+@compiles(json_object, 'mysql')
+@compiles(json_object, 'mariadb')
+def _compile_json_object_mysql(element, compiler, **kw):
+    return f"JSON_OBJECT({compiler.process(element.clauses, **kw)})"
+
+@compiles(json_contains)
+def _compile_json_contains(element, compiler, **kw):
+    target, array, _ = element.clauses
+    return f"{compiler.process(target, **kw)} @> {compiler.process(array, **kw)}"
+
+@compiles(json_contains, 'mysql')
+@compiles(json_contains, 'mariadb')
+def _compile_json_contains_mysql(element, compiler, **kw):
+    target, _, document = element.clauses
+    return f"JSON_CONTAINS({compiler.process(target, **kw)}, {compiler.process(document, **kw)})"
@@ -0,0 +1,42 @@
+"""Shared fixtures for the unit tests.
+
+The tests cover logic that runs without a database server. Run them from the
+repository root with `python -m pytest`.
+"""
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, create_mock_engine
+from sqlalchemy.orm import Session
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# data_process.py is a script in MovieLens/, not part of a package, and
+# import_db.py runs with movieRatingSystem/ on its path
+for path in (ROOT, os.path.join(ROOT, 'MovieLens'), os.path.join(ROOT, 'movieRatingSystem')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+@pytest.fixture
+def sqlite_session():
+    """Session on an in-memory SQLite database; create the tables a test needs with raw DDL."""
+    engine = create_engine('sqlite://')
+    session = Session(bind=engine)
+    yield session
+    session.close()
+    engine.dispose()
+
+def recording_engine(url):
+    """Mock engine that records the DDL it is asked to run in .statements instead of connecting."""
+    statements = []
+
+    def executor(sql, *multiparams, **params):
+        statements.append(str(sql.compile(dialect=engine.dialect)))
+
+    engine = create_mock_engine(url, executor)
+    engine.statements = statements
+    return engine
+
+@pytest.fixture
+def mysql_engine():
+    return recording_engine('mysql+pymysql://')
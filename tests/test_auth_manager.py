@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import text
+
+from movieRatingSystem.auth.AuthManager import AuthManager
+from movieRatingSystem.models.auth_models import Base
+
+@pytest.fixture
+def auth_manager(tmp_path):
+    manager = AuthManager(f"sqlite:///{tmp_path / 'auth.db'}")
+    Base.metadata.create_all(manager.engine)
+    manager.add_user('alice', 'alice@example.com', 'password123')
+    yield manager
+    manager.engine.dispose()
+
+def test_login_saves_last_active(auth_manager):
+    with auth_manager.engine.begin() as connection:
+        connection.execute(text("UPDATE users SET last_active = '2000-01-01 00:00:00'"))
+    user = auth_manager.login_user('alice', 'password123')
+    # Loaded attributes stay usable after the session is closed
+    assert user.username == 'alice' and user.id
+    with auth_manager.engine.connect() as connection:
+        last_active = connection.execute(text("SELECT last_active FROM users")).scalar()
+    assert not str(last_active).startswith('2000')
+
+def test_invalid_credentials_raise(auth_manager):
+    with pytest.raises(ValueError):
+        auth_manager.login_user('alice', 'wrong-password')
+    with pytest.raises(ValueError):
+        auth_manager.login_user('bob', 'password123')
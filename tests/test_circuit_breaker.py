@@ -0,0 +1,87 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from movieRatingSystem.config.async_database import AsyncDatabaseConfig
+from movieRatingSystem.config.database import CircuitBreaker, DatabaseConfig
+from movieRatingSystem.utils import async_db_utils
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'breaker.db'}")
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def unreachable_engine(tmp_path):
+    # SQLite cannot create a file in a missing directory, so every connect fails
+    engine = create_engine(f"sqlite:///{tmp_path / 'missing' / 'breaker.db'}")
+    yield engine
+    engine.dispose()
+
+def test_trips_after_consecutive_failures(unreachable_engine):
+    breaker = CircuitBreaker('test', failure_threshold=3, probe_seconds=60)
+    breaker.record_failure(ConnectionError('refused'), unreachable_engine)
+    breaker.record_failure(ConnectionError('refused'), unreachable_engine)
+    assert not breaker.is_open
+    breaker.record_failure(ConnectionError('refused'), unreachable_engine)
+    assert breaker.is_open
+    status = breaker.status()
+    assert (status['state'], status['failures'], status['last_error']) == ('down', 3, 'refused')
+
+def test_success_resets_the_failure_count(unreachable_engine):
+    breaker = CircuitBreaker('test', failure_threshold=3, probe_seconds=60)
+    breaker.record_failure(ConnectionError('refused'), unreachable_engine)
+    breaker.record_failure(ConnectionError('refused'), unreachable_engine)
+    breaker.record_success()
+    breaker.record_failure(ConnectionError('refused'), unreachable_engine)
+    assert not breaker.is_open
+    assert breaker.failures == 1
+
+def test_probe_closes_the_breaker_once_the_database_answers(engine):
+    breaker = CircuitBreaker('test', failure_threshold=1, probe_seconds=0.01)
+    breaker.record_failure(ConnectionError('refused'), engine)
+    assert breaker.is_open
+    assert wait_for(lambda: not breaker.is_open)
+    assert breaker.status() == {'state': 'up', 'failures': 0, 'down_for': 0.0, 'last_error': 'refused'}
+
+def test_probe_keeps_the_breaker_open_while_the_database_is_down(unreachable_engine):
+    breaker = CircuitBreaker('test', failure_threshold=1, probe_seconds=0.01)
+    breaker.record_failure(ConnectionError('refused'), unreachable_engine)
+    assert wait_for(lambda: 'unable to open database file' in breaker.last_error)
+    assert breaker.is_open
+
+def test_only_completed_statements_reset_failures(engine):
+    breaker = CircuitBreaker('test', failure_threshold=3, probe_seconds=60)
+    DatabaseConfig._track_health(SimpleNamespace(breakers={'test': breaker}), 'test', engine)
+    breaker.failures = 2
+    with engine.connect() as connection:
+        assert breaker.failures == 2
+        connection.execute(text("SELECT 1"))
+    assert breaker.failures == 0
+
+def test_connection_failures_are_recorded(unreachable_engine):
+    breaker = CircuitBreaker('test', failure_threshold=3, probe_seconds=60)
+    DatabaseConfig._track_health(SimpleNamespace(breakers={'test': breaker}), 'test', unreachable_engine)
+    with pytest.raises(Exception):
+        unreachable_engine.connect()
+    assert breaker.failures == 1
+
+def test_open_breaker_fails_async_reads_fast(monkeypatch):
+    breaker = SimpleNamespace(is_open=True, last_error='refused')
+    sync_config = SimpleNamespace(breakers={'postgres': breaker}, is_available=lambda db_name: not breaker.is_open)
+    monkeypatch.setattr(async_db_utils, 'async_db_config', AsyncDatabaseConfig(sync_config))
+    result = asyncio.run(async_db_utils.get_movie_by_id(1, db_name='postgres'))
+    assert result['error'] is True
+    assert result['details'] == 'postgres is down (refused)'
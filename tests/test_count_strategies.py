@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+
+from movieRatingSystem.utils import count_strategies
+from movieRatingSystem.utils.count_strategies import CountCache, count_cache, exact_count
+from movieRatingSystem.utils.query_builder import MovieQueryBuilder
+
+def plan_for(count_strategy, page=1, items_per_page=10):
+    return {
+        'page': page,
+        'items_per_page': items_per_page,
+        'count_strategy': count_strategy,
+        'peek': count_strategy in ('estimated', 'has_more'),
+        'sql_query': 'SELECT ...',
+    }
+
+def rows(count):
+    return [{'movieId': movie_id} for movie_id in range(count)]
+
+def test_exact_count_decides_has_more():
+    builder = MovieQueryBuilder(None)
+    page = builder.finish_page(plan_for('exact', page=2), rows(10), 25)
+    assert (page['total_count'], page['has_more'], page['count_is_exact']) == (25, True, True)
+    page = builder.finish_page(plan_for('exact', page=3), rows(5), 25)
+    assert page['has_more'] is False
+
+def test_low_estimate_keeps_next_page_reachable():
+    builder = MovieQueryBuilder(None)
+    # The planner guessed 12, but page 3 still found a peeked 11th row
+    page = builder.finish_page(plan_for('estimated', page=3), rows(11), 12)
+    assert len(page['results']) == 10
+    assert page['has_more'] is True
+    assert page['total_count'] == 31
+    assert page['count_is_exact'] is False
+
+def test_high_estimate_is_kept():
+    builder = MovieQueryBuilder(None)
+    page = builder.finish_page(plan_for('estimated'), rows(10), 5000)
+    assert (page['total_count'], page['has_more']) == (5000, False)
+
+def test_has_more_counts_rows_seen():
+    builder = MovieQueryBuilder(None)
+    page = builder.finish_page(plan_for('has_more', page=2), rows(11), None)
+    assert (page['total_count'], page['has_more']) == (21, True)
+    page = builder.finish_page(plan_for('has_more', page=2), rows(4), None)
+    assert (page['total_count'], page['has_more']) == (14, False)
+
+@pytest.mark.parametrize('count_strategy, limit', [('exact', 20), ('estimated', 21), ('has_more', 21)])
+def test_prepare_page_peeks_one_row_without_exact_count(sqlite_session, count_strategy, limit):
+    plan = MovieQueryBuilder(sqlite_session).base_query().prepare_page(count_strategy=count_strategy)
+    sql = str(plan['stmt'].compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    assert f"LIMIT {limit}" in sql
+
+def test_prepare_page_rejects_unknown_strategy(sqlite_session):
+    with pytest.raises(ValueError):
+        MovieQueryBuilder(sqlite_session).base_query().prepare_page(count_strategy='guess')
+
+@pytest.fixture
+def numbers(sqlite_session):
+    sqlite_session.execute(text("CREATE TABLE numbers (n INTEGER)"))
+    sqlite_session.execute(text("INSERT INTO numbers VALUES (1), (2), (3)"))
+    count_cache.clear()
+    yield sqlite_session
+    count_cache.clear()
+
+def test_exact_count_is_cached_per_sql(numbers):
+    count_stmt = select(func.count()).select_from(text('numbers'))
+    assert exact_count(numbers, count_stmt, 'count numbers') == 3
+    numbers.execute(text("INSERT INTO numbers VALUES (4)"))
+    assert exact_count(numbers, count_stmt, 'count numbers') == 3
+    assert exact_count(numbers, count_stmt, 'count numbers again') == 4
+
+def test_missing_estimate_falls_back_to_exact(numbers):
+    # SQLite has no planner estimate
+    builder = MovieQueryBuilder(numbers)
+    plan = {
+        'count_strategy': 'estimated',
+        'rows_stmt': select(text('n')).select_from(text('numbers')),
+        'count_stmt': select(func.count()).select_from(text('numbers')),
+        'count_sql': 'count numbers',
+    }
+    assert builder.count_total(numbers, plan) == 3
+    assert plan['count_strategy'] == 'exact'
+
+def test_count_cache_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(count_strategies, 'monotonic', lambda: now[0])
+    cache = CountCache(ttl=10, max_entries=10)
+    cache.set(('db', 'sql'), 7)
+    now[0] += 9
+    assert cache.get(('db', 'sql')) == 7
+    now[0] += 2
+    assert cache.get(('db', 'sql')) is None
+
+def test_count_cache_drops_entry_closest_to_expiry(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(count_strategies, 'monotonic', lambda: now[0])
+    cache = CountCache(ttl=10, max_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.set(('db', key), 1)
+        now[0] += 1
+    assert cache.get(('db', 'a')) is None
+    assert cache.get(('db', 'b')) == 1 and cache.get(('db', 'c')) == 1
@@ -0,0 +1,77 @@
+import ast
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import data_process
+from data_process import literal_to_json, literals_to_json
+
+@pytest.mark.parametrize('value, fast', [
+    ("[{'id': 18, 'name': 'Drama'}, {'id': 35, 'name': 'Comedy'}]", True),
+    ("[{'iso_639_1': 'en', 'name': 'English'}]", True),
+    ("[]", True),
+    ("{'adult': False, 'profile_path': None, 'credit': True}", True),
+    # Keywords inside strings stay strings
+    ("[{'name': 'None', 'job': 'True story'}]", True),
+    ("[{'name': 'Zoë', 'order': 0, 'gender': 2.5}]", True),
+    # Quotes and backslashes need literal_eval
+    ("[{'character': \"Woody's friend\"}]", False),
+    ("[{'name': 'Say \\'hi\\''}]", False),
+    ('[{"name": "Buzz"}]', False),
+])
+def test_matches_literal_eval(value, fast):
+    assert literal_to_json(value) == (json.dumps(ast.literal_eval(value)), fast)
+
+def test_invalid_literal_raises():
+    with pytest.raises((ValueError, SyntaxError)):
+        literal_to_json("[{'id': 1,")
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_column_conversion_keeps_row_order(workers):
+    values = [f"[{{'id': {n}, 'name': 'Cast {n}'}}]" if n % 3 else f"[{{'character': \"{n}'s\"}}]" for n in range(50)]
+    frame = pd.DataFrame({'cast': values})
+    literals_to_json(frame, ['cast'], workers)
+    assert frame['cast'].tolist() == [json.dumps(ast.literal_eval(value)) for value in values]
+
+def test_fast_path_is_used_for_plain_literals():
+    texts, fast = data_process.literal_chunk_to_json(["[{'id': 1}]", "[{'name': \"O'Hara\"}]", "None"])
+    assert texts == ['[{"id": 1}]', '[{"name": "O\'Hara"}]', 'null']
+    assert fast == 2
+
+@pytest.mark.parametrize('output_format', ['parquet', 'arrow'])
+def test_processed_output_writes_tables_and_manifest(tmp_path, output_format):
+    data_path = f"{tmp_path}/"
+    (tmp_path / 'links.csv').write_text("movieId,imdbId,tmdbId\n1,114709,862\n2,113497,\n")
+    output = data_process.ProcessedOutput(str(tmp_path / 'processed'), output_format)
+    output.write_frame('links', pd.read_csv(data_path + 'links.csv'))
+
+    schema = pa.schema([('movieId', pa.int32()), ('relevance', pa.float64())])
+    with output.open('genome_relevance', schema) as writer:
+        writer.write_table(pa.table({'movieId': [1, 1], 'relevance': [0.5, 0.25]}, schema=schema))
+        writer.write_table(pa.table({'movieId': [2], 'relevance': [0.75]}, schema=schema))
+    output.write_manifest(data_path, ['links.csv'])
+
+    manifest = json.loads((tmp_path / 'processed' / data_process.MANIFEST_FILE).read_text())
+    extension = data_process.OUTPUT_FORMATS[output_format]
+    assert manifest['format'] == output_format
+    assert manifest['sources']['links.csv']['bytes'] == (tmp_path / 'links.csv').stat().st_size
+    assert manifest['tables']['links']['file'] == 'links' + extension
+    assert manifest['tables']['links']['rows'] == 2
+    assert manifest['tables']['links']['columns'] == {'movieId': 'int64', 'imdbId': 'int64', 'tmdbId': 'int64'}
+    assert manifest['tables']['genome_relevance']['rows'] == 3
+    # Files are only moved into place on close
+    assert sorted(path.name for path in (tmp_path / 'processed').iterdir()) == sorted(
+        ['links' + extension, 'genome_relevance' + extension, data_process.MANIFEST_FILE]
+    )
+
+    links_path = str(tmp_path / 'processed' / ('links' + extension))
+    if output_format == 'parquet':
+        links = pq.read_table(links_path)
+    else:
+        links = pa.ipc.open_file(pa.memory_map(links_path)).read_all()
+    assert links.column('tmdbId').to_pylist() == [862, None]
+    assert manifest['tables']['links']['bytes'] == os.path.getsize(links_path)
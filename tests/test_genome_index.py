@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from movieRatingSystem.utils.genome_index import GenomeANNIndex, l2_normalize, top_k_neighbours
+
+def random_vectors(count, dimensions=32, seed=0):
+    return l2_normalize(np.random.default_rng(seed).random((count, dimensions)))
+
+def exact_neighbours(vectors, k):
+    matrix = vectors.astype(np.float32)
+    scores = matrix @ matrix.T
+    np.fill_diagonal(scores, -np.inf)
+    return np.argsort(-scores, axis=1, kind='stable')[:, :k], scores
+
+@pytest.mark.parametrize('block_size', [7, 64, 1000])
+def test_top_k_matches_brute_force(block_size):
+    vectors = random_vectors(150)
+    neighbours, similarities = top_k_neighbours(vectors, 10, block_size)
+    expected, scores = exact_neighbours(vectors, 10)
+    assert neighbours.shape == similarities.shape == (150, 10)
+    # Compare scores rather than rows, near-ties may swap places
+    expected_scores = np.take_along_axis(scores, expected, axis=1)
+    found_scores = np.take_along_axis(scores, neighbours.astype(np.int64), axis=1)
+    np.testing.assert_allclose(found_scores, expected_scores, atol=1e-3)
+    assert (neighbours != np.arange(150)[:, None]).all()
+    assert (np.diff(similarities.astype(np.float32), axis=1) <= 0).all()
+
+def test_k_is_capped_at_the_other_movies():
+    neighbours, _ = top_k_neighbours(random_vectors(4), 10)
+    assert neighbours.shape == (4, 3)
+
+def test_zero_vectors_stay_zero():
+    vectors = l2_normalize(np.array([[0, 0], [3, 4]], dtype=np.float32))
+    np.testing.assert_allclose(vectors.astype(np.float32), [[0, 0], [0.6, 0.8]], atol=1e-3)
+
+def clustered_arrays(movie_ids, clusters=8, dimensions=32, seed=0):
+    """Genome-like arrays (as from load_genome_matrix) of noisy copies of a few centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.random((clusters, dimensions))
+    vectors = centres[rng.integers(clusters, size=len(movie_ids))] + 0.1 * rng.random((len(movie_ids), dimensions))
+    return {
+        'movie_ids': np.array(movie_ids, dtype=np.int64),
+        'tag_ids': np.arange(dimensions),
+        'vectors': vectors.astype(np.float32),
+        'genres': np.zeros((len(movie_ids), 1), dtype=bool),
+        'genre_names': np.array(['Drama']),
+    }
+
+MOVIE_IDS = list(range(1, 401))
+
+@pytest.fixture
+def ann_index(tmp_path):
+    index = GenomeANNIndex(str(tmp_path / 'ann.npz'), probes=4)
+    index.build(clustered_arrays(MOVIE_IDS), lists=16)
+    return index
+
+def recall(index, probes, k=10):
+    """Share of the exact top-k neighbours that the index finds."""
+    expected, _ = exact_neighbours(l2_normalize(clustered_arrays(MOVIE_IDS)['vectors']), k)
+    hits = 0
+    for row, movie_id in enumerate(MOVIE_IDS):
+        found = {other for other, _ in index.similar(movie_id, limit=k, genre_weight=0, probes=probes)}
+        hits += len(found & {MOVIE_IDS[other] for other in expected[row]})
+    return hits / (len(MOVIE_IDS) * k)
+
+def test_probing_every_list_is_exact(ann_index):
+    assert recall(ann_index, probes=16) == pytest.approx(1.0, abs=0.01)
+
+def test_recall_grows_with_probes(ann_index):
+    one, four = recall(ann_index, probes=1), recall(ann_index, probes=4)
+    assert one < four
+    assert four >= 0.95
+
+def test_similar_excludes_the_movie_itself(ann_index):
+    similar = ann_index.similar(5, limit=10, genre_weight=0)
+    assert len(similar) == 10
+    assert 5 not in [movie_id for movie_id, _ in similar]
+    assert ann_index.similar(9999) is None
+
+def test_insert_adds_and_replaces_movies(ann_index, tmp_path):
+    ann_index.save()
+    reader = GenomeANNIndex(ann_index.path)
+    assert len(reader.movie_ids()) == 400
+
+    ann_index.insert(clustered_arrays([3, 1000, 1001], seed=1))
+    assert sorted(ann_index.movie_ids().tolist()) == sorted(MOVIE_IDS + [1000, 1001])
+    # Other processes pick the new file up on their next lookup
+    assert reader.contains(1001)
+    assert len(reader.movie_ids()) == 402
+
+def test_insert_rejects_changed_tags(ann_index):
+    arrays = clustered_arrays([1000])
+    arrays['tag_ids'] = arrays['tag_ids'] + 1
+    with pytest.raises(ValueError):
+        ann_index.insert(arrays)
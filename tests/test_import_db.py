@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.ext.compiler import compiles
+
+from movieRatingSystem.utils.query_builder import normalize_title
+from utils import import_db
+from utils.import_db import Base, MovieMetadata, MovieRatingStats
+
+# The CSV import is dialect-neutral apart from the schema, so let SQLite
+# store the Postgres column types as text
+@compiles(JSONB, 'sqlite')
+@compiles(ARRAY, 'sqlite')
+def compile_as_text(type_, compiler, **kw):
+    return 'TEXT'
+
+CSV_FILES = {
+    'movies_metadata.csv': "movieId,title,release_date,popularity\n1,Toy  Story,1995-10-30,21.9\n2,Amélie,2001-04-25,17.0\n",
+    'credits.csv': 'movieId,cast,crew\n1,"[{""id"": 31, ""name"": ""Tom Hanks""}]",[]\n2,[],[]\n',
+    'links.csv': "movieId,imdbId,tmdbId\n1,114709,862\n2,113497,8844\n",
+    'movies.csv': 'movieId,title,genres\n1,Toy Story,"{Animation,Comedy}"\n2,Jumanji,{Adventure}\n',
+    'ratings.csv': "movieId,rating\n1,3.9\n2,3.25\n",
+    'genome-tags.csv': "tagId,tag\n1,funny\n2,toys\n",
+    'genome-scores.csv': 'movieId,relevances\n1,"{""1"": 0.8, ""2"": 0.95}"\n',
+}
+
+@pytest.fixture
+def csv_import(tmp_path, monkeypatch):
+    """Run the CSV fallback of import_db.py against SQLite and return the engine."""
+    for name, content in CSV_FILES.items():
+        (tmp_path / name).write_text(content)
+    monkeypatch.setattr(import_db, 'CATALOG_VERSION_FILE', str(tmp_path / 'catalog_version'))
+    engine = create_engine(f"sqlite:///{tmp_path / 'movies.db'}")
+    Base.metadata.create_all(engine)
+    import_db.importCsv(f"{tmp_path}/", engine)
+    yield engine
+    engine.dispose()
+
+def test_csv_import_aggregates_rating_stats(csv_import):
+    with csv_import.connect() as con:
+        rows = con.execute(
+            select(MovieRatingStats.movieId, MovieRatingStats.rating_count, MovieRatingStats.rating_sum, MovieRatingStats.rating_avg)
+            .order_by(MovieRatingStats.movieId)
+        ).all()
+    assert [tuple(row) for row in rows] == [(1, 1, 3.9, 3.9), (2, 1, 3.25, 3.25)]
+
+def test_csv_import_fills_release_year(csv_import):
+    with csv_import.connect() as con:
+        years = con.execute(select(MovieMetadata.release_year).order_by(MovieMetadata.movieId)).scalars().all()
+    assert years == [1995, 2001]
+
+def test_csv_import_normalizes_titles(csv_import):
+    with csv_import.connect() as con:
+        titles = con.execute(select(MovieMetadata.title_normalized).order_by(MovieMetadata.movieId)).scalars().all()
+    assert titles == [normalize_title('Toy  Story'), normalize_title('Amélie')] == ['toy story', 'amelie']
@@ -0,0 +1,22 @@
+import pytest
+
+from movieRatingSystem.models.movie_models import MovieMetadata
+from tests.conftest import recording_engine
+
+def index_ddl(engine):
+    for index in MovieMetadata.__table__.indexes:
+        index.create(engine)
+    return engine.statements
+
+def test_mysql_skips_postgres_only_indexes(mysql_engine):
+    statements = index_ddl(mysql_engine)
+    assert {statement.split()[2] for statement in statements} == {
+        'ix_movie_metadata_year_popularity', 'ix_movie_metadata_title'
+    }
+    assert not any('NULLS LAST' in statement or 'gin' in statement for statement in statements)
+
+@pytest.mark.parametrize('url', ['postgresql+psycopg2://', 'cockroachdb://'])
+def test_postgres_dialects_create_every_index(url):
+    statements = index_ddl(recording_engine(url))
+    assert len(statements) == len(MovieMetadata.__table__.indexes)
+    assert sum('NULLS LAST' in statement for statement in statements) == 3
@@ -0,0 +1,85 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+
+from movieRatingSystem.models.movie_models import MovieMetadata
+from movieRatingSystem.utils.query_builder import SORT_CONFIG, MovieQueryBuilder, decode_cursor, encode_cursor
+
+# Ties and NULLs in every sort column, so the movieId tie-breaker and the
+# trailing NULL block are both exercised
+ROWS = [
+    {
+        'movieId': movie_id,
+        'popularity': None if movie_id % 7 == 0 else float(movie_id % 5),
+        'vote_average': None if movie_id % 4 == 0 else float(movie_id % 3),
+        'release_date': None if movie_id % 6 == 0 else date(2000 + movie_id % 4, 1, 1),
+        'title': None if movie_id % 9 == 0 else f"Movie {movie_id % 8}",
+    }
+    for movie_id in range(1, 41)
+]
+
+@pytest.fixture
+def catalog(sqlite_session):
+    sqlite_session.execute(text(
+        "CREATE TABLE movie_metadata (movieId INTEGER PRIMARY KEY, popularity FLOAT, "
+        "vote_average FLOAT, release_date DATE, title VARCHAR)"
+    ))
+    sqlite_session.execute(insert(MovieMetadata), ROWS)
+    return sqlite_session
+
+def expected_order(sort_by):
+    """(value, movieId) order with NULLs last, in the sort's direction."""
+    column, descending = SORT_CONFIG[sort_by]
+    present = sorted((row for row in ROWS if row[column.key] is not None),
+                     key=lambda row: (row[column.key], row['movieId']), reverse=descending)
+    missing = sorted((row for row in ROWS if row[column.key] is None),
+                     key=lambda row: row['movieId'], reverse=descending)
+    return [row['movieId'] for row in present + missing]
+
+def sorted_builder(session, sort_by):
+    builder = MovieQueryBuilder(session)
+    builder.query = select(MovieMetadata.movieId, SORT_CONFIG[sort_by][0])
+    return builder.apply_sorting(sort_by)
+
+@pytest.mark.parametrize('sort_by', sorted(SORT_CONFIG))
+def test_full_sort_puts_nulls_last(catalog, sort_by):
+    builder = sorted_builder(catalog, sort_by)
+    assert catalog.execute(builder.query).scalars().all() == expected_order(sort_by)
+
+@pytest.mark.parametrize('sort_by', sorted(SORT_CONFIG))
+@pytest.mark.parametrize('page_size', [1, 3, 7])
+def test_keyset_pages_match_full_sort(catalog, sort_by, page_size):
+    builder = sorted_builder(catalog, sort_by)
+    column, _ = SORT_CONFIG[sort_by]
+    seen = [dict(row._mapping) for row in catalog.execute(builder.query.limit(page_size))]
+    while True:
+        last = seen[-1]
+        # Round trip through the opaque cursor, as the search page does
+        cursor = decode_cursor(encode_cursor(sort_by, last[column.key], last['movieId']))
+        page = [dict(row._mapping) for row in
+                catalog.execute(builder.query.where(builder._seek_condition(cursor)).limit(page_size))]
+        if not page:
+            break
+        seen.extend(page)
+    assert [row['movieId'] for row in seen] == expected_order(sort_by)
+
+def test_cursor_round_trips_dates():
+    cursor = decode_cursor(encode_cursor('release_date', date(1999, 12, 31), 42))
+    assert cursor == {'sort_by': 'release_date', 'value': date(1999, 12, 31), 'movie_id': 42}
+
+@pytest.mark.parametrize('cursor', ['not base64!', encode_cursor('budget', 1, 1)])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+@pytest.mark.parametrize('sort_by', sorted(SORT_CONFIG))
+def test_mysql_sort_and_seek_compile_without_nulls_last(mysql_engine, sort_by):
+    session = Session(bind=mysql_engine)
+    builder = MovieQueryBuilder(session).base_query().apply_sorting(sort_by)
+    cursor = decode_cursor(encode_cursor(sort_by, ROWS[0][SORT_CONFIG[sort_by][0].key], 1))
+    stmt = builder.query.where(builder._seek_condition(cursor))
+    sql = str(stmt.compile(dialect=mysql_engine.dialect))
+    assert 'NULLS' not in sql
+    assert 'IS NULL' in sql
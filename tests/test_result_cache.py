@@ -0,0 +1,68 @@
+import pytest
+
+from movieRatingSystem.utils import result_cache as result_cache_module
+from movieRatingSystem.utils.count_strategies import count_cache
+from movieRatingSystem.utils.result_cache import ResultCache
+
+@pytest.fixture
+def clock(monkeypatch, tmp_path):
+    now = [0.0]
+    monkeypatch.setattr(result_cache_module, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(result_cache_module, 'CATALOG_VERSION_FILE', str(tmp_path / 'catalog_version'))
+    return now
+
+def test_equivalent_searches_share_a_key():
+    first = ResultCache.make_key('postgres', {'genres': ['Drama', 'Comedy'], 'title': ' heat ', 'years': (1990, 2000)}, 1)
+    second = ResultCache.make_key('postgres', {'genres': ['Comedy', 'Drama'], 'title': 'heat', 'years': [1990, 2000]}, 1)
+    assert first == second
+    assert ResultCache.make_key('postgres', {'title': '  '}, 1) == ResultCache.make_key('postgres', {'title': None}, 1)
+    assert first != ResultCache.make_key('mariadb', {'genres': ['Drama', 'Comedy'], 'title': 'heat', 'years': (1990, 2000)}, 1)
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResultCache(max_entries=2, ttl=60, enabled=True)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('db', 'a') == 1
+    cache.set('c', 3)
+    assert cache.get('db', 'b') is None
+    assert (cache.get('db', 'a'), cache.get('db', 'c')) == (1, 3)
+
+def test_entries_expire(clock):
+    cache = ResultCache(max_entries=10, ttl=60, enabled=True)
+    cache.set('a', 1)
+    clock[0] = 59
+    assert cache.get('db', 'a') == 1
+    clock[0] = 61
+    assert cache.get('db', 'a') is None
+
+def test_hits_and_misses_are_counted_per_backend(clock):
+    cache = ResultCache(max_entries=10, ttl=60, enabled=True)
+    cache.set('a', 1)
+    cache.get('postgres', 'a')
+    cache.get('postgres', 'b')
+    cache.get('mariadb', 'b')
+    assert cache.backend_stats('postgres') == {'hits': 1, 'misses': 1}
+    assert cache.backend_stats('mariadb') == {'hits': 0, 'misses': 1}
+    assert cache.backend_stats('cockroach') == {'hits': 0, 'misses': 0}
+
+def test_new_catalog_version_clears_pages_and_counts(clock, tmp_path):
+    cache = ResultCache(max_entries=10, ttl=60, enabled=True)
+    cache.set('a', 1)
+    count_cache.set(('db', 'count'), 5)
+    (tmp_path / 'catalog_version').write_text('2')
+    assert cache.get('db', 'a') is None
+    assert count_cache.get(('db', 'count')) is None
+
+def test_disabled_cache_stores_nothing(clock):
+    cache = ResultCache(max_entries=10, ttl=60, enabled=False)
+    cache.set('a', 1)
+    assert cache.get('db', 'a') is None
+
+@pytest.mark.parametrize('enabled, key', [(False, 'a'), (True, None)])
+def test_disabled_or_bypassed_lookup_still_clears_counts_on_new_version(clock, tmp_path, enabled, key):
+    cache = ResultCache(max_entries=10, ttl=60, enabled=enabled)
+    count_cache.set(('db', 'count'), 5)
+    (tmp_path / 'catalog_version').write_text('2')
+    assert cache.get('db', key) is None
+    assert count_cache.get(('db', 'count')) is None
+    assert cache.backend_stats('db') == {'hits': 0, 'misses': 0}
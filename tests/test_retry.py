@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from movieRatingSystem.utils import db_utils, retry
+from movieRatingSystem.utils.db_utils import handle_db_error, run_in_session
+from movieRatingSystem.utils.retry import RetryBudgetExceeded, RetryExecutor, is_retryable
+
+class SerializationFailure(Exception):
+    pgcode = '40001'
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    delays = []
+    monkeypatch.setattr(retry.time, 'sleep', delays.append)
+    return delays
+
+def failing(errors, result='done'):
+    """An attempt function that raises the given errors in turn, then returns result."""
+    errors = list(errors)
+    calls = []
+
+    def attempt():
+        calls.append(len(calls) + 1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    attempt.calls = calls
+    return attempt
+
+def test_retryable_errors():
+    assert is_retryable(SerializationFailure())
+    assert is_retryable(OperationalError('COMMIT', {}, SerializationFailure()))
+    assert is_retryable(Exception(1213, 'Deadlock found when trying to get lock'))
+    assert is_retryable(Exception(1205, 'Lock wait timeout exceeded'))
+    assert not is_retryable(Exception(1062, 'Duplicate entry'))
+    assert not is_retryable(ValueError('bad input'))
+
+def test_retries_until_success(no_sleep):
+    executor = RetryExecutor(max_attempts=5, base_delay=0.01, max_delay=0.1, max_elapsed=10)
+    attempt = failing([SerializationFailure(), SerializationFailure()])
+    assert executor.run('site', attempt) == 'done'
+    assert attempt.calls == [1, 2, 3]
+    assert len(no_sleep) == 2 and all(0 <= delay <= 0.1 for delay in no_sleep)
+    assert executor.call_site_stats('site') == {'calls': 1, 'retries': 2, 'succeeded': 1, 'failed': 0, 'exhausted': 0}
+
+def test_other_errors_are_not_retried():
+    executor = RetryExecutor(max_attempts=5)
+    attempt = failing([ValueError('bad input')])
+    with pytest.raises(ValueError):
+        executor.run('site', attempt)
+    assert attempt.calls == [1]
+    assert executor.call_site_stats('site')['failed'] == 1
+
+def test_gives_up_after_max_attempts():
+    executor = RetryExecutor(max_attempts=3, base_delay=0.01, max_delay=0.1, max_elapsed=10)
+    attempt = failing([SerializationFailure()] * 5)
+    with pytest.raises(RetryBudgetExceeded) as raised:
+        executor.run('site', attempt)
+    assert isinstance(raised.value.__cause__, SerializationFailure)
+    assert attempt.calls == [1, 2, 3]
+    assert executor.call_site_stats('site')['exhausted'] == 1
+
+def test_backoff_is_capped():
+    executor = RetryExecutor(base_delay=1, max_delay=4)
+    assert all(0 <= executor.backoff(attempt) <= 4 for attempt in range(1, 20) for _ in range(10))
+
+def test_run_transaction_discards_failed_attempts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'retry.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE writes (attempt INTEGER)"))
+    attempts = []
+
+    def write(session):
+        attempts.append(len(attempts) + 1)
+        session.execute(text("INSERT INTO writes VALUES (:attempt)"), {'attempt': len(attempts)})
+        if len(attempts) == 1:
+            raise SerializationFailure()
+        return len(attempts)
+
+    executor = RetryExecutor(max_attempts=3, base_delay=0)
+    assert executor.run_transaction('site', lambda: Session(bind=engine), write) == 2
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT attempt FROM writes")).scalars().all() == [2]
+    engine.dispose()
+
+def test_exhausted_retries_are_reported_with_details():
+    error = handle_db_error('cockroach', RetryBudgetExceeded('search failed after 10 attempts'))
+    assert error['details'] == 'search failed after 10 attempts'
+
+def test_run_in_session_retries_with_a_fresh_session(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'retry.db'}")
+    sessions = []
+
+    def create_session(db_name, stale_reads=False, read_only=False):
+        sessions.append(Session(bind=engine))
+        return sessions[-1]
+
+    monkeypatch.setattr(db_utils.db_config, 'create_session', create_session)
+    read = failing([SerializationFailure()], result=None)
+    assert run_in_session('cockroach', lambda session: read() or session.execute(text("SELECT 1")).scalar(),
+                          read_only=True, label='read') == 1
+    assert len(sessions) == 2 and sessions[0] is not sessions[1]
+    engine.dispose()
@@ -0,0 +1,26 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from movieRatingSystem.models.movie_models import Credits, Movies
+from movieRatingSystem.utils.sql_functions import json_contains
+
+def test_mysql_cast_containment_uses_json_contains(mysql_engine):
+    stmt = select(Credits.movieId).where(json_contains(Credits.cast, {'id': 31}))
+    compiled = stmt.compile(dialect=mysql_engine.dialect)
+    assert 'JSON_CONTAINS(credits.cast, %s)' in str(compiled)
+    assert '@>' not in str(compiled)
+    assert '{"id": 31}' in compiled.params.values()
+
+def test_mysql_genre_containment_uses_json_contains(mysql_engine):
+    stmt = select(Movies.movieId).where(json_contains(Movies.genres, 'Drama'))
+    compiled = stmt.compile(dialect=mysql_engine.dialect)
+    assert 'JSON_CONTAINS(movies.genres, %s)' in str(compiled)
+    assert '"Drama"' in compiled.params.values()
+
+def test_postgres_containment_binds_the_column_type():
+    compiled = select(Credits.movieId).where(json_contains(Credits.cast, {'id': 31})).compile(dialect=postgresql.dialect())
+    assert 'credits."cast" @> %(param_1)s' in str(compiled)
+    assert compiled.params['param_1'] == [{'id': 31}]
+    compiled = select(Movies.movieId).where(json_contains(Movies.genres, 'Drama')).compile(dialect=postgresql.dialect())
+    assert 'movies.genres @> %(param_1)s' in str(compiled)
+    assert compiled.params['param_1'] == ['Drama']